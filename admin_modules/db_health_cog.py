@@ -1,60 +1,72 @@
+import asyncio
 import io
 import json
+import logging
 import os
+import re
 import sqlite3
 import threading
 import time
-from collections import defaultdict, deque
-from functools import wraps
+from pathlib import Path
 from typing import Any
 
 import discord
 from discord.ext import commands, tasks
 
 import database as db
-
-READ_DB_FUNCS = {
-    "get_all_guilds",
-    "get_thread_config_for_channel",
-    "get_all_thread_configs_for_guild",
-    "get_counting_channel",
-    "get_boost_roles_for_guild",
-    "get_linked_roles_for_guild",
-    "get_boost_log_channel",
-    "get_boost_role",
-    "get_auto_reaction",
-    "get_all_auto_reactions",
-    "get_vanity_settings",
-    "get_vanity_codes",
-    "get_clantag_settings",
+from metrics import timed_task
+from metrics_history import MetricsHistory, sparkline
+from role_sync import role_reconciler
+from sketches import LogHistogram, RateTracker, SpaceSaving
+
+log = logging.getLogger("bot")
+
+TRAFFIC_KINDS = ("messages", "commands", "presence_updates", "member_updates")
+# Servidores vigilados por tipo de tráfico; el resto solo suma al total.
+TOP_GUILDS_CAPACITY = 200
+
+# Las tasas salen de muestras de los contadores cada RATE_SAMPLE_SEC segundos.
+RATE_SAMPLE_SEC = 5
+RATE_WINDOWS = {"1m": 60, "5m": 300, "1h": 3600}
+# Ventana de las tasas "/min" del resumen y de los umbrales de la recomendación.
+RATE_WINDOW = "5m"
+# Un pico es una tasa de 1 min BURST_FACTOR veces por encima de la de 1 h.
+BURST_FACTOR = 3.0
+BURST_MIN_PER_MIN = 30.0
+BURST_SERIES = ("writes", "ops", "messages", "commands", "presence_updates", "member_updates")
+
+# Historial por minuto en un SQLite aparte (``METRICS_HISTORY_FILE``).
+HISTORY_FLUSH_MINUTES = 5
+# Contador acumulado -> métrica del historial (incremento por minuto).
+HISTORY_COUNTERS = {
+    "ops": "db_ops",
+    "writes": "db_writes",
+    "errors": "db_errors",
+    "locked_errors": "db_locked_errors",
+    "messages": "messages",
+    "commands": "commands",
+    "presence_updates": "presence_updates",
+    "member_updates": "member_updates",
 }
+HISTORY_QUANTILES = {"db_p50_ms": 0.5, "db_p95_ms": 0.95, "db_p99_ms": 0.99}
+HISTORY_METRICS = (*HISTORY_COUNTERS.values(), *HISTORY_QUANTILES)
+TREND_PERIOD = re.compile(r"^(\d+)([hd])$")
+MAX_TREND_PERIOD_SEC = 400 * 86400
 
-WRITE_DB_FUNCS = {
-    "setup_database",
-    "sync_guilds",
-    "add_guild",
-    "remove_guild",
-    "add_thread_config",
-    "remove_thread_config",
-    "set_counting_channel",
-    "remove_counting_channel",
-    "update_count",
-    "reset_count",
-    "add_boost_role",
-    "set_boost_log_channel",
-    "delete_boost_role",
-    "add_auto_reaction",
-    "remove_auto_reaction",
-    "clear_auto_reactions",
-    "setup_vanity_table",
-    "set_vanity_settings",
-    "add_vanity_code",
-    "remove_vanity_code",
-    "delete_all_vanity",
-    "setup_clantag_table",
-    "set_clantag_settings",
-    "delete_clantag_settings",
-}
+
+def parse_period(text: str) -> int | None:
+    """``"12h"`` o ``"7d"`` en segundos; ``None`` si no es válido."""
+    match = TREND_PERIOD.match(text.lower())
+    if match is None:
+        return None
+    seconds = int(match[1]) * (3600 if match[2] == "h" else 86400)
+    return seconds if 0 < seconds <= MAX_TREND_PERIOD_SEC else None
+
+
+def format_change(current: float | None, previous: float | None) -> str:
+    if current is None or not previous:
+        return "n/a"
+    return f"{(current - previous) / previous * 100:+.1f}%"
 
 
 class DBHealthCog(commands.Cog):
@@ -68,131 +80,34 @@ class DBHealthCog(commands.Cog):
         self._lock = threading.RLock()
         self._started_at = time.time()
         self._last_sqlite_snapshot: dict[str, Any] = {}
-        self._latency_samples_ms: deque[float] = deque(maxlen=5000)
-
-        self._db_stats: dict[str, Any] = {
-            "ops_total": 0,
-            "reads": 0,
-            "writes": 0,
-            "errors": 0,
-            "locked_errors": 0,
-            "total_ms": 0.0,
-            "max_ms": 0.0,
-            "by_op": {},
-        }
 
-        self._traffic_totals: dict[str, int] = {
-            "messages": 0,
-            "commands": 0,
-            "presence_updates": 0,
-            "member_updates": 0,
-        }
-        self._traffic_by_guild: dict[int, dict[str, int]] = defaultdict(
-            lambda: {
-                "messages": 0,
-                "commands": 0,
-                "presence_updates": 0,
-                "member_updates": 0,
-            }
+        self._traffic_totals: dict[str, int] = dict.fromkeys(TRAFFIC_KINDS, 0)
+        self._traffic_by_guild = {kind: SpaceSaving(TOP_GUILDS_CAPACITY) for kind in TRAFFIC_KINDS}
+        self._rates = RateTracker(RATE_WINDOWS, interval=RATE_SAMPLE_SEC)
+        self._history = MetricsHistory(
+            os.getenv("METRICS_HISTORY_FILE") or str(Path(db.DB_FILE).with_name("metrics_history.db"))
         )
+        self._history_previous: tuple[dict[str, int], LogHistogram] | None = None
 
-        self._patch_database_layer()
         self._refresh_sqlite_snapshot()
         self.sqlite_sampler.start()
+        self.rate_sampler.start()
+        self.history_recorder.start()
 
-    def cog_unload(self):
+    async def cog_unload(self):
         self.sqlite_sampler.cancel()
-        self._unpatch_database_layer()
-
-    # ------------------------------------------------------------------
-    # Safe monkey patch for database.py
-    # ------------------------------------------------------------------
-    def _patch_database_layer(self):
-        state = getattr(db, "_db_health_probe_state", None)
-        if state is None:
-            state = {"refcount": 0, "originals": {}}
-            db._db_health_probe_state = state
-
-        state["refcount"] += 1
-        if state["refcount"] > 1:
-            return
-
-        for func_name in READ_DB_FUNCS | WRITE_DB_FUNCS:
-            original = getattr(db, func_name, None)
-            if not callable(original):
-                continue
-
-            state["originals"][func_name] = original
-            kind = "read" if func_name in READ_DB_FUNCS else "write"
-
-            @wraps(original)
-            def wrapper(*args, __func_name=func_name, __kind=kind, __original=original, **kwargs):
-                started = time.perf_counter()
-                error: Exception | None = None
-                try:
-                    return __original(*args, **kwargs)
-                except Exception as exc:
-                    error = exc
-                    raise
-                finally:
-                    elapsed_ms = (time.perf_counter() - started) * 1000.0
-                    self._record_db_call(__func_name, __kind, elapsed_ms, error)
-
-            setattr(db, func_name, wrapper)
-
-    def _unpatch_database_layer(self):
-        state = getattr(db, "_db_health_probe_state", None)
-        if not state:
-            return
-
-        state["refcount"] -= 1
-        if state["refcount"] > 0:
-            return
-
-        for func_name, original in state["originals"].items():
-            setattr(db, func_name, original)
-        state["originals"].clear()
+        self.rate_sampler.cancel()
+        self.history_recorder.cancel()
+        await self._flush_history()
 
     # ------------------------------------------------------------------
     # Runtime recording
     # ------------------------------------------------------------------
-    def _record_db_call(self, func_name: str, kind: str, elapsed_ms: float, error: Exception | None):
-        with self._lock:
-            self._db_stats["ops_total"] += 1
-            if kind == "write":
-                self._db_stats["writes"] += 1
-            else:
-                self._db_stats["reads"] += 1
-
-            self._db_stats["total_ms"] += elapsed_ms
-            self._db_stats["max_ms"] = max(self._db_stats["max_ms"], elapsed_ms)
-            self._latency_samples_ms.append(elapsed_ms)
-
-            op = self._db_stats["by_op"].get(func_name)
-            if op is None:
-                op = {
-                    "kind": kind,
-                    "count": 0,
-                    "errors": 0,
-                    "total_ms": 0.0,
-                    "max_ms": 0.0,
-                }
-                self._db_stats["by_op"][func_name] = op
-            op["count"] += 1
-            op["total_ms"] += elapsed_ms
-            op["max_ms"] = max(op["max_ms"], elapsed_ms)
-
-            if error is not None:
-                self._db_stats["errors"] += 1
-                op["errors"] += 1
-                if "locked" in str(error).lower():
-                    self._db_stats["locked_errors"] += 1
-
     def _record_traffic(self, kind: str, guild_id: int | None):
         with self._lock:
             self._traffic_totals[kind] += 1
             if guild_id is not None:
-                self._traffic_by_guild[guild_id][kind] += 1
+                self._traffic_by_guild[kind].add(guild_id)
 
     @commands.Cog.listener("on_message")
     async def on_message_probe(self, message: discord.Message):
@@ -212,10 +127,63 @@ class DBHealthCog(commands.Cog):
     async def on_member_update_probe(self, before: discord.Member, after: discord.Member):
         self._record_traffic("member_updates", after.guild.id if after.guild else None)
 
+    # ------------------------------------------------------------------
+    # Rate sampling
+    # ------------------------------------------------------------------
+    def _counter_totals(self) -> dict[str, int]:
+        with self._lock:
+            traffic = dict(self._traffic_totals)
+        return {**db.query_registry.totals(), **traffic}
+
+    @tasks.loop(seconds=RATE_SAMPLE_SEC)
+    @timed_task("db_health.rate_sampler")
+    async def rate_sampler(self):
+        totals = self._counter_totals()
+        with self._lock:
+            self._rates.sample(totals)
+
+    # ------------------------------------------------------------------
+    # Metrics history
+    # ------------------------------------------------------------------
+    def _history_values(self) -> dict[str, float] | None:
+        """Resumen del último minuto; ``None`` en la primera llamada."""
+        counters = self._counter_totals()
+        sketch = db.query_registry.latency_sketch()
+        previous, self._history_previous = self._history_previous, (counters, sketch)
+        if previous is None:
+            return None
+        old_counters, old_sketch = previous
+        values: dict[str, float] = {
+            metric: max(counters[key] - old_counters[key], 0) for key, metric in HISTORY_COUNTERS.items()
+        }
+        minute = sketch.difference(old_sketch)
+        if minute.count:
+            quantiles = minute.quantiles(HISTORY_QUANTILES.values())
+            values.update(zip(HISTORY_QUANTILES, quantiles, strict=True))
+        return values
+
+    @tasks.loop(minutes=1)
+    @timed_task("db_health.history_recorder")
+    async def history_recorder(self):
+        values = self._history_values()
+        if values is not None:
+            self._history.record(int(time.time()) - 60, values)
+        if self.history_recorder.current_loop % HISTORY_FLUSH_MINUTES == 0:
+            await self._flush_history()
+
+    async def _flush_history(self) -> None:
+        if not self._history.pending:
+            return
+        try:
+            await asyncio.to_thread(self._history.flush)
+        except sqlite3.Error as exc:
+            log.warning(f"No se pudo guardar el historial de métricas: {exc}")
+
     # ------------------------------------------------------------------
     # SQLite system snapshot
     # ------------------------------------------------------------------
     @tasks.loop(minutes=1)
+    @timed_task("db_health.sqlite_sampler")
     async def sqlite_sampler(self):
         self._refresh_sqlite_snapshot()
 
@@ -255,74 +223,112 @@ class DBHealthCog(commands.Cog):
     # ------------------------------------------------------------------
     # Evaluation
     # ------------------------------------------------------------------
-    def _p95_latency_ms(self) -> float:
-        with self._lock:
-            if not self._latency_samples_ms:
-                return 0.0
-            values = sorted(self._latency_samples_ms)
-        idx = int(0.95 * (len(values) - 1))
-        return values[idx]
+    @staticmethod
+    def _db_totals(registry_snapshot: dict[str, Any]) -> dict[str, Any]:
+        """Agrega las métricas por consulta del registro de ``database.py``."""
+        totals: dict[str, Any] = {
+            "ops_total": 0,
+            "reads": 0,
+            "writes": 0,
+            "errors": 0,
+            "locked_errors": 0,
+            "total_ms": 0.0,
+            "max_ms": 0.0,
+            "top_ops": [],
+        }
+        for name, data in registry_snapshot["queries"].items():
+            count = data["count"]
+            totals["ops_total"] += count
+            totals["reads" if data["kind"] == "read" else "writes"] += count
+            totals["errors"] += data["errors"]
+            totals["locked_errors"] += data["locked_errors"]
+            totals["total_ms"] += data["total_ms"]
+            totals["max_ms"] = max(totals["max_ms"], data["max_ms"])
+            quantiles = data["quantiles_ms"]
+            totals["top_ops"].append(
+                {
+                    "op": name,
+                    "kind": data["kind"],
+                    "count": count,
+                    "errors": data["errors"],
+                    "avg_ms": (data["total_ms"] / count) if count else 0.0,
+                    "max_ms": data["max_ms"],
+                    "p50_ms": quantiles["p50"],
+                    "p95_ms": quantiles["p95"],
+                    "p99_ms": quantiles["p99"],
+                }
+            )
+        totals["top_ops"].sort(key=lambda x: x["count"], reverse=True)
+        return totals
+
+    @staticmethod
+    def _detect_bursts(rates: dict[str, dict[str, float]]) -> list[dict[str, Any]]:
+        bursts = []
+        for series in BURST_SERIES:
+            recent = rates[series]["1m"]
+            baseline = rates[series]["1h"]
+            if recent >= BURST_MIN_PER_MIN and recent >= BURST_FACTOR * baseline:
+                bursts.append({"series": series, "rate_1m": recent, "rate_1h": baseline})
+        return bursts
 
     def _snapshot(self) -> dict[str, Any]:
+        registry_snapshot = db.query_registry.snapshot()
+        totals = self._db_totals(registry_snapshot)
+        counters = self._counter_totals()
         with self._lock:
             uptime_sec = max(time.time() - self._started_at, 0.001)
-            totals = dict(self._db_stats)
             traffic = dict(self._traffic_totals)
             sqlite_info = dict(self._last_sqlite_snapshot)
-            top_ops_raw = []
-            for op_name, data in totals["by_op"].items():
-                count = data["count"]
-                top_ops_raw.append(
-                    {
-                        "op": op_name,
-                        "kind": data["kind"],
-                        "count": count,
-                        "errors": data["errors"],
-                        "avg_ms": (data["total_ms"] / count) if count else 0.0,
-                        "max_ms": data["max_ms"],
-                    }
-                )
-            top_ops_raw.sort(key=lambda x: x["count"], reverse=True)
-
-            guild_rows = []
-            for guild_id, gdata in self._traffic_by_guild.items():
-                guild_rows.append(
-                    {
-                        "guild_id": guild_id,
-                        "messages": gdata["messages"],
-                        "commands": gdata["commands"],
-                        "presence_updates": gdata["presence_updates"],
-                        "member_updates": gdata["member_updates"],
-                    }
-                )
-            guild_rows.sort(key=lambda x: x["messages"], reverse=True)
+            rates = self._rates.rates(counters)
+            recent, recent_span = self._rates.increase(counters, RATE_WINDOWS["1h"])
+
+            # Conteos de Space-Saving: cota superior, exactos mientras quepan
+            # todos los servidores en la tabla.
+            sketches = self._traffic_by_guild
+            guild_ids = set().union(*(sketch.keys() for sketch in sketches.values()))
+            guild_rows = [
+                {"guild_id": guild_id, **{kind: sketches[kind].count(guild_id) for kind in TRAFFIC_KINDS}}
+                for guild_id in guild_ids
+            ]
+            tracked_guilds = {kind: len(sketch) for kind, sketch in sketches.items()}
+        guild_rows.sort(key=lambda x: (x["messages"], sum(x[kind] for kind in TRAFFIC_KINDS)), reverse=True)
 
         ops = totals["ops_total"]
         avg_ms = (totals["total_ms"] / ops) if ops else 0.0
 
         return {
             "uptime_sec": uptime_sec,
+            "rate_window": RATE_WINDOW,
+            "bursts": self._detect_bursts(rates),
             "db": {
                 "ops_total": ops,
                 "reads": totals["reads"],
                 "writes": totals["writes"],
                 "errors": totals["errors"],
                 "locked_errors": totals["locked_errors"],
+                "errors_1h": int(recent["errors"]),
+                "locked_errors_1h": int(recent["locked_errors"]),
+                "recent_span_sec": recent_span,
                 "avg_ms": avg_ms,
                 "max_ms": totals["max_ms"],
-                "p95_ms": self._p95_latency_ms(),
-                "ops_per_min": ops / (uptime_sec / 60.0),
-                "reads_per_min": totals["reads"] / (uptime_sec / 60.0),
-                "writes_per_min": totals["writes"] / (uptime_sec / 60.0),
-                "top_ops": top_ops_raw[:10],
+                "p50_ms": registry_snapshot["quantiles_ms"]["p50"],
+                "p95_ms": registry_snapshot["quantiles_ms"]["p95"],
+                "p99_ms": registry_snapshot["quantiles_ms"]["p99"],
+                "ops_per_min": rates["ops"][RATE_WINDOW],
+                "reads_per_min": rates["reads"][RATE_WINDOW],
+                "writes_per_min": rates["writes"][RATE_WINDOW],
+                "rates": {series: rates[series] for series in ("ops", "reads", "writes", "errors")},
+                "top_ops": totals["top_ops"][:10],
             },
             "traffic": {
                 **traffic,
-                "messages_per_min": traffic["messages"] / (uptime_sec / 60.0),
-                "commands_per_min": traffic["commands"] / (uptime_sec / 60.0),
-                "presence_per_min": traffic["presence_updates"] / (uptime_sec / 60.0),
-                "member_updates_per_min": traffic["member_updates"] / (uptime_sec / 60.0),
+                "messages_per_min": rates["messages"][RATE_WINDOW],
+                "commands_per_min": rates["commands"][RATE_WINDOW],
+                "presence_per_min": rates["presence_updates"][RATE_WINDOW],
+                "member_updates_per_min": rates["member_updates"][RATE_WINDOW],
+                "rates": {kind: rates[kind] for kind in TRAFFIC_KINDS},
                 "top_guilds": guild_rows[:10],
+                "tracked_guilds": tracked_guilds,
             },
             "sqlite": sqlite_info,
         }
@@ -332,22 +338,33 @@ class DBHealthCog(commands.Cog):
         reasons = []
         level = "green"
 
-        if dbs["locked_errors"] >= 3:
+        # Errores y tasas se evalúan sobre la última hora y los últimos
+        # minutos, no desde el arranque, para que un pico se note enseguida.
+        window = snapshot["rate_window"]
+        if dbs["locked_errors_1h"] >= 3:
             level = "red"
-            reasons.append(f"{dbs['locked_errors']} errores de lock detectados.")
-        elif dbs["locked_errors"] > 0:
+            reasons.append(f"{dbs['locked_errors_1h']} errores de lock en la última hora.")
+        elif dbs["locked_errors_1h"] > 0:
             level = "orange"
-            reasons.append(f"{dbs['locked_errors']} errores de lock detectados.")
+            reasons.append(f"{dbs['locked_errors_1h']} errores de lock en la última hora.")
 
         if dbs["writes_per_min"] >= 180:
             level = "red"
-            reasons.append(f"Escrituras muy altas ({dbs['writes_per_min']:.1f}/min).")
+            reasons.append(f"Escrituras muy altas ({dbs['writes_per_min']:.1f}/min en {window}).")
         elif dbs["writes_per_min"] >= 80 and level in ("green", "yellow"):
             level = "orange"
-            reasons.append(f"Escrituras altas ({dbs['writes_per_min']:.1f}/min).")
+            reasons.append(f"Escrituras altas ({dbs['writes_per_min']:.1f}/min en {window}).")
         elif dbs["writes_per_min"] >= 40 and level == "green":
             level = "yellow"
-            reasons.append(f"Escrituras moderadas ({dbs['writes_per_min']:.1f}/min).")
+            reasons.append(f"Escrituras moderadas ({dbs['writes_per_min']:.1f}/min en {window}).")
+
+        for burst in snapshot["bursts"]:
+            if level == "green":
+                level = "yellow"
+            reasons.append(
+                f"Pico de {burst['series']}: {burst['rate_1m']:.1f}/min en el último minuto "
+                f"frente a {burst['rate_1h']:.1f}/min en 1h."
+            )
 
         if dbs["p95_ms"] >= 40:
             level = "red"
@@ -359,9 +376,9 @@ class DBHealthCog(commands.Cog):
             level = "yellow"
             reasons.append(f"Latencia promedio moderada ({dbs['avg_ms']:.2f} ms).")
 
-        if dbs["errors"] >= 10:
+        if dbs["errors_1h"] >= 10:
             level = "red"
-            reasons.append(f"Errores de DB altos ({dbs['errors']}).")
+            reasons.append(f"Errores de DB altos ({dbs['errors_1h']} en la última hora).")
 
         if not reasons:
             reasons.append("Sin señales de saturación.")
@@ -394,6 +411,7 @@ class DBHealthCog(commands.Cog):
             "reasons": reasons,
             "keep_sqlite": keep_sqlite,
             "color": color,
+            "bursts": [burst["series"] for burst in snapshot["bursts"]],
         }
 
     # ------------------------------------------------------------------
@@ -426,7 +444,9 @@ class DBHealthCog(commands.Cog):
         for item in rows[:10]:
             lines.append(
                 f"{item['op']} [{item['kind']}] | count={item['count']} | "
-                f"avg={item['avg_ms']:.2f}ms | max={item['max_ms']:.2f}ms | err={item['errors']}"
+                f"avg={item['avg_ms']:.2f}ms | p50={item['p50_ms']:.2f}ms | "
+                f"p95={item['p95_ms']:.2f}ms | p99={item['p99_ms']:.2f}ms | "
+                f"max={item['max_ms']:.2f}ms | err={item['errors']}"
             )
         text = "```txt\n" + "\n".join(lines) + "\n```"
         await ctx.reply(text, mention_author=False)
@@ -454,6 +474,25 @@ class DBHealthCog(commands.Cog):
         text = "```txt\n" + "\n".join(lines) + "\n```"
         await ctx.reply(text, mention_author=False)
 
+    @dbhealth.command(name="roles")
+    async def dbhealth_roles(self, ctx: commands.Context):
+        if not self._can_use_commands(ctx):
+            await ctx.reply("No tienes permisos para usar este módulo.", mention_author=False)
+            return
+
+        stats = role_reconciler.snapshot()
+        lines = [
+            f"requests={stats['requests']} | coalesced={stats['coalesced_requests']}",
+            f"rest_calls={stats['rest_calls']} | saved={stats['rest_calls_saved']} | "
+            f"noop={stats['noop_flushes']}",
+            f"bucket_waits={stats['rate_limit_waits']} | "
+            f"wait={stats['rate_limit_wait_sec']:.2f}s | http_429={stats['http_429']}",
+            f"errors={stats['errors']} | pending={stats['pending_members']} | "
+            f"guilds={stats['tracked_guilds']}",
+        ]
+        text = "```txt\n" + "\n".join(lines) + "\n```"
+        await ctx.reply(text, mention_author=False)
+
     @dbhealth.command(name="raw")
     async def dbhealth_raw(self, ctx: commands.Context):
         if not self._can_use_commands(ctx):
@@ -482,34 +521,83 @@ class DBHealthCog(commands.Cog):
 
         with self._lock:
             self._started_at = time.time()
-            self._latency_samples_ms.clear()
-            self._db_stats = {
-                "ops_total": 0,
-                "reads": 0,
-                "writes": 0,
-                "errors": 0,
-                "locked_errors": 0,
-                "total_ms": 0.0,
-                "max_ms": 0.0,
-                "by_op": {},
-            }
-            self._traffic_totals = {
-                "messages": 0,
-                "commands": 0,
-                "presence_updates": 0,
-                "member_updates": 0,
-            }
-            self._traffic_by_guild = defaultdict(
-                lambda: {
-                    "messages": 0,
-                    "commands": 0,
-                    "presence_updates": 0,
-                    "member_updates": 0,
-                }
-            )
+            self._traffic_totals = dict.fromkeys(TRAFFIC_KINDS, 0)
+            for sketch in self._traffic_by_guild.values():
+                sketch.clear()
+            self._rates.clear()
+            self._history_previous = None
+        db.query_registry.reset()
+        role_reconciler.reset_stats()
         self._refresh_sqlite_snapshot()
         await ctx.reply("Métricas de DB health reiniciadas.", mention_author=False)
 
+    @dbhealth.command(name="trends")
+    async def dbhealth_trends(self, ctx: commands.Context, metric: str | None = None, period: str = "7d"):
+        """Compara un periodo del historial con el anterior: `dbhealth trends [métrica] [7d|24h]`."""
+        if not self._can_use_commands(ctx):
+            await ctx.reply("No tienes permisos para usar este módulo.", mention_author=False)
+            return
+        if metric is not None and parse_period(metric) is not None:
+            metric, period = None, metric
+        seconds = parse_period(period)
+        if seconds is None:
+            await ctx.reply(
+                "Periodo no válido. Usa horas o días, por ejemplo `24h` o `7d`.", mention_author=False
+            )
+            return
+        if metric is not None and metric not in HISTORY_METRICS:
+            await ctx.reply(
+                f"Métrica desconocida. Disponibles: {', '.join(HISTORY_METRICS)}.", mention_author=False
+            )
+            return
+
+        await self._flush_history()
+        now = time.time()
+        try:
+            current = await asyncio.to_thread(self._history.summaries, now - seconds, now)
+            previous = await asyncio.to_thread(self._history.summaries, now - 2 * seconds, now - seconds)
+            points = (
+                await asyncio.to_thread(self._history.series, metric, now - seconds, now) if metric else []
+            )
+        except sqlite3.Error as exc:
+            await ctx.reply(f"No se pudo leer el historial: {exc}", mention_author=False)
+            return
+        if not current:
+            await ctx.reply("Aún no hay historial de métricas para ese periodo.", mention_author=False)
+            return
+
+        if metric is None:
+            lines = [f"{'métrica':<18} | {'media':>10} | {'anterior':>10} | cambio"]
+            for name in HISTORY_METRICS:
+                if name not in current:
+                    continue
+                value = current[name]["value"]
+                before = previous.get(name, {}).get("value")
+                before_text = f"{before:>10.2f}" if before is not None else f"{'-':>10}"
+                lines.append(f"{name:<18} | {value:>10.2f} | {before_text} | {format_change(value, before)}")
+            header = f"Media por minuto en {period} frente a los {period} anteriores"
+            await ctx.reply(f"{header}\n```txt\n" + "\n".join(lines) + "\n```", mention_author=False)
+            return
+
+        now_stats = current.get(metric)
+        before_stats = previous.get(metric)
+        if now_stats is None:
+            await ctx.reply("Aún no hay datos de esa métrica en el periodo.", mention_author=False)
+            return
+        lines = [
+            sparkline([point["value"] for point in points]),
+            f"media={now_stats['value']:.2f} | max={now_stats['maximum']:.2f} | min={now_stats['minimum']:.2f}",
+        ]
+        if before_stats is not None:
+            lines.append(
+                f"anterior media={before_stats['value']:.2f} | max={before_stats['maximum']:.2f} | "
+                f"cambio={format_change(now_stats['value'], before_stats['value'])}"
+            )
+        await ctx.reply(
+            f"**{metric}** en {period} ({len(points)} puntos)\n```txt\n" + "\n".join(lines) + "\n```",
+            mention_author=False,
+        )
+
     async def _send_summary(self, ctx: commands.Context):
         snap = self._snapshot()
         rec = self._recommendation(snap)
@@ -534,23 +622,25 @@ class DBHealthCog(commands.Cog):
         embed.add_field(
             name="DB Rendimiento",
             value=(
-                f"Avg: **{dbs['avg_ms']:.2f}ms**\n"
-                f"P95: **{dbs['p95_ms']:.2f}ms**\n"
+                f"Avg: **{dbs['avg_ms']:.2f}ms** | P50: **{dbs['p50_ms']:.2f}ms**\n"
+                f"P95: **{dbs['p95_ms']:.2f}ms** | P99: **{dbs['p99_ms']:.2f}ms**\n"
                 f"Max: **{dbs['max_ms']:.2f}ms**"
             ),
             inline=True,
         )
         embed.add_field(
-            name="DB Rate (/min)",
+            name=f"DB Rate (/min, {snap['rate_window']})",
             value=(
-                f"Ops: **{dbs['ops_per_min']:.1f}**\n"
+                f"Ops: **{dbs['ops_per_min']:.1f}** (1m {dbs['rates']['ops']['1m']:.1f} · "
+                f"1h {dbs['rates']['ops']['1h']:.1f})\n"
                 f"Reads: **{dbs['reads_per_min']:.1f}**\n"
-                f"Writes: **{dbs['writes_per_min']:.1f}**"
+                f"Writes: **{dbs['writes_per_min']:.1f}** (1m {dbs['rates']['writes']['1m']:.1f} · "
+                f"1h {dbs['rates']['writes']['1h']:.1f})"
             ),
             inline=True,
         )
         embed.add_field(
-            name="Tráfico Bot (/min)",
+            name=f"Tráfico Bot (/min, {snap['rate_window']})",
             value=(
                 f"Msg: **{trf['messages_per_min']:.1f}**\n"
                 f"Cmd: **{trf['commands_per_min']:.1f}**\n"
@@ -577,7 +667,10 @@ class DBHealthCog(commands.Cog):
             inline=False,
         )
         embed.set_footer(
-            text=("Comandos: c!dbhealth top | c!dbhealth guilds | c!dbhealth raw | c!dbhealth reset")
+            text=(
+                "Comandos: c!dbhealth top | c!dbhealth guilds | c!dbhealth trends | "
+                "c!dbhealth raw | c!dbhealth reset"
+            )
         )
         await ctx.reply(embed=embed, mention_author=False)
 
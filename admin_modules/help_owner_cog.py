@@ -4,6 +4,8 @@ import discord
 from discord import ui
 from discord.ext import commands
 
+from command_utils import EmbedPageCache
+
 OWNER_ID = int(os.getenv("OWNER_ID", "0"))
 
 
@@ -39,12 +41,25 @@ def get_owner_help_embeds() -> list[discord.Embed]:
     )
     overview.add_field(
         name="DB Health",
-        value="`c!dbhealth`, `dbhealth top`, `dbhealth guilds`, `dbhealth raw`, `dbhealth reset`",
+        value=(
+            "`c!dbhealth`, `dbhealth top`, `dbhealth guilds`, `dbhealth roles`, "
+            "`dbhealth trends`, `dbhealth raw`, `dbhealth reset`"
+        ),
+        inline=False,
+    )
+    overview.add_field(
+        name="Loop Health",
+        value="`c!loophealth`, `loophealth raw`, `loophealth reset`",
+        inline=False,
+    )
+    overview.add_field(
+        name="Metrics",
+        value="`c!handlers [orden] [limite]`, `handlers reset`",
         inline=False,
     )
     overview.add_field(
         name="Perm Inspector",
-        value="`c!modcheck`, `modcheckall`, `why_modview`, `roleperms`, `auditroles`, `whocan`",
+        value="`c!modcheck`, `modcheckall`, `why_modview`, `roleperms`, `auditroles`, `whocan`, `permcache`",
         inline=False,
     )
     overview.add_field(
@@ -144,6 +159,16 @@ def get_owner_help_embeds() -> list[discord.Embed]:
     db_health.add_field(
         name="`dbhealth guilds`", value="Top de servidores por trafico medido por el monitor.", inline=False
     )
+    db_health.add_field(
+        name="`dbhealth roles`",
+        value="Cambios de roles combinados, llamadas REST ahorradas y esperas del bucket.",
+        inline=False,
+    )
+    db_health.add_field(
+        name="`dbhealth trends [metrica] [7d|24h]`",
+        value="Historial guardado: compara el periodo con el anterior y dibuja la tendencia.",
+        inline=False,
+    )
     db_health.add_field(
         name="`dbhealth raw`", value="Reporte JSON completo del snapshot y la recomendacion.", inline=False
     )
@@ -152,6 +177,40 @@ def get_owner_help_embeds() -> list[discord.Embed]:
     )
     db_health.set_footer(text="Modulo: db_health_cog.py")
 
+    loop_health = discord.Embed(
+        title="Loop Health",
+        description="Retraso del bucle de asyncio y callbacks que lo bloquean.",
+        color=discord.Color.red(),
+    )
+    loop_health.add_field(
+        name="`c!loophealth` / `c!looplag`",
+        value="Retraso actual, P95 y maximo, con los ultimos callbacks lentos y su pila.",
+        inline=False,
+    )
+    loop_health.add_field(
+        name="`loophealth raw`", value="Snapshot JSON con todas las pilas registradas.", inline=False
+    )
+    loop_health.add_field(name="`loophealth reset`", value="Resetea las metricas del bucle.", inline=False)
+    loop_health.set_footer(text="Modulo: loop_health_cog.py")
+
+    metrics_info = discord.Embed(
+        title="Metrics",
+        description="Metricas Prometheus y coste de cada listener y comando.",
+        color=discord.Color.purple(),
+    )
+    metrics_info.add_field(
+        name="`c!handlers [total|avg|p95|max|errors|count] [limite]`",
+        value="Listeners y comandos mas costosos, con errores y ejecuciones en curso.",
+        inline=False,
+    )
+    metrics_info.add_field(name="`handlers reset`", value="Resetea las metricas de handlers.", inline=False)
+    metrics_info.add_field(
+        name="Prometheus",
+        value="Con `METRICS_PORT` definido, `/metrics` escucha en `METRICS_HOST` (127.0.0.1).",
+        inline=False,
+    )
+    metrics_info.set_footer(text="Modulo: metrics_cog.py")
+
     perms = discord.Embed(
         title="Permission Inspector",
         description="Auditoria de permisos de moderacion y gestion.",
@@ -192,6 +251,11 @@ def get_owner_help_embeds() -> list[discord.Embed]:
         ),
         inline=False,
     )
+    perms.add_field(
+        name="`c!permcache`",
+        value="Entradas, aciertos e invalidaciones de la matriz de permisos cacheada.",
+        inline=False,
+    )
     perms.set_footer(text="Modulo: perm_inspector_cog.py")
 
     logging_info = discord.Embed(
@@ -216,33 +280,45 @@ def get_owner_help_embeds() -> list[discord.Embed]:
     )
     logging_info.set_footer(text="Modulo: logging_cog.py")
 
-    return [overview, owner_core, devtools, db_health, perms, logging_info]
+    return [overview, owner_core, devtools, db_health, loop_health, metrics_info, perms, logging_info]
+
+
+# La ayuda del owner solo existe en español; la clave de la caché es fija.
+OWNER_HELP_LANG = "es"
+owner_help_pages = EmbedPageCache(lambda _lang: get_owner_help_embeds(), name="owner_help_pages")
+
+OWNER_HELP_SECTIONS = (
+    ("Resumen", "Todos los comandos admin activos"),
+    ("Owner Core", "Servers, slashsync y presence"),
+    ("DevTools", "Carga y recarga de modulos"),
+    ("DB Health", "Monitor SQLite y trafico"),
+    ("Loop Health", "Retraso del bucle y callbacks lentos"),
+    ("Metrics", "Latencia por listener y comando"),
+    ("Permission Inspector", "Auditoria de permisos"),
+    ("Logging", "Registro en archivo"),
+)
 
 
 class OwnerHelpSelect(ui.Select):
-    def __init__(self, embeds: list[discord.Embed]):
+    def __init__(self):
         options = [
-            discord.SelectOption(label="Resumen", description="Todos los comandos admin activos", value="0"),
-            discord.SelectOption(label="Owner Core", description="Servers, slashsync y presence", value="1"),
-            discord.SelectOption(label="DevTools", description="Carga y recarga de modulos", value="2"),
-            discord.SelectOption(label="DB Health", description="Monitor SQLite y trafico", value="3"),
-            discord.SelectOption(label="Perm Inspector", description="Auditoria de permisos", value="4"),
-            discord.SelectOption(label="Logging", description="Registro en archivo", value="5"),
+            discord.SelectOption(label=label, description=description, value=str(index))
+            for index, (label, description) in enumerate(OWNER_HELP_SECTIONS)
         ]
         super().__init__(
             placeholder="Elige una seccion owner...", min_values=1, max_values=1, options=options
         )
-        self.embeds = embeds
 
     async def callback(self, interaction: discord.Interaction):
-        await interaction.response.edit_message(embed=self.embeds[int(self.values[0])], view=self.view)
+        embed = owner_help_pages.embed(OWNER_HELP_LANG, int(self.values[0]))
+        await interaction.response.edit_message(embed=embed, view=self.view)
 
 
 class OwnerHelpView(ui.View):
-    def __init__(self, embeds: list[discord.Embed], owner_id: int):
+    def __init__(self, owner_id: int):
         super().__init__(timeout=180)
         self.owner_id = owner_id
-        self.add_item(OwnerHelpSelect(embeds))
+        self.add_item(OwnerHelpSelect())
 
     async def interaction_check(self, interaction: discord.Interaction) -> bool:
         if interaction.user.id != self.owner_id:
@@ -259,6 +335,10 @@ class OwnerHelpCog(commands.Cog):
 
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        owner_help_pages.pages(OWNER_HELP_LANG)
+
+    def cog_unload(self):
+        owner_help_pages.clear()
 
     @commands.Cog.listener()
     async def on_command_error(self, ctx: commands.Context, err: commands.CommandError):
@@ -273,9 +353,8 @@ class OwnerHelpCog(commands.Cog):
     @owner_only()
     async def owner_help(self, ctx: commands.Context):
         """Muestra el menu de ayuda de modulos exclusivos del owner."""
-        embeds = get_owner_help_embeds()
-        view = OwnerHelpView(embeds, ctx.author.id)
-        await ctx.reply(embed=embeds[0], view=view, mention_author=False)
+        view = OwnerHelpView(ctx.author.id)
+        await ctx.reply(embed=owner_help_pages.embed(OWNER_HELP_LANG, 0), view=view, mention_author=False)
 
 
 async def setup(bot: commands.Bot):
@@ -0,0 +1,123 @@
+"""
+🫀 Loop Health Module
+Mide el retraso del bucle de asyncio y registra los callbacks que lo bloquean.
+
+El umbral de callback lento se puede cambiar con ``LOOP_SLOW_CALLBACK_MS``
+(por defecto 100 ms).
+"""
+
+import io
+import json
+import os
+from collections.abc import Iterable
+
+import discord
+from discord.ext import commands
+
+from loop_health import SLOW_CALLBACK_SEC, loop_monitor
+from metrics import Family, metrics
+
+MAX_LISTED_CALLBACKS = 5
+STACK_PREVIEW_CHARS = 600
+
+
+class LoopHealthCog(commands.Cog):
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+
+    async def cog_load(self):
+        threshold_ms = float(os.getenv("LOOP_SLOW_CALLBACK_MS") or SLOW_CALLBACK_SEC * 1000)
+        loop_monitor.slow_threshold = threshold_ms / 1000
+        await loop_monitor.start()
+        metrics.add_collector("loop_health", self._collect)
+
+    async def cog_unload(self):
+        metrics.remove_collector("loop_health")
+        await loop_monitor.stop()
+
+    def _collect(self) -> Iterable[Family]:
+        stats = loop_monitor.snapshot()["stats"]
+        yield (
+            "copydc_event_loop_lag_max_seconds",
+            "gauge",
+            "Mayor retraso del bucle desde el último reinicio del monitor.",
+            [("", {}, stats["lag_max_ms"] / 1000)],
+        )
+
+    def _can_use_commands(self, ctx: commands.Context) -> bool:
+        return ctx.author.id == ctx.bot.owner_id
+
+    @commands.group(name="loophealth", aliases=["looplag"], invoke_without_command=True)
+    async def loophealth(self, ctx: commands.Context):
+        """Retraso del bucle de asyncio y últimos callbacks lentos."""
+        if not self._can_use_commands(ctx):
+            await ctx.reply("No tienes permisos para usar este módulo.", mention_author=False)
+            return
+
+        snap = loop_monitor.snapshot()
+        stats = snap["stats"]
+        events = snap["slow_callbacks"]
+        slow = stats["lag_over_threshold"] or stats["slow_callbacks"]
+        embed = discord.Embed(
+            title="🫀 Loop Health",
+            description=(
+                f"Monitor: **{'activo' if stats['installed'] else 'inactivo'}** | "
+                f"Umbral: **{stats['slow_threshold_ms']:.0f}ms**"
+            ),
+            color=0xFEE75C if slow else 0x57F287,
+        )
+        embed.add_field(
+            name="Retraso del bucle",
+            value=(
+                f"Último: **{stats['lag_last_ms']:.2f}ms**\n"
+                f"Avg: **{stats['lag_avg_ms']:.2f}ms** | P95: **{stats['lag_p95_ms']:.2f}ms**\n"
+                f"Max: **{stats['lag_max_ms']:.2f}ms** | Muestras: **{stats['lag_samples']}**"
+            ),
+            inline=True,
+        )
+        embed.add_field(
+            name="Callbacks lentos",
+            value=(
+                f"Total: **{stats['slow_callbacks']}**\n"
+                f"Max: **{stats['slow_max_ms']:.2f}ms**\n"
+                f"Retrasos sobre umbral: **{stats['lag_over_threshold']}**"
+            ),
+            inline=True,
+        )
+        if events:
+            lines = [
+                f"{event['at']} | {event['duration_ms']:.1f}ms | {event['callback']}"
+                for event in reversed(events[-MAX_LISTED_CALLBACKS:])
+            ]
+            embed.add_field(name="Últimos", value="```txt\n" + "\n".join(lines) + "\n```", inline=False)
+            stack = events[-1]["stack"][-STACK_PREVIEW_CHARS:] or "(sin pila)"
+            embed.add_field(name="Pila del último", value=f"```txt\n{stack}\n```", inline=False)
+        embed.set_footer(text="Comandos: c!loophealth | c!loophealth raw | c!loophealth reset")
+        await ctx.reply(embed=embed, mention_author=False)
+
+    @loophealth.command(name="raw")
+    async def loophealth_raw(self, ctx: commands.Context):
+        if not self._can_use_commands(ctx):
+            await ctx.reply("No tienes permisos para usar este módulo.", mention_author=False)
+            return
+
+        pretty = json.dumps(loop_monitor.snapshot(), indent=2, ensure_ascii=False)
+        if len(pretty) <= 3500:
+            await ctx.reply(f"```json\n{pretty}\n```", mention_author=False)
+            return
+
+        report = io.BytesIO(pretty.encode("utf-8"))
+        await ctx.reply(file=discord.File(report, filename="loophealth_report.json"), mention_author=False)
+
+    @loophealth.command(name="reset")
+    async def loophealth_reset(self, ctx: commands.Context):
+        if not self._can_use_commands(ctx):
+            await ctx.reply("Solo el owner puede resetear métricas.", mention_author=False)
+            return
+
+        loop_monitor.reset()
+        await ctx.reply("Métricas del bucle reiniciadas.", mention_author=False)
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(LoopHealthCog(bot))
@@ -0,0 +1,288 @@
+"""
+📈 Metrics Module
+Expone las métricas del bot en formato Prometheus en localhost y muestra al
+owner los listeners y comandos más costosos con ``c!handlers``.
+
+``METRICS_PORT`` activa el servidor (vacío o 0 lo deja apagado) y
+``METRICS_HOST`` elige la interfaz; por defecto ``127.0.0.1``.
+"""
+
+import io
+import logging
+import math
+import os
+import time
+from collections.abc import Iterable
+from datetime import UTC, datetime
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+import database as db
+from handler_metrics import HANDLER_BUCKET_BOUNDS_MS, SORT_KEYS, handler_registry
+from metrics import Family, MetricsServer, histogram_samples, metrics
+from role_sync import role_reconciler
+
+log = logging.getLogger("bot")
+
+GATEWAY_EVENTS = metrics.counter(
+    "copydc_gateway_events_total",
+    "Eventos recibidos del gateway por tipo.",
+    ("event",),
+)
+COMMAND_DURATION = metrics.histogram(
+    "copydc_command_duration_seconds",
+    "Duración de los comandos por cog, comando y tipo (prefix o slash).",
+    ("cog", "command", "kind"),
+)
+COMMAND_ERRORS = metrics.counter(
+    "copydc_command_errors_total",
+    "Comandos de prefijo que terminaron en error.",
+    ("cog", "command"),
+)
+DB_BUCKET_BOUNDS_SEC = tuple(bound / 1000 for bound in db.QUERY_BUCKET_BOUNDS_MS)
+HANDLER_BUCKET_BOUNDS_SEC = tuple(bound / 1000 for bound in HANDLER_BUCKET_BOUNDS_MS)
+MAX_HANDLER_ROWS = 25
+
+
+def collect_database() -> Iterable[Family]:
+    """Traduce las métricas del registro de consultas al formato de Prometheus."""
+    snapshot = db.query_registry.snapshot()
+    durations = []
+    errors = []
+    for name, data in sorted(snapshot["queries"].items()):
+        labels = {"query": name, "kind": data["kind"]}
+        durations.extend(
+            histogram_samples(labels, DB_BUCKET_BOUNDS_SEC, data["buckets"], data["total_ms"] / 1000)
+        )
+        for reason, key in (
+            ("error", "errors"),
+            ("locked", "locked_errors"),
+            ("constraint", "constraint_errors"),
+        ):
+            if data[key]:
+                errors.append(("", {"query": name, "reason": reason}, data[key]))
+    yield (
+        "copydc_db_query_duration_seconds",
+        "histogram",
+        "Duración de las consultas SQLite por consulta registrada.",
+        durations,
+    )
+    yield (
+        "copydc_db_query_errors_total",
+        "counter",
+        "Consultas SQLite fallidas por motivo; locked también cuenta como error.",
+        errors,
+    )
+
+
+def collect_handlers() -> Iterable[Family]:
+    durations = []
+    errors = []
+    in_flight = []
+    for item in handler_registry.snapshot()["handlers"]:
+        labels = {"cog": item["cog"], "handler": item["handler"], "kind": item["kind"]}
+        durations.extend(
+            histogram_samples(labels, HANDLER_BUCKET_BOUNDS_SEC, item["buckets"], item["total_ms"] / 1000)
+        )
+        errors.append(("", labels, item["errors"]))
+        in_flight.append(("", labels, item["in_flight"]))
+    yield (
+        "copydc_handler_duration_seconds",
+        "histogram",
+        "Duración del cuerpo de cada listener y comando de los cogs.",
+        durations,
+    )
+    yield (
+        "copydc_handler_errors_total",
+        "counter",
+        "Ejecuciones de listeners y comandos que lanzaron una excepción.",
+        errors,
+    )
+    yield (
+        "copydc_handler_in_flight",
+        "gauge",
+        "Ejecuciones de listeners y comandos en curso.",
+        in_flight,
+    )
+
+
+def format_handler_rows(rows: list[dict]) -> list[str]:
+    return [
+        f"{item['cog']}.{item['handler']} [{item['kind']}] | n={item['count']} | "
+        f"total={item['total_ms'] / 1000:.2f}s | avg={item['avg_ms']:.2f}ms | "
+        f"p95={item['p95_ms']:.2f}ms | max={item['max_ms']:.2f}ms | "
+        f"err={item['errors']} | run={item['in_flight']}"
+        for item in rows
+    ]
+
+
+def collect_role_sync() -> Iterable[Family]:
+    stats = role_reconciler.snapshot()
+    for key in (
+        "requests",
+        "coalesced_requests",
+        "rest_calls",
+        "rest_calls_saved",
+        "noop_flushes",
+        "rate_limit_waits",
+        "http_429",
+        "errors",
+    ):
+        yield (
+            f"copydc_role_sync_{key}_total",
+            "counter",
+            f"Reconciliador de roles: {key}.",
+            [("", {}, stats[key])],
+        )
+    yield (
+        "copydc_role_sync_rate_limit_wait_seconds_total",
+        "counter",
+        "Reconciliador de roles: segundos esperados por el bucket local.",
+        [("", {}, stats["rate_limit_wait_sec"])],
+    )
+    yield (
+        "copydc_role_sync_pending_members",
+        "gauge",
+        "Miembros con cambios de roles pendientes de aplicar.",
+        [("", {}, stats["pending_members"])],
+    )
+
+
+class MetricsCog(commands.Cog):
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.server: MetricsServer | None = None
+
+    async def cog_load(self):
+        metrics.add_collector("database", collect_database)
+        metrics.add_collector("role_sync", collect_role_sync)
+        metrics.add_collector("handlers", collect_handlers)
+        metrics.add_collector("bot", self._collect_bot)
+
+        port = int(os.getenv("METRICS_PORT") or 0)
+        if not port:
+            return
+        server = MetricsServer(metrics, os.getenv("METRICS_HOST", "127.0.0.1"), port)
+        try:
+            await server.start()
+        except OSError as exc:
+            log.warning(f"No se pudo abrir el puerto de métricas {port}: {exc}")
+            return
+        self.server = server
+        log.info(f"Métricas Prometheus en http://{server.host}:{server.bound_port}/metrics")
+
+    async def cog_unload(self):
+        for key in ("database", "role_sync", "handlers", "bot"):
+            metrics.remove_collector(key)
+        if self.server is not None:
+            await self.server.stop()
+            self.server = None
+
+    def _collect_bot(self) -> Iterable[Family]:
+        yield "copydc_guilds", "gauge", "Servidores en los que está el bot.", [("", {}, len(self.bot.guilds))]
+        latency = self.bot.latency
+        samples = [("", {}, latency)] if math.isfinite(latency) else []
+        yield "copydc_gateway_latency_seconds", "gauge", "Latencia del último heartbeat del gateway.", samples
+
+    # ------------------------------------------------------------------
+    # Gateway y comandos
+    # ------------------------------------------------------------------
+    @commands.Cog.listener()
+    async def on_socket_event_type(self, event_type: str):
+        GATEWAY_EVENTS.labels(event_type).inc()
+
+    # Un híbrido invocado por slash también dispara ``command`` y
+    # ``command_completion``/``command_error`` con un Context de interacción;
+    # esa ejecución ya la mide ``on_app_command_completion`` como slash.
+    @commands.Cog.listener()
+    async def on_command(self, ctx: commands.Context):
+        if ctx.interaction is not None:
+            return
+        ctx.metrics_started = time.perf_counter()
+
+    def _observe_command(self, ctx: commands.Context) -> None:
+        started = getattr(ctx, "metrics_started", None)
+        if started is None or ctx.command is None or ctx.interaction is not None:
+            return
+        COMMAND_DURATION.labels(ctx.command.cog_name or "-", ctx.command.qualified_name, "prefix").observe(
+            time.perf_counter() - started
+        )
+
+    @commands.Cog.listener()
+    async def on_command_completion(self, ctx: commands.Context):
+        self._observe_command(ctx)
+
+    @commands.Cog.listener()
+    async def on_command_error(self, ctx: commands.Context, error: commands.CommandError):
+        if (
+            ctx.command is None
+            or ctx.interaction is not None
+            or getattr(ctx, "metrics_started", None) is None
+        ):
+            return
+        self._observe_command(ctx)
+        COMMAND_ERRORS.labels(ctx.command.cog_name or "-", ctx.command.qualified_name).inc()
+
+    @commands.Cog.listener()
+    async def on_interaction(self, interaction: discord.Interaction):
+        if interaction.type is discord.InteractionType.application_command:
+            interaction.extras["metrics_started"] = time.perf_counter()
+
+    @commands.Cog.listener()
+    async def on_app_command_completion(
+        self,
+        interaction: discord.Interaction,
+        command: app_commands.Command | app_commands.ContextMenu,
+    ):
+        started = interaction.extras.get("metrics_started")
+        if started is None:
+            return
+        binding = getattr(command, "binding", None)
+        cog_name = binding.qualified_name if isinstance(binding, commands.Cog) else "-"
+        COMMAND_DURATION.labels(cog_name, command.qualified_name, "slash").observe(
+            time.perf_counter() - started
+        )
+
+    # ------------------------------------------------------------------
+    # Commands
+    # ------------------------------------------------------------------
+    def _can_use_commands(self, ctx: commands.Context) -> bool:
+        return ctx.author.id == ctx.bot.owner_id
+
+    @commands.group(name="handlers", invoke_without_command=True)
+    async def handlers(self, ctx: commands.Context, sort: str = "total", limit: int = 10):
+        """Listeners y comandos más costosos: total, avg, p95, max, errors o count."""
+        if not self._can_use_commands(ctx):
+            await ctx.reply("No tienes permisos para usar este módulo.", mention_author=False)
+            return
+        sort = sort.lower()
+        if sort not in SORT_KEYS:
+            await ctx.reply(f"Orden no válido. Usa: {', '.join(SORT_KEYS)}.", mention_author=False)
+            return
+
+        rows = handler_registry.top(sort, max(1, min(limit, MAX_HANDLER_ROWS)))
+        if not rows:
+            await ctx.reply("Aún no hay ejecuciones de handlers registradas.", mention_author=False)
+            return
+
+        since = datetime.fromtimestamp(handler_registry.started_at, UTC).isoformat(timespec="seconds")
+        text = f"Orden: {sort} | desde {since}\n" + "\n".join(format_handler_rows(rows))
+        if len(text) > 1900:
+            report = io.BytesIO(text.encode("utf-8"))
+            await ctx.reply(file=discord.File(report, filename="handlers_report.txt"), mention_author=False)
+            return
+        await ctx.reply(f"```txt\n{text}\n```", mention_author=False)
+
+    @handlers.command(name="reset")
+    async def handlers_reset(self, ctx: commands.Context):
+        if not self._can_use_commands(ctx):
+            await ctx.reply("Solo el owner puede resetear métricas.", mention_author=False)
+            return
+        handler_registry.reset()
+        await ctx.reply("Métricas de handlers reiniciadas.", mention_author=False)
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(MetricsCog(bot))
@@ -5,6 +5,7 @@
 # ✔ Ficha del servidor con pestañas (Resumen, Miembros/Canales, Roles/Emojis, Seguridad/Nitro, Permisos del bot)
 # ✔ Sin invitaciones y sin jump link
 
+import asyncio
 import math
 import os
 from contextlib import suppress
@@ -15,7 +16,9 @@ from discord.ext import commands
 from dotenv import load_dotenv
 
 import database as db
+from command_sync import SyncResult, sync_tree
 from command_utils import (
+    PaginationView,
     build_presence_activity,
     looks_like_custom_emoji_reference,
     resolve_presence_status,
@@ -36,6 +39,12 @@ def owner_only():
     return commands.check(is_owner_check)
 
 
+def describe_sync(result: SyncResult) -> str:
+    if result.synced:
+        return f"{result.command_count} comando(s) sincronizado(s)."
+    return f"sin cambios ({result.command_count} comando(s)), no se envió nada."
+
+
 def fmt_bool(b: bool) -> str:
     return "✅" if b else "❌"
 
@@ -45,6 +54,56 @@ def trim(text: str, max_len: int = 100) -> str:
     return (text[: max_len - 1] + "…") if len(text) > max_len else text
 
 
+def configured_module_flags(modules: dict[str, int]) -> list[str]:
+    """Convierte los totales de ``get_configured_module_summary`` en etiquetas."""
+    flags: list[str] = []
+    if modules.get("thread"):
+        flags.append(f"thread:{modules['thread']}")
+    if modules.get("counting"):
+        flags.append(f"counting:{modules['counting']}")
+    if modules.get("react"):
+        flags.append(f"react:{modules['react']}")
+    if modules.get("vanity_codes") or modules.get("vanity_settings"):
+        flags.append(f"vanity:{modules.get('vanity_codes', 0)}")
+    if modules.get("clantag"):
+        flags.append("clantag")
+    if modules.get("boostrole") or modules.get("boost_log"):
+        flags.append(f"boostrole:{modules.get('boostrole', 0)}")
+    return flags
+
+
+def build_configured_pages(
+    guilds: list[discord.Guild], summary: dict[int, dict[str, int]], per_page: int = 15
+) -> list[discord.Embed]:
+    """Construye las páginas de ``servers configured`` a partir del resumen agregado."""
+    records: list[tuple[discord.Guild, list[str]]] = []
+    for guild in guilds:
+        module_flags = configured_module_flags(summary.get(guild.id, {}))
+        if module_flags:
+            records.append((guild, module_flags))
+    records.sort(key=lambda item: (-len(item[1]), item[0].name.lower()))
+
+    total_pages = math.ceil(len(records) / per_page)
+    embeds: list[discord.Embed] = []
+    for page in range(1, total_pages + 1):
+        start = (page - 1) * per_page
+        lines: list[str] = []
+        for offset, (guild, flags) in enumerate(records[start : start + per_page], start=1):
+            index = start + offset
+            lines.append(
+                f"`{index}.` **{discord.utils.escape_markdown(guild.name)}** (`{guild.id}`)\n"
+                f"Modulos: {', '.join(flags)}"
+            )
+        embed = discord.Embed(
+            title="Servidores con configuracion activa",
+            description="\n\n".join(lines),
+            color=discord.Color.blurple(),
+        )
+        embed.set_footer(text=f"Pagina {page}/{total_pages} | Total con config: {len(records)}")
+        embeds.append(embed)
+    return embeds
+
+
 def resolve_guild(bot: commands.Bot, query: str) -> discord.Guild | None:
     """Busca un guild por ID o por nombre (contiene, case-insensitive)."""
     if query.isdigit():
@@ -551,85 +610,28 @@ class OwnerCog(commands.Cog):
     @owner_only()
     async def configured_cmd(self, ctx: commands.Context, page: int = 1):
         """Lista servidores con modulos configurados (counting, threads, react, vanity, clantag, boost)."""
-        records: list[tuple[discord.Guild, list[str]]] = []
-        for guild in self.bot.guilds:
-            module_flags: list[str] = []
-
-            threads_count = len(db.get_all_thread_configs_for_guild(guild.id))
-            if threads_count:
-                module_flags.append(f"thread:{threads_count}")
-
-            counting_count = len(db.get_counting_channels_for_guild(guild.id))
-            if counting_count:
-                module_flags.append(f"counting:{counting_count}")
-
-            react_count = len(db.get_all_auto_reactions(guild.id))
-            if react_count:
-                module_flags.append(f"react:{react_count}")
-
-            vanity_codes = db.get_vanity_codes(guild.id)
-            vanity_settings = db.get_vanity_settings(guild.id) or {}
-            vanity_enabled = bool(
-                vanity_codes
-                or vanity_settings.get("channel_id")
-                or vanity_settings.get("remove_channel_id")
-                or vanity_settings.get("remove_enabled")
-            )
-            if vanity_enabled:
-                module_flags.append(f"vanity:{len(vanity_codes)}")
-
-            clantag_settings = db.get_clantag_settings(guild.id) or {}
-            clantag_enabled = bool(
-                clantag_settings.get("role_id")
-                or clantag_settings.get("channel_id")
-                or clantag_settings.get("remove_channel_id")
-                or clantag_settings.get("remove_enabled")
-            )
-            if clantag_enabled:
-                module_flags.append("clantag")
-
-            boost_roles_count = len(db.get_boost_roles_for_guild(guild.id))
-            boost_log = db.get_boost_log_channel(guild.id)
-            if boost_roles_count or boost_log:
-                module_flags.append(f"boostrole:{boost_roles_count}")
-
-            if module_flags:
-                records.append((guild, module_flags))
-
-        if not records:
+        summary = await asyncio.to_thread(db.get_configured_module_summary)
+        guilds = list(self.bot.guilds)
+        embeds = await asyncio.to_thread(build_configured_pages, guilds, summary)
+        if not embeds:
             await ctx.reply("No hay servidores con modulos configurados.", mention_author=False)
             return
 
-        records.sort(key=lambda item: (-len(item[1]), item[0].name.lower()))
-
-        per_page = 15
-        total_pages = max(1, math.ceil(len(records) / per_page))
-        page = min(max(page, 1), total_pages)
-        start = (page - 1) * per_page
-        chunk = records[start : start + per_page]
-
-        embed = discord.Embed(
-            title="Servidores con configuracion activa",
-            description="Resumen de modulos con datos guardados por servidor.",
-            color=discord.Color.blurple(),
-        )
-
-        lines: list[str] = []
-        for offset, (guild, flags) in enumerate(chunk, start=1):
-            index = start + offset
-            lines.append(
-                f"`{index}.` **{discord.utils.escape_markdown(guild.name)}** (`{guild.id}`)\n"
-                f"Modulos: {', '.join(flags)}"
-            )
+        if len(embeds) == 1:
+            await ctx.reply(embed=embeds[0], mention_author=False)
+            return
 
-        embed.description = "\n\n".join(lines)
-        embed.set_footer(text=f"Pagina {page}/{total_pages} | Total con config: {len(records)}")
-        await ctx.reply(embed=embed, mention_author=False)
+        view = PaginationView(embeds, ctx.author.id, start_index=page - 1)
+        view.message = await ctx.reply(embed=embeds[view.index], view=view, mention_author=False)
 
     @commands.command(name="slashsync", aliases=["syncslash", "appsync"])
     @owner_only()
-    async def slashsync_cmd(self, ctx: commands.Context, scope: str = "global"):
-        """Sincroniza slash commands o elimina copias antiguas por servidor."""
+    async def slashsync_cmd(self, ctx: commands.Context, scope: str = "global", option: str = ""):
+        """Sincroniza slash commands o elimina copias antiguas por servidor.
+
+        Solo se envían los ámbitos cuyo árbol cambió desde la última
+        sincronización; ``force`` los envía igualmente.
+        """
         normalized = (scope or "global").strip().lower()
         aliases = {
             "global": "global",
@@ -640,14 +642,17 @@ class OwnerCog(commands.Cog):
             "clean": "cleanup",
         }
         normalized = aliases.get(normalized)
-        if normalized is None:
+        option = (option or "").strip().lower()
+        if normalized is None or option not in {"", "force", "--force", "-f"}:
             await ctx.reply(
-                "Uso: `c!slashsync [global|guild|all|cleanup]`.",
+                "Uso: `c!slashsync [global|guild|all|cleanup] [force]`.",
                 mention_author=False,
             )
             return
+        force = bool(option)
 
         summary: list[str] = []
+        skipped = False
 
         if normalized == "cleanup":
             success = 0
@@ -655,7 +660,7 @@ class OwnerCog(commands.Cog):
             for guild in self.bot.guilds:
                 try:
                     self.bot.tree.clear_commands(guild=guild)
-                    await self.bot.tree.sync(guild=guild)
+                    await sync_tree(self.bot.tree, guild=guild, force=force)
                     success += 1
                 except discord.HTTPException:
                     failed.append(f"{guild.name} ({guild.id})")
@@ -672,8 +677,9 @@ class OwnerCog(commands.Cog):
             return
 
         if normalized in {"global", "all"}:
-            synced = await self.bot.tree.sync()
-            summary.append(f"Global: {len(synced)} comando(s) sincronizado(s).")
+            result = await sync_tree(self.bot.tree, force=force)
+            skipped = not result.synced
+            summary.append(f"Global: {describe_sync(result)}")
 
         if normalized == "guild":
             if ctx.guild is None:
@@ -682,25 +688,35 @@ class OwnerCog(commands.Cog):
                     mention_author=False,
                 )
                 return
-            synced = await self.bot.sync_guild_application_commands(ctx.guild)
-            summary.append(f"Guild actual ({ctx.guild.name}): {len(synced)} comando(s) sincronizado(s).")
+            result = await self.bot.sync_guild_application_commands(ctx.guild, force=force)
+            skipped = not result.synced
+            summary.append(f"Guild actual ({ctx.guild.name}): {describe_sync(result)}")
         elif normalized == "all":
             success = 0
+            unchanged = 0
             failed: list[str] = []
             for guild in self.bot.guilds:
                 try:
-                    synced = await self.bot.sync_guild_application_commands(guild)
-                    if synced is not None:
-                        success += 1
+                    result = await self.bot.sync_guild_application_commands(guild, force=force)
                 except discord.HTTPException:
                     failed.append(f"{guild.name} ({guild.id})")
+                    continue
+                if result.synced:
+                    success += 1
+                else:
+                    unchanged += 1
+                    skipped = True
 
-            summary.append(f"Guilds: {success}/{len(self.bot.guilds)} sincronizados.")
+            summary.append(
+                f"Guilds: {success}/{len(self.bot.guilds)} sincronizados, {unchanged} sin cambios."
+            )
             if failed:
                 preview = ", ".join(failed[:5])
                 suffix = " ..." if len(failed) > 5 else ""
                 summary.append(f"Fallos: {preview}{suffix}")
 
+        if skipped:
+            summary.append("Usa `c!slashsync <ámbito> force` para enviar igualmente.")
         await ctx.reply("\n".join(summary), mention_author=False)
 
     async def _apply_presence_preset(self, preset_row) -> None:
@@ -1,8 +1,12 @@
 # modules/perm_inspector_cog.py
 
+import asyncio
+
 import discord
 from discord.ext import commands
 
+from command_utils import PaginationView
+
 # ========== Definición de permisos de moderación/gestión ==========
 # Nota: cubrimos la mayoría de flags relevantes de discord.py. Algunos
 # nombres varían entre versiones (ej. manage_emojis vs manage_emojis_and_stickers).
@@ -87,6 +91,139 @@ def chunk(lines: list[str], size: int = 10) -> list[list[str]]:
     return [lines[i : i + size] for i in range(0, len(lines), size)]
 
 
+# Miembros/canales procesados antes de devolver el control al event loop
+PERM_SCAN_CHUNK = 500
+WHOCAN_PER_PAGE = 60
+# Entradas máximas por servidor antes de vaciar su matriz
+PERM_CACHE_MAX_PER_GUILD = 50_000
+
+
+def role_signature(member: discord.Member) -> tuple:
+    """Firma que determina los permisos de un miembro salvo overwrites propios.
+
+    Dos miembros con los mismos roles (y el mismo estado de timeout) tienen
+    exactamente los mismos permisos en cualquier canal.
+    """
+    if member.guild.owner_id == member.id:
+        return ("owner",)
+    return (member.is_timed_out(), *(role.id for role in member.roles))
+
+
+def member_overwrite_ids(channel: discord.abc.GuildChannel) -> frozenset[int]:
+    """IDs de miembros con overwrites propios en el canal."""
+    if isinstance(channel, discord.Thread):
+        # Los hilos no tienen overwrites; usan los del canal padre.
+        channel = channel.parent
+        if channel is None:
+            return frozenset()
+    ids = set()
+    for target in channel.overwrites:
+        if isinstance(target, discord.Role):
+            continue
+        if isinstance(target, discord.Object) and target.type is discord.Role:
+            continue
+        ids.add(target.id)
+    return frozenset(ids)
+
+
+class PermissionEngine:
+    """Matriz de permisos por servidor, canal y firma de roles.
+
+    Los permisos se calculan una sola vez por combinación y se reutilizan
+    entre comandos hasta que un evento de canal o rol invalida el servidor.
+    Los miembros con overwrites propios en un canal se resuelven siempre de
+    forma individual porque su firma no basta para describir sus permisos.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = PERM_SCAN_CHUNK,
+        max_per_guild: int = PERM_CACHE_MAX_PER_GUILD,
+    ):
+        self.chunk_size = chunk_size
+        self.max_per_guild = max_per_guild
+        self._matrix: dict[int, dict[tuple[int, tuple], discord.Permissions]] = {}
+        self._member_overwrites: dict[int, dict[int, frozenset[int]]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _overwrite_members(self, channel: discord.abc.GuildChannel) -> frozenset[int]:
+        per_guild = self._member_overwrites.setdefault(channel.guild.id, {})
+        ids = per_guild.get(channel.id)
+        if ids is None:
+            ids = member_overwrite_ids(channel)
+            per_guild[channel.id] = ids
+        return ids
+
+    def permissions_for(
+        self, channel: discord.abc.GuildChannel | None, member: discord.Member
+    ) -> discord.Permissions:
+        if channel is not None and member.id in self._overwrite_members(channel):
+            return channel.permissions_for(member)
+
+        matrix = self._matrix.setdefault(member.guild.id, {})
+        key = (channel.id if channel is not None else 0, role_signature(member))
+        perms = matrix.get(key)
+        if perms is not None:
+            self.hits += 1
+            return perms
+
+        self.misses += 1
+        perms = channel.permissions_for(member) if channel is not None else member.guild_permissions
+        if len(matrix) >= self.max_per_guild:
+            matrix.clear()
+        matrix[key] = perms
+        return perms
+
+    def invalidate_guild(self, guild_id: int):
+        """Descarta la matriz del servidor (canales, roles u overwrites cambiaron)."""
+        dropped = self._matrix.pop(guild_id, None)
+        self._member_overwrites.pop(guild_id, None)
+        if dropped:
+            self.invalidations += 1
+
+    def size(self) -> int:
+        return sum(len(matrix) for matrix in self._matrix.values())
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "guilds": len(self._matrix),
+            "entries": self.size(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+    async def members_with(
+        self,
+        members: list[discord.Member],
+        channel: discord.abc.GuildChannel | None,
+        perm_key: str,
+    ) -> list[discord.Member]:
+        holders: list[discord.Member] = []
+        for start in range(0, len(members), self.chunk_size):
+            for member in members[start : start + self.chunk_size]:
+                if has_flag(self.permissions_for(channel, member), perm_key):
+                    holders.append(member)
+            await asyncio.sleep(0)
+        return holders
+
+    async def visible_channels(
+        self, channels: list[discord.abc.GuildChannel], member: discord.Member
+    ) -> list[discord.abc.GuildChannel]:
+        visible = []
+        for start in range(0, len(channels), self.chunk_size):
+            for ch in channels[start : start + self.chunk_size]:
+                try:
+                    if getattr(self.permissions_for(ch, member), "view_channel", False):
+                        visible.append(ch)
+                except Exception:
+                    pass
+            await asyncio.sleep(0)
+        return visible
+
+
 class PermissionsInspectorCog(commands.Cog):
     """
     Auditor de permisos de moderación/gestión.
@@ -97,15 +234,55 @@ class PermissionsInspectorCog(commands.Cog):
       - c!roleperms @rol                    -> Qué permisos de gestión tiene un rol
       - c!auditroles                        -> Roles con permisos de gestión y miembros
       - c!whocan <permiso> [#canal]         -> Quién tiene un permiso en canal/servidor
+      - c!permcache                         -> Estado de la matriz de permisos (owner)
     """
 
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        self.engine = PermissionEngine()
+
+    # ========== Invalidación de la matriz ==========
+
+    @commands.Cog.listener()
+    async def on_guild_channel_create(self, channel: discord.abc.GuildChannel):
+        self.engine.invalidate_guild(channel.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_update(
+        self, before: discord.abc.GuildChannel, after: discord.abc.GuildChannel
+    ):
+        # Los hilos heredan del canal padre, así que se descarta todo el servidor.
+        self.engine.invalidate_guild(after.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
+        self.engine.invalidate_guild(channel.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_create(self, role: discord.Role):
+        self.engine.invalidate_guild(role.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before: discord.Role, after: discord.Role):
+        self.engine.invalidate_guild(after.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role: discord.Role):
+        self.engine.invalidate_guild(role.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_update(self, before: discord.Guild, after: discord.Guild):
+        if before.owner_id != after.owner_id:
+            self.engine.invalidate_guild(after.id)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        self.engine.invalidate_guild(guild.id)
 
     # ========== Utilidades ==========
 
     def _guild_base_flags(self, member: discord.Member) -> dict[str, bool]:
-        gp = member.guild_permissions
+        gp = self.engine.permissions_for(None, member)
         return {k: has_flag(gp, k) for k in MGMT_OR_MOD_KEYS}
 
     def _roles_granting(self, member: discord.Member) -> dict[str, list[discord.Role]]:
@@ -117,9 +294,7 @@ class PermissionsInspectorCog(commands.Cog):
                     out[k].append(role)
         return out
 
-    def _iter_visible_channels(
-        self, guild: discord.Guild, member: discord.Member
-    ) -> list[discord.abc.GuildChannel]:
+    def _guild_channels(self, guild: discord.Guild) -> list[discord.abc.GuildChannel]:
         chans: list[discord.abc.GuildChannel] = []
         chans.extend(guild.text_channels)
         chans.extend(guild.voice_channels)
@@ -128,17 +303,9 @@ class PermissionsInspectorCog(commands.Cog):
         if forum_chs:
             chans.extend(forum_chs)
         chans.extend(guild.categories)
-        # Solo los que el miembro puede ver
-        visible = []
-        for ch in chans:
-            try:
-                if getattr(ch.permissions_for(member), "view_channel", False):
-                    visible.append(ch)
-            except Exception:
-                pass
-        return visible
+        return chans
 
-    def _scan_member_serverwide(
+    async def _scan_member_serverwide(
         self, member: discord.Member
     ) -> tuple[dict[str, bool], dict[str, tuple[int, int]], list[discord.abc.GuildChannel], list[str]]:
         """
@@ -148,14 +315,16 @@ class PermissionsInspectorCog(commands.Cog):
           - modview_channels: lista de canales donde se cumpliría "vista de moderación"
           - reasons: lista de permisos que por sí solos ya justifican vista de moderación
         """
+        engine = self.engine
         base_flags = self._guild_base_flags(member)
-        visible = self._iter_visible_channels(member.guild, member)
+        # Solo los que el miembro puede ver
+        visible = await engine.visible_channels(self._guild_channels(member.guild), member)
         total = len(visible)
         counts = {k: (0, total) for k in MGMT_OR_MOD_KEYS}
         modview_channels: list[discord.abc.GuildChannel] = []
 
-        for ch in visible:
-            perms = ch.permissions_for(member)
+        for index, ch in enumerate(visible, start=1):
+            perms = engine.permissions_for(ch, member)
             show = False
             for k in MGMT_OR_MOD_KEYS:
                 if has_flag(perms, k):
@@ -165,6 +334,8 @@ class PermissionsInspectorCog(commands.Cog):
                         show = True
             if show:
                 modview_channels.append(ch)
+            if index % engine.chunk_size == 0:
+                await asyncio.sleep(0)
 
         # Razones (a nivel base del servidor) que suelen exponer paneles concretos
         # según documentación oficial (ej. Moderation/Overview requieren Manage Server;
@@ -213,7 +384,7 @@ class PermissionsInspectorCog(commands.Cog):
         ):
             channel = ctx.channel
 
-        perms = channel.permissions_for(member) if channel else member.guild_permissions
+        perms = self.engine.permissions_for(channel, member)
         effective = {k: has_flag(perms, k) for k in MGMT_OR_MOD_KEYS}
         can_open = any(effective[k] for k in MOD_VIEW_KEYS)
 
@@ -241,7 +412,7 @@ class PermissionsInspectorCog(commands.Cog):
         """c!modcheckall @usuario — Auditoría general en TODO el servidor."""
         member = member or ctx.author
 
-        base_flags, counts, modview_channels, reasons = self._scan_member_serverwide(member)
+        base_flags, counts, modview_channels, reasons = await self._scan_member_serverwide(member)
         total_visible = next(iter(counts.values()))[1] if counts else 0
         can_open_somewhere = len(modview_channels) > 0
 
@@ -337,6 +508,15 @@ class PermissionsInspectorCog(commands.Cog):
     @commands.guild_only()
     async def auditroles(self, ctx: commands.Context):
         """c!auditroles — Lista roles con permisos de gestión y cuántos miembros los tienen."""
+        # Una sola pasada por los miembros para contar todos los roles a la vez
+        role_counts: dict[int, int] = {}
+        members = list(ctx.guild.members)
+        for start in range(0, len(members), PERM_SCAN_CHUNK):
+            for m in members[start : start + PERM_SCAN_CHUNK]:
+                for role in m.roles:
+                    role_counts[role.id] = role_counts.get(role.id, 0) + 1
+            await asyncio.sleep(0)
+
         rows: list[str] = []
         for role in sort_roles(ctx.guild.roles):
             if role.is_default():
@@ -344,7 +524,7 @@ class PermissionsInspectorCog(commands.Cog):
             rp = role.permissions or discord.Permissions.none()
             grants = [NICE.get(k, k) for k in MGMT_OR_MOD_KEYS if has_flag(rp, k)]
             if grants:
-                count = sum(1 for m in ctx.guild.members if role in m.roles)
+                count = role_counts.get(role.id, 0)
                 rows.append(f"{role.mention} — {count} miembros\n• " + ", ".join(grants))
         if not rows:
             rows = ["(Ningún rol con permisos de gestión)"]
@@ -381,23 +561,40 @@ class PermissionsInspectorCog(commands.Cog):
         ):
             channel = ctx.channel
 
-        holders: list[str] = []
-        for m in ctx.guild.members:
-            perms = channel.permissions_for(m) if channel else m.guild_permissions
-            if has_flag(perms, perm_key):
-                holders.append(m.mention)
+        holders = await self.engine.members_with(list(ctx.guild.members), channel, perm_key)
+        where = channel.mention if channel else "el servidor"
+        title = f"Quién puede — {NICE.get(perm_key, perm_key)}"
+        header = f"Miembros con **{NICE.get(perm_key, perm_key)}** en {where}:\n"
 
-        desc = (
-            f"Miembros con **{NICE.get(perm_key, perm_key)}** "
-            f"en {channel.mention if channel else 'el servidor'}:\n"
-            + (", ".join(holders[:900]) if holders else "Nadie.")
-        )
-        emb = discord.Embed(
-            title=f"Quién puede — {NICE.get(perm_key, perm_key)}",
-            description=desc,
-            color=discord.Color.orange(),
-        )
-        await ctx.reply(embed=emb, mention_author=False)
+        pages = chunk([m.mention for m in holders], WHOCAN_PER_PAGE) or [[]]
+        embeds = []
+        for number, page in enumerate(pages, start=1):
+            emb = discord.Embed(
+                title=title,
+                description=header + (", ".join(page) if page else "Nadie."),
+                color=discord.Color.orange(),
+            )
+            if len(pages) > 1:
+                emb.set_footer(text=f"Página {number}/{len(pages)} · {len(holders)} miembros")
+            embeds.append(emb)
+
+        if len(embeds) == 1:
+            await ctx.reply(embed=embeds[0], mention_author=False)
+            return
+
+        view = PaginationView(embeds, ctx.author.id)
+        view.message = await ctx.reply(embed=embeds[0], view=view, mention_author=False)
+
+    @commands.command(name="permcache")
+    @commands.is_owner()
+    async def permcache(self, ctx: commands.Context):
+        """c!permcache — Tamaño y actividad de la matriz de permisos."""
+        stats = self.engine.stats()
+        lines = [
+            f"servidores={stats['guilds']} | entradas={stats['entries']}",
+            f"hits={stats['hits']} | misses={stats['misses']} | invalidaciones={stats['invalidations']}",
+        ]
+        await ctx.reply("```txt\n" + "\n".join(lines) + "\n```", mention_author=False)
 
 
 async def setup(bot: commands.Bot):
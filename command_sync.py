@@ -0,0 +1,87 @@
+"""Sincronización de slash commands solo cuando el árbol cambia.
+
+El árbol se serializa con el mismo payload que envía ``CommandTree.sync``,
+ordenado y en JSON canónico, y se resume con SHA-256. La huella del último
+envío correcto se guarda en SQLite por aplicación y ámbito; si coincide, no se
+llama a la API y no se gasta el límite de sincronización.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+from datetime import UTC, datetime
+from typing import Any
+
+import discord
+from discord import app_commands
+
+import database as db
+
+log = logging.getLogger("bot")
+
+
+async def command_payload(
+    tree: app_commands.CommandTree,
+    *,
+    guild: discord.abc.Snowflake | None = None,
+) -> list[dict[str, Any]]:
+    """Payload de ``tree.sync(guild=guild)`` en un orden estable."""
+    commands = tree.get_commands(guild=guild)
+    translator = tree.translator
+    if translator:
+        payload = [await command.get_translated_payload(tree, translator) for command in commands]
+    else:
+        payload = [command.to_dict(tree) for command in commands]
+    # El orden de registro depende del orden de carga de las extensiones.
+    return sorted(payload, key=lambda item: (item.get("type", 1), item["name"]))
+
+
+def fingerprint(payload: list[dict[str, Any]]) -> str:
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class SyncResult:
+    __slots__ = ("command_count", "fingerprint", "synced")
+
+    def __init__(self, *, synced: bool, command_count: int, fingerprint: str):
+        self.synced = synced
+        self.command_count = command_count
+        self.fingerprint = fingerprint
+
+
+async def sync_tree(
+    tree: app_commands.CommandTree,
+    *,
+    guild: discord.abc.Snowflake | None = None,
+    force: bool = False,
+) -> SyncResult:
+    """Sincroniza ``guild`` (o el ámbito global) si su huella cambió.
+
+    Con ``force`` se envía igualmente. Los errores HTTP se propagan y la huella
+    no se guarda, así que el siguiente intento vuelve a sincronizar.
+    """
+    payload = await command_payload(tree, guild=guild)
+    digest = fingerprint(payload)
+    application_id = tree.client.application_id
+    scope = guild.id if guild is not None else db.GLOBAL_COMMAND_SCOPE
+
+    if not force and application_id is not None:
+        stored = await asyncio.to_thread(db.get_app_command_sync, application_id, scope)
+        if stored is not None and stored["fingerprint"] == digest:
+            return SyncResult(synced=False, command_count=len(payload), fingerprint=digest)
+
+    synced = await tree.sync(guild=guild)
+    if application_id is not None:
+        await asyncio.to_thread(
+            db.set_app_command_sync,
+            application_id,
+            digest,
+            len(synced),
+            datetime.now(UTC).isoformat(timespec="seconds"),
+            scope,
+        )
+    return SyncResult(synced=True, command_count=len(synced), fingerprint=digest)
@@ -1,12 +1,14 @@
 from __future__ import annotations
 
 import re
+from collections.abc import Callable
 from typing import Any
 
 import discord
 from discord.ext import commands
 
-from localization import translate
+from localization import catalog_generation, translate
+from metrics import cache_counters
 
 
 class RestrictedView(discord.ui.View):
@@ -56,6 +58,86 @@ class RestrictedView(discord.ui.View):
             child.disabled = True
 
 
+class PaginationView(RestrictedView):
+    """Botones ◀️ / ▶️ para navegar una lista de embeds ya construidos."""
+
+    def __init__(self, embeds: list[discord.Embed], author_id: int, *, start_index: int = 0):
+        super().__init__(author_id=author_id, timeout=120)
+        self.embeds = embeds
+        self.index = min(max(start_index, 0), len(embeds) - 1)
+        self.message: discord.Message | None = None
+        self._sync_buttons()
+
+    def _sync_buttons(self):
+        self.prev_button.disabled = self.index <= 0
+        self.next_button.disabled = self.index >= len(self.embeds) - 1
+
+    @discord.ui.button(label="◀️", style=discord.ButtonStyle.secondary)
+    async def prev_button(self, interaction: discord.Interaction, _):
+        self.index -= 1
+        self._sync_buttons()
+        await interaction.response.edit_message(embed=self.embeds[self.index], view=self)
+
+    @discord.ui.button(label="▶️", style=discord.ButtonStyle.secondary)
+    async def next_button(self, interaction: discord.Interaction, _):
+        self.index += 1
+        self._sync_buttons()
+        await interaction.response.edit_message(embed=self.embeds[self.index], view=self)
+
+    async def on_timeout(self):
+        self.disable_all_items()
+        if self.message:
+            await self.message.edit(view=self)
+
+
+class EmbedPageCache:
+    """Páginas de embeds construidas una vez por clave (p. ej. idioma).
+
+    Guarda cada página como ``dict`` y entrega copias nuevas, así que quien
+    reciba un embed puede modificarlo sin tocar la caché. Se vacía al recargar
+    los catálogos o llamando a ``clear()`` desde ``cog_unload``.
+    """
+
+    def __init__(self, builder: Callable[[str], list[discord.Embed]], *, name: str = "embed_pages"):
+        self._builder = builder
+        self._pages: dict[str, tuple[dict[str, Any], ...]] = {}
+        self._generation = catalog_generation()
+        self._hits, self._misses = cache_counters(name)
+
+    def pages(self, key: str) -> tuple[dict[str, Any], ...]:
+        if self._generation != catalog_generation():
+            self.clear()
+        pages = self._pages.get(key)
+        if pages is None:
+            self._misses.inc()
+            pages = tuple(embed.to_dict() for embed in self._builder(key))
+            self._pages[key] = pages
+        else:
+            self._hits.inc()
+        return pages
+
+    def count(self, key: str) -> int:
+        return len(self.pages(key))
+
+    def embed(self, key: str, index: int) -> discord.Embed:
+        page = self.pages(key)[index]
+        # Solo los campos anidados son mutables; el resto se comparte.
+        return discord.Embed.from_dict(
+            {
+                name: [dict(item) for item in value]
+                if isinstance(value, list)
+                else dict(value)
+                if isinstance(value, dict)
+                else value
+                for name, value in page.items()
+            }
+        )
+
+    def clear(self) -> None:
+        self._pages.clear()
+        self._generation = catalog_generation()
+
+
 def is_interaction_context(ctx: commands.Context) -> bool:
     return getattr(ctx, "interaction", None) is not None
 
@@ -127,19 +209,206 @@ def looks_like_custom_emoji_reference(emoji_text: str | None) -> bool:
     )
 
 
-def _iter_custom_emoji_pool(bot: commands.Bot, guild: discord.Guild | None):
-    seen_ids: set[int] = set()
+GUILD_EMOJI_TOKEN_RE = re.compile(r":([a-zA-Z0-9_]+):")
+
+
+class EmojiIndex:
+    """Índice de emojis custom por nombre, por servidor y global.
+
+    Sustituye los recorridos lineales de ``guild.emojis`` y ``bot.emojis`` por
+    diccionarios que se reconstruyen por servidor cuando cambian sus emojis.
+    """
+
+    def __init__(self):
+        self._names: dict[int, dict[str, discord.Emoji]] = {}
+        self._folded: dict[int, dict[str, discord.Emoji]] = {}
+        self._global: dict[str, dict[int, discord.Emoji]] = {}
+        self._revisions: dict[int, int] = {}
+        self.ready = False
+
+    def __contains__(self, guild_id: int) -> bool:
+        return guild_id in self._names
+
+    def index_guild(self, guild: discord.Guild, emojis=None) -> None:
+        """Indexa (o reindexa) los emojis de un servidor."""
+        self.drop_guild(guild.id)
+        names: dict[str, discord.Emoji] = {}
+        folded: dict[str, discord.Emoji] = {}
+        for emoji in guild.emojis if emojis is None else emojis:
+            # Se conserva el primer emoji con cada nombre, igual que el recorrido lineal.
+            names.setdefault(emoji.name, emoji)
+            folded.setdefault(emoji.name.casefold(), emoji)
+        self._names[guild.id] = names
+        self._folded[guild.id] = folded
+        self._revisions[guild.id] = self._revisions.get(guild.id, 0) + 1
+        for name, emoji in names.items():
+            self._global.setdefault(name, {})[guild.id] = emoji
+
+    def drop_guild(self, guild_id: int) -> None:
+        names = self._names.pop(guild_id, None)
+        self._folded.pop(guild_id, None)
+        if not names:
+            return
+        for name in names:
+            owners = self._global.get(name)
+            if owners is None:
+                continue
+            owners.pop(guild_id, None)
+            if not owners:
+                del self._global[name]
+
+    def rebuild(self, guilds) -> None:
+        self._names.clear()
+        self._folded.clear()
+        self._global.clear()
+        for guild in guilds:
+            self.index_guild(guild)
+        self.ready = True
+
+    def _ensure_guild(self, guild: discord.Guild) -> None:
+        if guild.id not in self._names:
+            self.index_guild(guild)
+
+    def find_in_guild(
+        self, guild: discord.Guild, name: str, *, casefold: bool = False
+    ) -> discord.Emoji | None:
+        self._ensure_guild(guild)
+        if casefold:
+            return self._folded[guild.id].get(name.casefold())
+        return self._names[guild.id].get(name)
+
+    def find_global(self, name: str) -> discord.Emoji | None:
+        owners = self._global.get(name)
+        if not owners:
+            return None
+        return next(iter(owners.values()))
+
+    def revision(self, guild: discord.Guild) -> int:
+        """Número que cambia cada vez que se reindexan los emojis del servidor."""
+        self._ensure_guild(guild)
+        return self._revisions[guild.id]
+
+    def guild_count(self) -> int:
+        return len(self._names)
+
+
+emoji_index = EmojiIndex()
+
+
+def convert_guild_emojis(text: str, guild: discord.Guild) -> str:
+    """Convierte :emoji: al formato <:emoji:id> con los emojis del servidor."""
+    if ":" not in text:
+        return text
+
+    def replace_emoji(match: re.Match) -> str:
+        emoji = emoji_index.find_in_guild(guild, match.group(1), casefold=True)
+        if emoji is None:
+            return match.group(0)
+        if emoji.animated:
+            return f"<a:{emoji.name}:{emoji.id}>"
+        return f"<:{emoji.name}:{emoji.id}>"
+
+    return GUILD_EMOJI_TOKEN_RE.sub(replace_emoji, text)
+
+
+EMBED_PLACEHOLDER_RE = re.compile(r"\{([a-z]+)\}")
+
+
+class EmbedTemplate:
+    """Texto de embed dividido en literales y placeholders, con emojis ya resueltos."""
+
+    def __init__(self, text: str, guild: discord.Guild, fields: frozenset[str]):
+        resolved = convert_guild_emojis(text, guild)
+        self.literals: list[str] = []
+        self.fields: list[str] = []
+        position = 0
+        for match in EMBED_PLACEHOLDER_RE.finditer(resolved):
+            if match.group(1) not in fields:
+                continue
+            self.literals.append(resolved[position : match.start()])
+            self.fields.append(match.group(1))
+            position = match.end()
+        self.literals.append(resolved[position:])
+
+    def render(self, values: dict[str, str]) -> str:
+        if not self.fields:
+            return self.literals[0]
+        parts = [self.literals[0]]
+        for field, literal in zip(self.fields, self.literals[1:], strict=True):
+            parts.append(values[field])
+            parts.append(literal)
+        return "".join(parts)
+
+
+_EMBED_TEXT_HITS, _EMBED_TEXT_MISSES = cache_counters("embed_text")
+
+
+class CompiledEmbedText:
+    """Título y descripción compilados junto con la configuración que los generó."""
+
+    def __init__(
+        self,
+        source: tuple,
+        title: str,
+        description: str,
+        guild: discord.Guild,
+        fields: frozenset[str],
+    ):
+        self.source = source
+        self.revision = emoji_index.revision(guild)
+        self.title = convert_guild_emojis(title, guild)
+        self.description = EmbedTemplate(description, guild, fields)
+
+    def is_current(self, source: tuple, guild: discord.Guild) -> bool:
+        return self.source == source and self.revision == emoji_index.revision(guild)
+
+
+def get_compiled_embed_text(
+    cache: dict,
+    key: tuple,
+    guild: discord.Guild,
+    *,
+    title: str | None,
+    description: str | None,
+    fields: frozenset[str],
+    defaults: Callable[[], tuple[str, str]],
+) -> CompiledEmbedText:
+    """Devuelve la plantilla guardada en ``cache`` o la recompila si cambió su origen.
+
+    ``defaults`` solo se evalúa al compilar, así que las traducciones por defecto
+    no se resuelven en cada evento.
+    """
+    source = (title, description)
+    compiled = cache.get(key)
+    if compiled is not None and compiled.is_current(source, guild):
+        _EMBED_TEXT_HITS.inc()
+    else:
+        _EMBED_TEXT_MISSES.inc()
+        default_title, default_description = defaults() if not (title and description) else ("", "")
+        compiled = CompiledEmbedText(
+            source,
+            title or default_title,
+            description or default_description,
+            guild,
+            fields,
+        )
+        cache[key] = compiled
+    return compiled
+
 
+def _find_custom_emoji_by_name(
+    bot: commands.Bot,
+    guild: discord.Guild | None,
+    name: str,
+) -> discord.Emoji | None:
     if guild is not None:
-        for emoji in guild.emojis:
-            if emoji.id not in seen_ids:
-                seen_ids.add(emoji.id)
-                yield emoji
+        emoji = emoji_index.find_in_guild(guild, name)
+        if emoji is not None:
+            return emoji
 
-    for emoji in bot.emojis:
-        if emoji.id not in seen_ids:
-            seen_ids.add(emoji.id)
-            yield emoji
+    if not emoji_index.ready:
+        emoji_index.rebuild(bot.guilds)
+    return emoji_index.find_global(name)
 
 
 def normalize_presence_emoji_input(
@@ -162,17 +431,12 @@ def normalize_presence_emoji_input(
 
     alias_match = CUSTOM_EMOJI_ALIAS_RE.fullmatch(token)
     if alias_match:
-        normalized_name = alias_match.group(1)
-        for emoji in _iter_custom_emoji_pool(bot, guild):
-            if emoji.name == normalized_name:
-                return str(emoji)
-        return None
+        emoji = _find_custom_emoji_by_name(bot, guild, alias_match.group(1))
+        return str(emoji) if emoji is not None else None
 
     if PLAIN_CUSTOM_EMOJI_NAME_RE.fullmatch(token):
-        for emoji in _iter_custom_emoji_pool(bot, guild):
-            if emoji.name == token:
-                return str(emoji)
-        return None
+        emoji = _find_custom_emoji_by_name(bot, guild, token)
+        return str(emoji) if emoji is not None else None
 
     return token
 
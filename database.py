@@ -1,10 +1,21 @@
 # database.py
+import bisect
+import json
 import sqlite3
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Any
+
+from sketches import LogHistogram
 
 DB_FILE = str(Path(__file__).resolve().parent / "bot_database.db")
+LEGACY_JSON_DIR = Path(__file__).resolve().parent
 SQLITE_TIMEOUT_SEC = 8
 SQLITE_BUSY_TIMEOUT_MS = 5000
+SUPPORT_PURGE_BATCH = 100
 VANITY_SETTING_COLUMNS = {
     "channel_id",
     "embed_title",
@@ -46,13 +57,303 @@ def get_db_connection():
     return conn
 
 
-def setup_database():
-    """Crea las tablas de la base de datos si no existen."""
-    conn = get_db_connection()
+# ---------------------------------------------------------------------------
+# REGISTRO DE CONSULTAS
+# ---------------------------------------------------------------------------
+# Límites superiores (ms) de los buckets del histograma de latencia. El último
+# bucket recoge todo lo que supere el mayor límite.
+QUERY_BUCKET_BOUNDS_MS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 25.0, 50.0, 100.0, 250.0, 1000.0)
+SQLITE_CACHED_STATEMENTS = 256
+# Cuantiles que publica ``QueryRegistry.snapshot``.
+QUANTILES = (0.5, 0.95, 0.99)
+QUANTILE_KEYS = ("p50", "p95", "p99")
+
+
+def _query_kind(sql: str) -> str:
+    keyword = sql.lstrip().split(None, 1)[0].upper()
+    return "read" if keyword in {"SELECT", "WITH"} else "write"
+
+
+class QueryRegistry:
+    """Consultas con nombre sobre una conexión persistente por hilo.
+
+    Cada consulta se declara una vez; al reutilizar la misma conexión, la caché
+    de sentencias de sqlite3 evita volver a preparar el SQL en cada llamada.
+    Todas las ejecuciones se cronometran por nombre.
+    """
+
+    def __init__(self, path_getter: Callable[[], str]):
+        self._path_getter = path_getter
+        self._queries: dict[str, tuple[str, str]] = {}
+        self._stats: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self.started_at = time.time()
+
+    # --- Declaración ---
+    def register(self, name: str, sql: str, kind: str | None = None) -> str:
+        """Declara una consulta. Repetir el mismo SQL con el mismo nombre no hace nada."""
+        entry = (sql, kind or _query_kind(sql))
+        with self._lock:
+            existing = self._queries.get(name)
+            if existing is not None and existing != entry:
+                raise ValueError(f"Consulta ya registrada con otro SQL: {name}")
+            self._queries[name] = entry
+        return name
+
+    def register_many(self, queries: dict[str, str]) -> None:
+        for name, sql in queries.items():
+            self.register(name, sql)
+
+    def names(self) -> list[str]:
+        return sorted(self._queries)
+
+    def sql(self, name: str) -> str:
+        return self._queries[name][0]
+
+    # --- Conexión ---
+    def connection(self) -> sqlite3.Connection:
+        """Conexión del hilo actual; se reabre si cambió ``DB_FILE``."""
+        path = self._path_getter()
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.path == path:
+            return conn
+        if conn is not None:
+            self._discard(conn)
+
+        # Autocommit: cada sentencia suelta confirma sola y las operaciones de
+        # varias sentencias usan ``transaction()``.
+        conn = sqlite3.connect(
+            path,
+            timeout=SQLITE_TIMEOUT_SEC,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=SQLITE_CACHED_STATEMENTS,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}")
+        conn.execute("PRAGMA foreign_keys = ON")
+        self._local.conn = conn
+        self._local.path = path
+        with self._lock:
+            self._connections.append(conn)
+        return conn
+
+    def _discard(self, conn: sqlite3.Connection) -> None:
+        with self._lock:
+            if conn in self._connections:
+                self._connections.remove(conn)
+        conn.close()
+
+    def close_all(self) -> None:
+        """Cierra las conexiones de todos los hilos."""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Agrupa varias consultas en una transacción ``BEGIN IMMEDIATE``.
+
+        Dentro de otra transacción del mismo hilo se limita a reutilizarla.
+        """
+        conn = self.connection()
+        if conn.in_transaction:
+            yield conn
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    # --- Ejecución ---
+    def _run(self, name: str, runner: Callable[[sqlite3.Connection, str], Any]) -> Any:
+        sql, kind = self._queries[name]
+        conn = self.connection()
+        started = time.perf_counter()
+        error: Exception | None = None
+        try:
+            return runner(conn, sql)
+        except Exception as exc:
+            error = exc
+            raise
+        finally:
+            self._record(name, kind, (time.perf_counter() - started) * 1000.0, error)
+
+    def execute(self, name: str, params: Any = ()) -> sqlite3.Cursor:
+        return self._run(name, lambda conn, sql: conn.execute(sql, params))
+
+    def executemany(self, name: str, rows: Any) -> sqlite3.Cursor:
+        return self._run(name, lambda conn, sql: conn.executemany(sql, rows))
+
+    def fetchone(self, name: str, params: Any = ()) -> sqlite3.Row | None:
+        return self._run(name, lambda conn, sql: conn.execute(sql, params).fetchone())
+
+    def fetchall(self, name: str, params: Any = ()) -> list[sqlite3.Row]:
+        return self._run(name, lambda conn, sql: conn.execute(sql, params).fetchall())
+
+    # --- Métricas ---
+    def _record(self, name: str, kind: str, elapsed_ms: float, error: Exception | None) -> None:
+        bucket = bisect.bisect_left(QUERY_BUCKET_BOUNDS_MS, elapsed_ms)
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = {
+                    "kind": kind,
+                    "count": 0,
+                    "errors": 0,
+                    "locked_errors": 0,
+                    "constraint_errors": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "buckets": [0] * (len(QUERY_BUCKET_BOUNDS_MS) + 1),
+                    "sketch": LogHistogram(),
+                }
+                self._stats[name] = stats
+            stats["count"] += 1
+            stats["total_ms"] += elapsed_ms
+            stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+            stats["buckets"][bucket] += 1
+            stats["sketch"].add(elapsed_ms)
+            if error is None:
+                return
+            # Las violaciones de restricciones son respuestas esperadas (p. ej.
+            # una vanity duplicada), no fallos de la base.
+            if isinstance(error, sqlite3.IntegrityError):
+                stats["constraint_errors"] += 1
+                return
+            stats["errors"] += 1
+            if "locked" in str(error).lower():
+                stats["locked_errors"] += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        """Copia de las métricas. Los cuantiles salen de cubetas logarítmicas
+        (error relativo ~2 %) y su coste no depende del número de ejecuciones."""
+        merged = LogHistogram()
+        queries = {}
+        with self._lock:
+            for name, stats in self._stats.items():
+                sketch = stats["sketch"]
+                merged.merge(sketch)
+                data = {key: value for key, value in stats.items() if key != "sketch"}
+                data["buckets"] = list(stats["buckets"])
+                data["quantiles_ms"] = dict(zip(QUANTILE_KEYS, sketch.quantiles(QUANTILES), strict=True))
+                queries[name] = data
+            started_at = self.started_at
+        return {
+            "started_at": started_at,
+            "bucket_bounds_ms": list(QUERY_BUCKET_BOUNDS_MS),
+            "quantiles_ms": dict(zip(QUANTILE_KEYS, merged.quantiles(QUANTILES), strict=True)),
+            "queries": queries,
+        }
+
+    def latency_sketch(self) -> LogHistogram:
+        """Copia combinada de los histogramas de latencia de todas las consultas."""
+        merged = LogHistogram()
+        with self._lock:
+            for stats in self._stats.values():
+                merged.merge(stats["sketch"])
+        return merged
+
+    def totals(self) -> dict[str, int]:
+        """Contadores acumulados de todas las consultas, sin copiar histogramas."""
+        totals = dict.fromkeys(("ops", "reads", "writes", "errors", "locked_errors"), 0)
+        with self._lock:
+            for stats in self._stats.values():
+                totals["ops"] += stats["count"]
+                totals["reads" if stats["kind"] == "read" else "writes"] += stats["count"]
+                totals["errors"] += stats["errors"]
+                totals["locked_errors"] += stats["locked_errors"]
+        return totals
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats = {}
+            self.started_at = time.time()
+
+
+query_registry = QueryRegistry(lambda: DB_FILE)
+_register = query_registry.register_many
+_execute = query_registry.execute
+_executemany = query_registry.executemany
+_fetchone = query_registry.fetchone
+_fetchall = query_registry.fetchall
+_transaction = query_registry.transaction
+
+
+def import_legacy_json(conn: sqlite3.Connection, source_dir: Path) -> tuple[int | None, int | None]:
+    """Importa ``guilds.json`` y ``thread_channels.json`` de versiones antiguas.
+
+    Nunca sobrescribe filas existentes. Devuelve cuántos servidores y
+    configuraciones de hilos se leyeron, o ``None`` si falta el archivo.
+    """
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS guilds (
+        guild_id INTEGER PRIMARY KEY,
+        guild_name TEXT NOT NULL
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS thread_configs (
+        channel_id INTEGER PRIMARY KEY,
+        guild_id INTEGER NOT NULL,
+        mode TEXT NOT NULL
+    )
+    """)
+
+    guild_count = None
+    guilds_file = source_dir / "guilds.json"
+    if guilds_file.exists():
+        guilds_data = json.loads(guilds_file.read_text(encoding="utf-8"))
+        conn.executemany(
+            "INSERT OR IGNORE INTO guilds (guild_id, guild_name) VALUES (?, ?)",
+            [(int(guild_id), guild_name) for guild_id, guild_name in guilds_data.items()],
+        )
+        guild_count = len(guilds_data)
+
+    thread_count = None
+    threads_file = source_dir / "thread_channels.json"
+    if threads_file.exists():
+        threads_data = json.loads(threads_file.read_text(encoding="utf-8"))
+        rows = [
+            (int(guild_id), int(channel_id), mode)
+            for guild_id, channels in threads_data.items()
+            for channel_id, mode in channels.items()
+        ]
+        conn.executemany(
+            "INSERT OR IGNORE INTO thread_configs (guild_id, channel_id, mode) VALUES (?, ?, ?)",
+            rows,
+        )
+        thread_count = len(rows)
+
+    return guild_count, thread_count
+
+
+class MigrationOptions:
+    """Parámetros que reciben todos los pasos de ``MIGRATIONS``."""
+
+    __slots__ = ("legacy_json_dir",)
+
+    def __init__(self, legacy_json_dir: Path | None = None):
+        # Carpeta de la que la v1 importa los JSON antiguos; sin ella no importa nada.
+        self.legacy_json_dir = legacy_json_dir
+
+
+def _migration_legacy_json(conn: sqlite3.Connection, options: MigrationOptions) -> None:
+    """v1: datos de la versión basada en archivos JSON."""
+    if options.legacy_json_dir is not None:
+        import_legacy_json(conn, options.legacy_json_dir)
+
+
+def _migration_base_schema(conn: sqlite3.Connection, options: MigrationOptions) -> None:
+    """v2: esquema principal del bot."""
     cursor = conn.cursor()
-    cursor.execute("PRAGMA journal_mode=WAL")
-    cursor.execute("PRAGMA synchronous=NORMAL")
-    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
 
     # Tabla para roles exclusivos (boost o normales)
     cursor.execute("""
@@ -233,86 +534,332 @@ def setup_database():
     )
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_lfg_games_guild_id ON lfg_games(guild_id)")
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_lfg_assignments_guild_id ON lfg_assignments(guild_id)")
-    cursor.execute("PRAGMA user_version = 2")
 
-    conn.commit()
-    conn.close()
 
+def _migration_module_tables(conn: sqlite3.Connection, options: MigrationOptions) -> None:
+    """v3: tablas de Vanity y Clan Tag, antes creadas al cargar cada cog."""
+    # Configuración general del servidor
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS vanity_settings (
+        guild_id INTEGER PRIMARY KEY,
+        channel_id INTEGER,
+        embed_title TEXT DEFAULT '✨ ¡Gracias por representarnos!',
+        embed_description TEXT DEFAULT '{user} ahora tiene **{vanity}** en su estado y recibió {role}',
+        embed_color INTEGER DEFAULT 5763719,
+        embed_thumbnail TEXT,
+        embed_image TEXT,
+        remove_enabled INTEGER DEFAULT 0,
+        remove_channel_id INTEGER,
+        remove_title TEXT DEFAULT '👋 Vanity Removida',
+        remove_description TEXT DEFAULT '{user} quitó **{vanity}** de su estado',
+        remove_color INTEGER DEFAULT 15548997
+    )
+    """)
 
-# --- Funciones para Guilds ---
-def sync_guilds(guilds_from_bot: list[dict]):
-    """Sincroniza la tabla de guilds con la lista de servidores del bot."""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    # Múltiples vanitys por servidor
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS vanity_codes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        guild_id INTEGER NOT NULL,
+        vanity_code TEXT NOT NULL,
+        role_id INTEGER NOT NULL,
+        UNIQUE(guild_id, vanity_code)
+    )
+    """)
+
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS clantag_settings (
+        guild_id INTEGER PRIMARY KEY,
+        role_id INTEGER,
+        channel_id INTEGER,
+        embed_title TEXT DEFAULT '🏷️ ¡Gracias por representarnos!',
+        embed_description TEXT DEFAULT '{user} ahora tiene el tag **{tag}** y recibió {role}',
+        embed_color INTEGER DEFAULT 5763719,
+        remove_enabled INTEGER DEFAULT 0,
+        remove_channel_id INTEGER,
+        remove_title TEXT DEFAULT '😢 Tag removido',
+        remove_description TEXT DEFAULT '{user} ya no tiene el tag **{tag}**',
+        remove_color INTEGER DEFAULT 15548997
+    )
+    """)
+
+
+def _migration_hot_indexes(conn: sqlite3.Connection, options: MigrationOptions) -> None:
+    """v4: índices para las consultas frecuentes que aún recorrían tablas."""
+    # Cubre ``get_vanity_codes`` sin volver a la tabla (``id`` es el rowid).
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_vanity_codes_guild_cover ON vanity_codes(guild_id, vanity_code, role_id)"
+    )
+    # Sustituye al índice por guild_id: el prefijo sigue sirviendo a esas consultas
+    # y además resuelve el borrado de asignaciones de un juego.
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_lfg_assignments_guild_game ON lfg_assignments(guild_id, game_id)"
+    )
+    conn.execute("DROP INDEX IF EXISTS idx_lfg_assignments_guild_id")
+    # Los presets se buscan sin distinguir mayúsculas y solo uno está activo.
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_presence_presets_lower_name ON bot_presence_presets(lower(name))"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_presence_presets_active ON bot_presence_presets(is_active) "
+        "WHERE is_active = 1"
+    )
 
-    # Borra los datos antiguos para empezar de cero
-    cursor.execute("DELETE FROM guilds")
 
-    # Inserta los datos actualizados
-    guild_data = [(guild.id, guild.name) for guild in guilds_from_bot]
-    cursor.executemany("INSERT INTO guilds (guild_id, guild_name) VALUES (?, ?)", guild_data)
+def _migration_support_purge_after(conn: sqlite3.Connection, options: MigrationOptions) -> None:
+    """v5: fecha de purga precalculada para los expedientes de soporte."""
+    if not _column_exists(conn.cursor(), "support_cases", "purge_after"):
+        conn.execute("ALTER TABLE support_cases ADD COLUMN purge_after TEXT")
+    conn.execute(
+        """
+        UPDATE support_cases
+        SET purge_after = (
+            SELECT strftime('%Y-%m-%dT%H:%M:%S+00:00', support_cases.closed_at, '+' || s.retention_days || ' days')
+            FROM support_settings AS s
+            WHERE s.guild_id = support_cases.guild_id
+        )
+        WHERE status = 'closed' AND closed_at IS NOT NULL AND archive_message_id IS NOT NULL
+        """
+    )
+    # Solo los expedientes que aún existen en Discord entran en el índice.
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_support_cases_purge_after ON support_cases(purge_after) "
+        "WHERE archive_message_id IS NOT NULL"
+    )
+    conn.execute("DROP INDEX IF EXISTS idx_support_cases_closed_at")
+
+
+def _migration_app_command_syncs(conn: sqlite3.Connection, options: MigrationOptions) -> None:
+    """v6: huella del último árbol de slash commands sincronizado por ámbito."""
+    # ``guild_id`` 0 es el ámbito global.
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS app_command_syncs (
+        guild_id INTEGER NOT NULL,
+        application_id INTEGER NOT NULL,
+        fingerprint TEXT NOT NULL,
+        command_count INTEGER NOT NULL,
+        synced_at TEXT NOT NULL,
+        PRIMARY KEY (guild_id, application_id)
+    )
+    """)
+
+
+# Pasos ordenados; ``PRAGMA user_version`` guarda el último aplicado. Cada paso
+# es idempotente para que bases antiguas sin versión puedan recorrerlos todos.
+MIGRATIONS: tuple[tuple[int, Callable[[sqlite3.Connection, MigrationOptions], None]], ...] = (
+    (1, _migration_legacy_json),
+    (2, _migration_base_schema),
+    (3, _migration_module_tables),
+    (4, _migration_hot_indexes),
+    (5, _migration_support_purge_after),
+    (6, _migration_app_command_syncs),
+)
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def apply_migrations(conn: sqlite3.Connection, *, legacy_json_dir: Path | None = None) -> list[int]:
+    """Aplica en orden las migraciones pendientes y devuelve sus versiones.
+
+    ``legacy_json_dir`` es la carpeta de la que la v1 importa los JSON antiguos;
+    sin ella la v1 solo se marca como aplicada.
+    """
+    if get_schema_version(conn) >= SCHEMA_VERSION:
+        return []
+    options = MigrationOptions(legacy_json_dir)
+
+    # journal_mode no puede cambiarse dentro de una transacción.
+    conn.execute("PRAGMA journal_mode=WAL")
+    isolation_level = conn.isolation_level
+    conn.isolation_level = None
+    applied: list[int] = []
+    try:
+        for version, step in MIGRATIONS:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Otra instancia pudo migrar mientras esperábamos el bloqueo.
+                if get_schema_version(conn) >= version:
+                    conn.execute("COMMIT")
+                    continue
+                step(conn, options)
+                conn.execute(f"PRAGMA user_version = {version}")
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            applied.append(version)
+    finally:
+        conn.isolation_level = isolation_level
+    return applied
+
+
+def setup_database() -> list[int]:
+    """Deja el esquema en ``SCHEMA_VERSION``.
+
+    Si la base ya está al día solo cuesta una lectura de ``PRAGMA user_version``.
+    """
+    conn = get_db_connection()
+    try:
+        return apply_migrations(conn, legacy_json_dir=LEGACY_JSON_DIR)
+    finally:
+        conn.close()
+
 
-    conn.commit()
-    conn.close()
+# --- Funciones para Guilds ---
+# Tablas con configuración propia de cada servidor. Se limpian juntas cuando el
+# bot sale de un servidor.
+GUILD_OWNED_TABLES = (
+    "thread_configs",
+    "counting_channels",
+    "auto_reactions",
+    "boost_roles",
+    "boost_logs",
+    "vanity_codes",
+    "vanity_settings",
+    "clantag_settings",
+    "support_cases",
+    "support_settings",
+    "lfg_assignments",
+    "lfg_enrollments",
+    "lfg_games",
+    "lfg_settings",
+    "app_command_syncs",
+    "guild_languages",
+    "guilds",
+)
+
+# Los IDs viajan como un único array JSON, así que el coste de cada sentencia
+# no depende de cuántos servidores se eliminen.
+_register(
+    {
+        f"{table_name}.delete_guilds": (
+            f"DELETE FROM {table_name} WHERE guild_id IN (SELECT value FROM json_each(?))"
+        )
+        for table_name in GUILD_OWNED_TABLES
+    }
+)
+_register(
+    {
+        "guilds.all": "SELECT * FROM guilds",
+        "guilds.upsert": (
+            "INSERT INTO guilds (guild_id, guild_name) VALUES (?, ?) "
+            "ON CONFLICT(guild_id) DO UPDATE SET guild_name = excluded.guild_name"
+        ),
+        "guilds.replace": "INSERT OR REPLACE INTO guilds (guild_id, guild_name) VALUES (?, ?)",
+    }
+)
+
+
+def _delete_guilds(guild_ids: list[int]) -> None:
+    """Borra la configuración de varios servidores con una sentencia por tabla.
+
+    Debe llamarse dentro de ``_transaction()``.
+    """
+    payload = json.dumps(guild_ids)
+    for table_name in GUILD_OWNED_TABLES:
+        _execute(f"{table_name}.delete_guilds", (payload,))
+
+
+def sync_guilds(guilds_from_bot: list[dict]) -> list[int]:
+    """Sincroniza la tabla de guilds con la lista de servidores del bot.
+
+    Solo escribe las diferencias: inserta los servidores nuevos, actualiza los
+    renombrados y elimina, junto con su configuración, los que el bot dejó
+    mientras estaba desconectado. Devuelve los IDs eliminados.
+    """
+    current = {guild.id: guild.name for guild in guilds_from_bot}
+    stored = {row["guild_id"]: row["guild_name"] for row in _fetchall("guilds.all")}
+
+    changed = [(guild_id, name) for guild_id, name in current.items() if stored.get(guild_id) != name]
+    # Una lista vacía indica un caché incompleto, no que el bot saliera de todo.
+    departed = sorted(set(stored) - set(current)) if current else []
+
+    if changed or departed:
+        with _transaction():
+            if changed:
+                _executemany("guilds.upsert", changed)
+            if departed:
+                _delete_guilds(departed)
+    return departed
 
 
 def add_guild(guild: dict):
     """Añade un servidor a la base de datos."""
-    conn = get_db_connection()
-    conn.execute("INSERT OR REPLACE INTO guilds (guild_id, guild_name) VALUES (?, ?)", (guild.id, guild.name))
-    conn.commit()
-    conn.close()
+    _execute("guilds.replace", (guild.id, guild.name))
 
 
 def remove_guild(guild: dict):
     """Elimina un servidor y toda la configuración que le pertenece."""
-    conn = get_db_connection()
-    guild_id = guild.id
-    for table_name in (
-        "thread_configs",
-        "counting_channels",
-        "auto_reactions",
-        "boost_roles",
-        "boost_logs",
-        "vanity_codes",
-        "vanity_settings",
-        "clantag_settings",
-        "support_cases",
-        "support_settings",
-        "lfg_assignments",
-        "lfg_enrollments",
-        "lfg_games",
-        "lfg_settings",
-        "guild_languages",
-    ):
-        conn.execute(f"DELETE FROM {table_name} WHERE guild_id = ?", (guild_id,))
-    conn.execute("DELETE FROM guilds WHERE guild_id = ?", (guild_id,))
-    conn.commit()
-    conn.close()
+    remove_guilds([guild.id])
+
+
+def remove_guilds(guild_ids: list[int]):
+    """Elimina varios servidores y su configuración en una sola transacción."""
+    if not guild_ids:
+        return
+    with _transaction():
+        _delete_guilds(list(guild_ids))
 
 
 def get_all_guilds() -> list[sqlite3.Row]:
     """Obtiene todos los servidores de la base de datos."""
-    conn = get_db_connection()
-    guilds = conn.execute("SELECT * FROM guilds").fetchall()
-    conn.close()
-    return guilds
+    return _fetchall("guilds.all")
+
+
+# Consulta agrupada para el resumen de módulos. Cada fila devuelve
+# (guild_id, módulo, total).
+_register(
+    {
+        "modules.summary": " UNION ALL ".join(
+            (
+                "SELECT guild_id, 'thread', COUNT(*) FROM thread_configs GROUP BY guild_id",
+                "SELECT guild_id, 'counting', COUNT(*) FROM counting_channels GROUP BY guild_id",
+                "SELECT guild_id, 'react', COUNT(*) FROM auto_reactions GROUP BY guild_id",
+                "SELECT guild_id, 'vanity_codes', COUNT(*) FROM vanity_codes GROUP BY guild_id",
+                "SELECT guild_id, 'vanity_settings', 1 FROM vanity_settings "
+                "WHERE COALESCE(channel_id, 0) != 0 OR COALESCE(remove_channel_id, 0) != 0 "
+                "OR COALESCE(remove_enabled, 0) != 0",
+                "SELECT guild_id, 'clantag', 1 FROM clantag_settings "
+                "WHERE COALESCE(role_id, 0) != 0 OR COALESCE(channel_id, 0) != 0 "
+                "OR COALESCE(remove_channel_id, 0) != 0 OR COALESCE(remove_enabled, 0) != 0",
+                "SELECT guild_id, 'boostrole', COUNT(*) FROM boost_roles GROUP BY guild_id",
+                "SELECT guild_id, 'boost_log', 1 FROM boost_logs",
+            )
+        ),
+    }
+)
+
+
+def get_configured_module_summary() -> dict[int, dict[str, int]]:
+    """Devuelve {guild_id: {módulo: total}} de todos los servidores en una sola consulta."""
+    summary: dict[int, dict[str, int]] = {}
+    for guild_id, module, total in _fetchall("modules.summary"):
+        summary.setdefault(guild_id, {})[module] = total
+    return summary
+
+
+_register(
+    {
+        "guild_languages.all": "SELECT guild_id, language_mode FROM guild_languages",
+        "guild_languages.get": "SELECT language_mode FROM guild_languages WHERE guild_id = ?",
+        "guild_languages.upsert": """
+        INSERT INTO guild_languages (guild_id, language_mode)
+        VALUES (?, ?)
+        ON CONFLICT(guild_id) DO UPDATE SET language_mode = excluded.language_mode
+        """,
+    }
+)
 
 
 def get_all_guild_languages() -> list[sqlite3.Row]:
-    conn = get_db_connection()
-    rows = conn.execute("SELECT guild_id, language_mode FROM guild_languages").fetchall()
-    conn.close()
-    return rows
+    return _fetchall("guild_languages.all")
 
 
 def get_guild_language(guild_id: int) -> str:
-    conn = get_db_connection()
-    row = conn.execute(
-        "SELECT language_mode FROM guild_languages WHERE guild_id = ?",
-        (guild_id,),
-    ).fetchone()
-    conn.close()
+    row = _fetchone("guild_languages.get", (guild_id,))
     return row["language_mode"] if row else "auto"
 
 
@@ -320,61 +867,46 @@ def set_guild_language(guild_id: int, language_mode: str) -> None:
     if language_mode not in {"auto", "en", "es"}:
         raise ValueError(f"Unsupported language mode: {language_mode}")
 
-    conn = get_db_connection()
-    conn.execute(
-        """
-        INSERT INTO guild_languages (guild_id, language_mode)
-        VALUES (?, ?)
-        ON CONFLICT(guild_id) DO UPDATE SET language_mode = excluded.language_mode
-        """,
-        (guild_id, language_mode),
-    )
-    conn.commit()
-    conn.close()
+    _execute("guild_languages.upsert", (guild_id, language_mode))
 
 
 # --- Funciones para Threads ---
+_register(
+    {
+        "thread_configs.replace": (
+            "INSERT OR REPLACE INTO thread_configs (guild_id, channel_id, mode) VALUES (?, ?, ?)"
+        ),
+        "thread_configs.delete": "DELETE FROM thread_configs WHERE channel_id = ?",
+        "thread_configs.get": "SELECT * FROM thread_configs WHERE channel_id = ?",
+        "thread_configs.for_guild": "SELECT * FROM thread_configs WHERE guild_id = ?",
+    }
+)
+
+
 def add_thread_config(guild_id: int, channel_id: int, mode: str):
     """Añade o actualiza una configuración de hilo."""
-    conn = get_db_connection()
-    conn.execute(
-        "INSERT OR REPLACE INTO thread_configs (guild_id, channel_id, mode) VALUES (?, ?, ?)",
-        (guild_id, channel_id, mode),
-    )
-    conn.commit()
-    conn.close()
+    _execute("thread_configs.replace", (guild_id, channel_id, mode))
 
 
 def remove_thread_config(channel_id: int):
     """Elimina una configuración de hilo."""
-    conn = get_db_connection()
-    conn.execute("DELETE FROM thread_configs WHERE channel_id = ?", (channel_id,))
-    conn.commit()
-    conn.close()
+    _execute("thread_configs.delete", (channel_id,))
 
 
 def get_thread_config_for_channel(channel_id: int) -> sqlite3.Row | None:
     """Obtiene la configuración de un canal específico."""
-    conn = get_db_connection()
-    config = conn.execute("SELECT * FROM thread_configs WHERE channel_id = ?", (channel_id,)).fetchone()
-    conn.close()
-    return config
+    return _fetchone("thread_configs.get", (channel_id,))
 
 
 def get_all_thread_configs_for_guild(guild_id: int) -> list[sqlite3.Row]:
     """Obtiene todas las configuraciones de hilos para un servidor."""
-    conn = get_db_connection()
-    configs = conn.execute("SELECT * FROM thread_configs WHERE guild_id = ?", (guild_id,)).fetchall()
-    conn.close()
-    return configs
+    return _fetchall("thread_configs.for_guild", (guild_id,))
 
 
 # --- NUEVAS FUNCIONES PARA EL CONTEO ---
-def set_counting_channel(channel_id: int, guild_id: int):
-    """Establece un canal para el conteo, reseteando su progreso."""
-    conn = get_db_connection()
-    conn.execute(
-        """
+_register(
+    {
+        "counting_channels.set": """
         INSERT INTO counting_channels (channel_id, guild_id, current_number, last_user_id)
         VALUES (?, ?, 0, 0)
         ON CONFLICT(channel_id) DO UPDATE SET
@@ -382,187 +914,170 @@ def set_counting_channel(channel_id: int, guild_id: int):
             current_number = 0,
             last_user_id = 0
         """,
-        (channel_id, guild_id),
-    )
-    conn.commit()
-    conn.close()
+        "counting_channels.delete": "DELETE FROM counting_channels WHERE channel_id = ?",
+        "counting_channels.get": "SELECT * FROM counting_channels WHERE channel_id = ?",
+        "counting_channels.for_guild": "SELECT * FROM counting_channels WHERE guild_id = ?",
+        "counting_channels.update_count": """
+        UPDATE counting_channels
+        SET current_number = ?,
+            last_user_id = ?,
+            high_score = MAX(high_score, ?)
+        WHERE channel_id = ?
+        """,
+        "counting_channels.reset": (
+            "UPDATE counting_channels SET current_number = 0, last_user_id = 0 WHERE channel_id = ?"
+        ),
+    }
+)
+
+
+def set_counting_channel(channel_id: int, guild_id: int):
+    """Establece un canal para el conteo, reseteando su progreso."""
+    _execute("counting_channels.set", (channel_id, guild_id))
 
 
 def remove_counting_channel(channel_id: int):
     """Desactiva el conteo en un canal sin afectar otros canales."""
-    conn = get_db_connection()
-    conn.execute("DELETE FROM counting_channels WHERE channel_id = ?", (channel_id,))
-    conn.commit()
-    conn.close()
+    _execute("counting_channels.delete", (channel_id,))
 
 
 def get_counting_channel(channel_id: int):
     """Obtiene la información de un canal de conteo."""
-    conn = get_db_connection()
-    channel_data = conn.execute(
-        "SELECT * FROM counting_channels WHERE channel_id = ?", (channel_id,)
-    ).fetchone()
-    conn.close()
-    return channel_data
+    return _fetchone("counting_channels.get", (channel_id,))
 
 
 def get_counting_channels_for_guild(guild_id: int) -> list[sqlite3.Row]:
     """Obtiene todos los canales de conteo configurados en un servidor."""
-    conn = get_db_connection()
-    rows = conn.execute("SELECT * FROM counting_channels WHERE guild_id = ?", (guild_id,)).fetchall()
-    conn.close()
-    return rows
+    return _fetchall("counting_channels.for_guild", (guild_id,))
 
 
 def update_count(channel_id: int, new_number: int, user_id: int):
     """Actualiza el número y el último usuario en un canal de conteo."""
-    conn = get_db_connection()
-    conn.execute(
-        """
-        UPDATE counting_channels
-        SET current_number = ?,
-            last_user_id = ?,
-            high_score = MAX(high_score, ?)
-        WHERE channel_id = ?
-        """,
-        (new_number, user_id, new_number, channel_id),
-    )
-    conn.commit()
-    conn.close()
+    _execute("counting_channels.update_count", (new_number, user_id, new_number, channel_id))
 
 
 def reset_count(channel_id: int):
     """Resetea el conteo de un canal a 0."""
-    conn = get_db_connection()
-    conn.execute(
-        "UPDATE counting_channels SET current_number = 0, last_user_id = 0 WHERE channel_id = ?",
-        (channel_id,),
-    )
-    conn.commit()
-    conn.close()
+    _execute("counting_channels.reset", (channel_id,))
 
 
 # ───── Funciones BoostRoles ─────
+_register(
+    {
+        "boost_roles.replace": (
+            "INSERT OR REPLACE INTO boost_roles (role_id, guild_id, linked_to_boost) VALUES (?, ?, ?)"
+        ),
+        "boost_roles.for_guild": "SELECT * FROM boost_roles WHERE guild_id = ?",
+        "boost_roles.linked_for_guild": (
+            "SELECT role_id FROM boost_roles WHERE guild_id = ? AND linked_to_boost = 1"
+        ),
+        "boost_roles.get": "SELECT * FROM boost_roles WHERE guild_id = ? AND role_id = ?",
+        "boost_roles.delete": "DELETE FROM boost_roles WHERE guild_id = ? AND role_id = ?",
+        "boost_logs.replace": "INSERT OR REPLACE INTO boost_logs (guild_id, channel_id) VALUES (?, ?)",
+        "boost_logs.get": "SELECT * FROM boost_logs WHERE guild_id = ?",
+    }
+)
+
+
 def add_boost_role(guild_id: int, role_id: int, linked_to_boost: bool):
-    conn = get_db_connection()
-    conn.execute(
-        "INSERT OR REPLACE INTO boost_roles (role_id, guild_id, linked_to_boost) VALUES (?, ?, ?)",
-        (role_id, guild_id, int(linked_to_boost)),
-    )
-    conn.commit()
-    conn.close()
+    _execute("boost_roles.replace", (role_id, guild_id, int(linked_to_boost)))
 
 
 def get_boost_roles_for_guild(guild_id: int):
-    conn = get_db_connection()
-    rows = conn.execute("SELECT * FROM boost_roles WHERE guild_id = ?", (guild_id,)).fetchall()
-    conn.close()
-    return rows
+    return _fetchall("boost_roles.for_guild", (guild_id,))
 
 
 def get_linked_roles_for_guild(guild_id: int):
     """Devuelve los role_id marcados como vinculados a Boost."""
-    conn = get_db_connection()
-    rows = conn.execute(
-        "SELECT role_id FROM boost_roles WHERE guild_id = ? AND linked_to_boost = 1",
-        (guild_id,),
-    ).fetchall()
-    conn.close()
+    rows = _fetchall("boost_roles.linked_for_guild", (guild_id,))
     return [r["role_id"] for r in rows]
 
 
 def set_boost_log_channel(guild_id: int, channel_id: int):
-    conn = get_db_connection()
-    conn.execute(
-        "INSERT OR REPLACE INTO boost_logs (guild_id, channel_id) VALUES (?, ?)",
-        (guild_id, channel_id),
-    )
-    conn.commit()
-    conn.close()
+    _execute("boost_logs.replace", (guild_id, channel_id))
 
 
 def get_boost_log_channel(guild_id: int):
-    conn = get_db_connection()
-    row = conn.execute("SELECT * FROM boost_logs WHERE guild_id = ?", (guild_id,)).fetchone()
-    conn.close()
-    return row
+    return _fetchone("boost_logs.get", (guild_id,))
 
 
 def get_boost_role(guild_id: int, role_id: int):
     """Devuelve una fila (o None) con la configuración de un rol concreto."""
-    conn = get_db_connection()
-    row = conn.execute(
-        "SELECT * FROM boost_roles WHERE guild_id = ? AND role_id = ?", (guild_id, role_id)
-    ).fetchone()
-    conn.close()
-    return row
+    return _fetchone("boost_roles.get", (guild_id, role_id))
 
 
 def delete_boost_role(guild_id: int, role_id: int):
-    conn = get_db_connection()
-    conn.execute("DELETE FROM boost_roles WHERE guild_id = ? AND role_id = ?", (guild_id, role_id))
-    conn.commit()
-    conn.close()
+    _execute("boost_roles.delete", (guild_id, role_id))
 
 
 # --- Funciones para Auto Reactions ---
+_register(
+    {
+        "auto_reactions.replace": (
+            "INSERT OR REPLACE INTO auto_reactions (guild_id, trigger_word, emojis, case_sensitive) "
+            "VALUES (?, ?, ?, 0)"
+        ),
+        "auto_reactions.delete": "DELETE FROM auto_reactions WHERE guild_id = ? AND trigger_word = ?",
+        "auto_reactions.get": "SELECT * FROM auto_reactions WHERE guild_id = ? AND trigger_word = ?",
+        "auto_reactions.for_guild": "SELECT * FROM auto_reactions WHERE guild_id = ? ORDER BY trigger_word",
+        "auto_reactions.clear": "DELETE FROM auto_reactions WHERE guild_id = ?",
+    }
+)
+
+
 def add_auto_reaction(guild_id: int, trigger_word: str, emojis: list):
     """Añade o actualiza una configuración de reacción automática."""
-    import json
-
-    conn = get_db_connection()
-    emojis_json = json.dumps(emojis)
-    conn.execute(
-        "INSERT OR REPLACE INTO auto_reactions (guild_id, trigger_word, emojis, case_sensitive) "
-        "VALUES (?, ?, ?, 0)",
-        (guild_id, trigger_word.lower(), emojis_json),
-    )
-    conn.commit()
-    conn.close()
+    _execute("auto_reactions.replace", (guild_id, trigger_word.lower(), json.dumps(emojis)))
 
 
 def remove_auto_reaction(guild_id: int, trigger_word: str):
     """Elimina una configuración de reacción automática."""
-    conn = get_db_connection()
-    conn.execute(
-        "DELETE FROM auto_reactions WHERE guild_id = ? AND trigger_word = ?", (guild_id, trigger_word.lower())
-    )
-    conn.commit()
-    conn.close()
+    _execute("auto_reactions.delete", (guild_id, trigger_word.lower()))
 
 
 def get_auto_reaction(guild_id: int, trigger_word: str) -> sqlite3.Row | None:
     """Obtiene una configuración específica de reacción automática."""
-    conn = get_db_connection()
-    row = conn.execute(
-        "SELECT * FROM auto_reactions WHERE guild_id = ? AND trigger_word = ?",
-        (guild_id, trigger_word.lower()),
-    ).fetchone()
-    conn.close()
-    return row
+    return _fetchone("auto_reactions.get", (guild_id, trigger_word.lower()))
 
 
 def get_all_auto_reactions(guild_id: int) -> list[sqlite3.Row]:
     """Obtiene todas las configuraciones de reacciones automáticas de un servidor."""
-    conn = get_db_connection()
-    rows = conn.execute(
-        "SELECT * FROM auto_reactions WHERE guild_id = ? ORDER BY trigger_word", (guild_id,)
-    ).fetchall()
-    conn.close()
-    return rows
+    return _fetchall("auto_reactions.for_guild", (guild_id,))
 
 
 def clear_auto_reactions(guild_id: int):
     """Elimina todas las configuraciones de reacciones automáticas de un servidor."""
-    conn = get_db_connection()
-    conn.execute("DELETE FROM auto_reactions WHERE guild_id = ?", (guild_id,))
-    conn.commit()
-    conn.close()
+    _execute("auto_reactions.clear", (guild_id,))
 
 
 # ──────────────────────────────────────────────────────────────────────────────
 # BOT PRESENCE PRESETS
 # ──────────────────────────────────────────────────────────────────────────────
+_register(
+    {
+        "presence_presets.find_name": "SELECT name FROM bot_presence_presets WHERE lower(name) = lower(?)",
+        "presence_presets.update": """
+        UPDATE bot_presence_presets
+        SET activity_type = ?, status = ?, activity_text = ?, activity_emoji = ?
+        WHERE name = ?
+        """,
+        "presence_presets.insert": """
+        INSERT INTO bot_presence_presets (name, activity_type, status, activity_text, activity_emoji)
+        VALUES (?, ?, ?, ?, ?)
+        """,
+        "presence_presets.list": (
+            "SELECT * FROM bot_presence_presets ORDER BY is_active DESC, name COLLATE NOCASE"
+        ),
+        "presence_presets.get": "SELECT * FROM bot_presence_presets WHERE lower(name) = lower(?)",
+        "presence_presets.deactivate_all": "UPDATE bot_presence_presets SET is_active = 0 WHERE is_active = 1",
+        "presence_presets.activate": "UPDATE bot_presence_presets SET is_active = 1 WHERE name = ?",
+        "presence_presets.active": "SELECT * FROM bot_presence_presets WHERE is_active = 1 LIMIT 1",
+        "presence_presets.delete": "DELETE FROM bot_presence_presets WHERE lower(name) = lower(?)",
+        "presence_presets.clear": "DELETE FROM bot_presence_presets",
+    }
+)
+
+
 def upsert_bot_presence_preset(
     name: str,
     activity_type: str,
@@ -571,112 +1086,97 @@ def upsert_bot_presence_preset(
     activity_emoji: str | None = None,
 ):
     """Crea o actualiza un preset de presencia."""
-    conn = get_db_connection()
-    existing = conn.execute(
-        "SELECT name FROM bot_presence_presets WHERE lower(name) = lower(?)",
-        (name,),
-    ).fetchone()
-    if existing:
-        conn.execute(
-            """
-            UPDATE bot_presence_presets
-            SET activity_type = ?, status = ?, activity_text = ?, activity_emoji = ?
-            WHERE name = ?
-            """,
-            (activity_type, status, activity_text, activity_emoji, existing["name"]),
-        )
-    else:
-        conn.execute(
-            """
-            INSERT INTO bot_presence_presets (name, activity_type, status, activity_text, activity_emoji)
-            VALUES (?, ?, ?, ?, ?)
-            """,
-            (name, activity_type, status, activity_text, activity_emoji),
-        )
-    conn.commit()
-    conn.close()
+    with _transaction():
+        existing = _fetchone("presence_presets.find_name", (name,))
+        if existing:
+            _execute(
+                "presence_presets.update",
+                (activity_type, status, activity_text, activity_emoji, existing["name"]),
+            )
+        else:
+            _execute(
+                "presence_presets.insert",
+                (name, activity_type, status, activity_text, activity_emoji),
+            )
 
 
 def list_bot_presence_presets() -> list[sqlite3.Row]:
-    conn = get_db_connection()
-    rows = conn.execute(
-        "SELECT * FROM bot_presence_presets ORDER BY is_active DESC, name COLLATE NOCASE"
-    ).fetchall()
-    conn.close()
-    return rows
+    return _fetchall("presence_presets.list")
 
 
 def get_bot_presence_preset(name: str) -> sqlite3.Row | None:
-    conn = get_db_connection()
-    row = conn.execute(
-        "SELECT * FROM bot_presence_presets WHERE lower(name) = lower(?)",
-        (name,),
-    ).fetchone()
-    conn.close()
-    return row
+    return _fetchone("presence_presets.get", (name,))
 
 
 def set_active_bot_presence_preset(name: str) -> bool:
-    conn = get_db_connection()
-    row = conn.execute(
-        "SELECT name FROM bot_presence_presets WHERE lower(name) = lower(?)",
-        (name,),
-    ).fetchone()
-    if row is None:
-        conn.close()
-        return False
+    with _transaction():
+        row = _fetchone("presence_presets.find_name", (name,))
+        if row is None:
+            return False
 
-    conn.execute("UPDATE bot_presence_presets SET is_active = 0")
-    conn.execute(
-        "UPDATE bot_presence_presets SET is_active = 1 WHERE name = ?",
-        (row["name"],),
-    )
-    conn.commit()
-    conn.close()
+        _execute("presence_presets.deactivate_all")
+        _execute("presence_presets.activate", (row["name"],))
     return True
 
 
 def get_active_bot_presence_preset() -> sqlite3.Row | None:
-    conn = get_db_connection()
-    row = conn.execute("SELECT * FROM bot_presence_presets WHERE is_active = 1 LIMIT 1").fetchone()
-    conn.close()
-    return row
+    return _fetchone("presence_presets.active")
 
 
 def delete_bot_presence_preset(name: str) -> bool:
-    conn = get_db_connection()
-    cursor = conn.execute(
-        "DELETE FROM bot_presence_presets WHERE lower(name) = lower(?)",
-        (name,),
-    )
-    conn.commit()
-    deleted = cursor.rowcount > 0
-    conn.close()
-    return deleted
+    cursor = _execute("presence_presets.delete", (name,))
+    return cursor.rowcount > 0
 
 
 def clear_bot_presence_presets():
-    conn = get_db_connection()
-    conn.execute("DELETE FROM bot_presence_presets")
-    conn.commit()
-    conn.close()
+    _execute("presence_presets.clear")
 
 
 # ---------------------------------------------------------------------------
-# SUPPORT CASES
+# SLASH COMMAND SYNC
 # ---------------------------------------------------------------------------
-def set_support_settings(
-    guild_id: int,
-    archive_channel_id: int,
-    category_id: int,
-    support_role_id: int,
-    retention_days: int,
+GLOBAL_COMMAND_SCOPE = 0
+
+_register(
+    {
+        "app_command_syncs.get": (
+            "SELECT * FROM app_command_syncs WHERE guild_id = ? AND application_id = ?"
+        ),
+        "app_command_syncs.upsert": (
+            "INSERT INTO app_command_syncs "
+            "(guild_id, application_id, fingerprint, command_count, synced_at) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(guild_id, application_id) DO UPDATE SET "
+            "fingerprint = excluded.fingerprint, command_count = excluded.command_count, "
+            "synced_at = excluded.synced_at"
+        ),
+    }
+)
+
+
+def get_app_command_sync(application_id: int, guild_id: int = GLOBAL_COMMAND_SCOPE) -> sqlite3.Row | None:
+    """Última sincronización registrada para el ámbito (0 = global)."""
+    return _fetchone("app_command_syncs.get", (guild_id, application_id))
+
+
+def set_app_command_sync(
+    application_id: int,
+    fingerprint: str,
+    command_count: int,
+    synced_at: str,
+    guild_id: int = GLOBAL_COMMAND_SCOPE,
 ):
-    if not 1 <= retention_days <= 90:
-        raise ValueError("retention_days debe estar entre 1 y 90")
-    conn = get_db_connection()
-    conn.execute(
-        """
+    _execute(
+        "app_command_syncs.upsert",
+        (guild_id, application_id, fingerprint, command_count, synced_at),
+    )
+
+
+# ---------------------------------------------------------------------------
+# SUPPORT CASES
+# ---------------------------------------------------------------------------
+_register(
+    {
+        "support_settings.upsert": """
         INSERT INTO support_settings (
             guild_id, archive_channel_id, category_id, support_role_id, retention_days
         )
@@ -687,24 +1187,73 @@ def set_support_settings(
             support_role_id = excluded.support_role_id,
             retention_days = excluded.retention_days
         """,
+        "support_settings.get": "SELECT * FROM support_settings WHERE guild_id = ?",
+        "support_settings.delete": "DELETE FROM support_settings WHERE guild_id = ?",
+        "support_cases.insert": """
+        INSERT INTO support_cases (guild_id, channel_id, opener_id, subject, created_at)
+        VALUES (?, ?, ?, ?, ?)
+        """,
+        "support_cases.by_channel": "SELECT * FROM support_cases WHERE channel_id = ?",
+        "support_cases.get": "SELECT * FROM support_cases WHERE guild_id = ? AND case_id = ?",
+        "support_cases.open_for_user": """
+        SELECT * FROM support_cases
+        WHERE guild_id = ? AND opener_id = ? AND status = 'open'
+        ORDER BY case_id DESC
+        LIMIT 1
+        """,
+        "support_cases.delete": "DELETE FROM support_cases WHERE case_id = ?",
+        "support_cases.for_guild": "SELECT * FROM support_cases WHERE guild_id = ? ORDER BY case_id DESC",
+        "support_cases.for_guild_status": (
+            "SELECT * FROM support_cases WHERE guild_id = ? AND status = ? ORDER BY case_id DESC"
+        ),
+        "support_cases.close": """
+        UPDATE support_cases
+        SET status = 'closed', archive_channel_id = ?, archive_message_id = ?, closed_at = ?,
+            purge_after = (
+                SELECT strftime('%Y-%m-%dT%H:%M:%S+00:00', ?, '+' || s.retention_days || ' days')
+                FROM support_settings AS s
+                WHERE s.guild_id = support_cases.guild_id
+            )
+        WHERE case_id = ? AND status = 'open'
+        """,
+        "support_cases.clear_archive": """
+        UPDATE support_cases
+        SET archive_channel_id = NULL, archive_message_id = NULL
+        WHERE case_id = ?
+        """,
+        "support_cases.expired_archives": """
+        SELECT * FROM support_cases
+        WHERE archive_message_id IS NOT NULL
+          AND purge_after <= ?
+          AND (purge_after, case_id) > (?, ?)
+        ORDER BY purge_after, case_id
+        LIMIT ?
+        """,
+    }
+)
+
+
+def set_support_settings(
+    guild_id: int,
+    archive_channel_id: int,
+    category_id: int,
+    support_role_id: int,
+    retention_days: int,
+):
+    if not 1 <= retention_days <= 90:
+        raise ValueError("retention_days debe estar entre 1 y 90")
+    _execute(
+        "support_settings.upsert",
         (guild_id, archive_channel_id, category_id, support_role_id, retention_days),
     )
-    conn.commit()
-    conn.close()
 
 
 def get_support_settings(guild_id: int) -> sqlite3.Row | None:
-    conn = get_db_connection()
-    row = conn.execute("SELECT * FROM support_settings WHERE guild_id = ?", (guild_id,)).fetchone()
-    conn.close()
-    return row
+    return _fetchone("support_settings.get", (guild_id,))
 
 
 def delete_support_settings(guild_id: int):
-    conn = get_db_connection()
-    conn.execute("DELETE FROM support_settings WHERE guild_id = ?", (guild_id,))
-    conn.commit()
-    conn.close()
+    _execute("support_settings.delete", (guild_id,))
 
 
 def create_support_case(
@@ -714,74 +1263,30 @@ def create_support_case(
     subject: str,
     created_at: str,
 ) -> int:
-    conn = get_db_connection()
-    try:
-        cursor = conn.execute(
-            """
-            INSERT INTO support_cases (guild_id, channel_id, opener_id, subject, created_at)
-            VALUES (?, ?, ?, ?, ?)
-            """,
-            (guild_id, channel_id, opener_id, subject, created_at),
-        )
-        conn.commit()
-        return int(cursor.lastrowid)
-    finally:
-        conn.close()
+    cursor = _execute("support_cases.insert", (guild_id, channel_id, opener_id, subject, created_at))
+    return int(cursor.lastrowid)
 
 
 def get_support_case_by_channel(channel_id: int) -> sqlite3.Row | None:
-    conn = get_db_connection()
-    row = conn.execute("SELECT * FROM support_cases WHERE channel_id = ?", (channel_id,)).fetchone()
-    conn.close()
-    return row
+    return _fetchone("support_cases.by_channel", (channel_id,))
 
 
 def get_support_case(guild_id: int, case_id: int) -> sqlite3.Row | None:
-    conn = get_db_connection()
-    row = conn.execute(
-        "SELECT * FROM support_cases WHERE guild_id = ? AND case_id = ?",
-        (guild_id, case_id),
-    ).fetchone()
-    conn.close()
-    return row
+    return _fetchone("support_cases.get", (guild_id, case_id))
 
 
 def get_open_support_case_for_user(guild_id: int, opener_id: int) -> sqlite3.Row | None:
-    conn = get_db_connection()
-    row = conn.execute(
-        """
-        SELECT * FROM support_cases
-        WHERE guild_id = ? AND opener_id = ? AND status = 'open'
-        ORDER BY case_id DESC
-        LIMIT 1
-        """,
-        (guild_id, opener_id),
-    ).fetchone()
-    conn.close()
-    return row
+    return _fetchone("support_cases.open_for_user", (guild_id, opener_id))
 
 
 def delete_support_case_record(case_id: int):
-    conn = get_db_connection()
-    conn.execute("DELETE FROM support_cases WHERE case_id = ?", (case_id,))
-    conn.commit()
-    conn.close()
+    _execute("support_cases.delete", (case_id,))
 
 
 def get_support_cases_for_guild(guild_id: int, status: str | None = None) -> list[sqlite3.Row]:
-    conn = get_db_connection()
     if status is None:
-        rows = conn.execute(
-            "SELECT * FROM support_cases WHERE guild_id = ? ORDER BY case_id DESC",
-            (guild_id,),
-        ).fetchall()
-    else:
-        rows = conn.execute(
-            "SELECT * FROM support_cases WHERE guild_id = ? AND status = ? ORDER BY case_id DESC",
-            (guild_id, status),
-        ).fetchall()
-    conn.close()
-    return rows
+        return _fetchall("support_cases.for_guild", (guild_id,))
+    return _fetchall("support_cases.for_guild_status", (guild_id, status))
 
 
 def close_support_case(
@@ -790,63 +1295,40 @@ def close_support_case(
     archive_message_id: int,
     closed_at: str,
 ) -> bool:
-    conn = get_db_connection()
-    cursor = conn.execute(
-        """
-        UPDATE support_cases
-        SET status = 'closed', archive_channel_id = ?, archive_message_id = ?, closed_at = ?
-        WHERE case_id = ? AND status = 'open'
-        """,
-        (archive_channel_id, archive_message_id, closed_at, case_id),
+    # La purga usa la retención vigente al cerrar, la misma que indica el expediente.
+    cursor = _execute(
+        "support_cases.close",
+        (archive_channel_id, archive_message_id, closed_at, closed_at, case_id),
     )
-    conn.commit()
-    changed = cursor.rowcount > 0
-    conn.close()
-    return changed
+    return cursor.rowcount > 0
 
 
 def clear_support_archive(case_id: int) -> bool:
-    conn = get_db_connection()
-    cursor = conn.execute(
-        """
-        UPDATE support_cases
-        SET archive_channel_id = NULL, archive_message_id = NULL
-        WHERE case_id = ?
-        """,
-        (case_id,),
-    )
-    conn.commit()
-    changed = cursor.rowcount > 0
-    conn.close()
-    return changed
+    cursor = _execute("support_cases.clear_archive", (case_id,))
+    return cursor.rowcount > 0
 
 
-def get_expired_support_archives(now_iso: str) -> list[sqlite3.Row]:
-    conn = get_db_connection()
-    rows = conn.execute(
-        """
-        SELECT c.*, s.retention_days
-        FROM support_cases AS c
-        JOIN support_settings AS s ON s.guild_id = c.guild_id
-        WHERE c.status = 'closed'
-          AND c.archive_channel_id IS NOT NULL
-          AND c.archive_message_id IS NOT NULL
-          AND c.closed_at IS NOT NULL
-          AND julianday(c.closed_at) <= julianday(?) - s.retention_days
-        """,
-        (now_iso,),
-    ).fetchall()
-    conn.close()
-    return rows
+def get_expired_support_archives(
+    now_iso: str,
+    *,
+    after: tuple[str, int] | None = None,
+    limit: int = SUPPORT_PURGE_BATCH,
+) -> list[sqlite3.Row]:
+    """Devuelve hasta ``limit`` expedientes cuya ``purge_after`` ya pasó.
+
+    Se ordenan por (purge_after, case_id); para la página siguiente se pasa en
+    ``after`` ese par de la última fila recibida.
+    """
+    after_purge, after_case = after or ("", 0)
+    return _fetchall("support_cases.expired_archives", (now_iso, after_purge, after_case, limit))
 
 
 # ---------------------------------------------------------------------------
 # LIVE ACTIVITY LFG
 # ---------------------------------------------------------------------------
-def set_lfg_settings(guild_id: int, dashboard_channel_id: int):
-    conn = get_db_connection()
-    conn.execute(
-        """
+_register(
+    {
+        "lfg_settings.set": """
         INSERT INTO lfg_settings (guild_id, dashboard_channel_id)
         VALUES (?, ?)
         ON CONFLICT(guild_id) DO UPDATE SET
@@ -857,37 +1339,74 @@ def set_lfg_settings(guild_id: int, dashboard_channel_id: int):
                 ELSE NULL
             END
         """,
-        (guild_id, dashboard_channel_id),
-    )
-    conn.commit()
-    conn.close()
+        "lfg_settings.get": "SELECT * FROM lfg_settings WHERE guild_id = ?",
+        "lfg_settings.set_message": "UPDATE lfg_settings SET dashboard_message_id = ? WHERE guild_id = ?",
+        "lfg_settings.delete": "DELETE FROM lfg_settings WHERE guild_id = ?",
+        "lfg_games.upsert": """
+        INSERT INTO lfg_games (guild_id, activity_name, display_name, role_id)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(guild_id, activity_name) DO UPDATE SET
+            display_name = excluded.display_name,
+            role_id = excluded.role_id
+        """,
+        "lfg_games.for_guild": (
+            "SELECT * FROM lfg_games WHERE guild_id = ? ORDER BY display_name COLLATE NOCASE"
+        ),
+        "lfg_games.by_activity": (
+            "SELECT * FROM lfg_games WHERE guild_id = ? AND activity_name = ? COLLATE NOCASE"
+        ),
+        "lfg_games.delete": "DELETE FROM lfg_games WHERE game_id = ?",
+        "lfg_games.delete_guild": "DELETE FROM lfg_games WHERE guild_id = ?",
+        "lfg_enrollments.insert": """
+        INSERT INTO lfg_enrollments (guild_id, user_id, enrolled_at)
+        VALUES (?, ?, ?)
+        ON CONFLICT(guild_id, user_id) DO NOTHING
+        """,
+        "lfg_enrollments.exists": "SELECT 1 FROM lfg_enrollments WHERE guild_id = ? AND user_id = ?",
+        "lfg_enrollments.for_guild": "SELECT * FROM lfg_enrollments WHERE guild_id = ?",
+        "lfg_enrollments.delete": "DELETE FROM lfg_enrollments WHERE guild_id = ? AND user_id = ?",
+        "lfg_enrollments.delete_guild": "DELETE FROM lfg_enrollments WHERE guild_id = ?",
+        "lfg_assignments.upsert": """
+        INSERT INTO lfg_assignments (guild_id, user_id, game_id, role_id, assigned_at)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(guild_id, user_id) DO UPDATE SET
+            game_id = excluded.game_id,
+            role_id = excluded.role_id,
+            assigned_at = excluded.assigned_at
+        """,
+        "lfg_assignments.get": "SELECT * FROM lfg_assignments WHERE guild_id = ? AND user_id = ?",
+        "lfg_assignments.delete": "DELETE FROM lfg_assignments WHERE guild_id = ? AND user_id = ?",
+        "lfg_assignments.delete_game": "DELETE FROM lfg_assignments WHERE guild_id = ? AND game_id = ?",
+        "lfg_assignments.delete_guild": "DELETE FROM lfg_assignments WHERE guild_id = ?",
+        "lfg_assignments.for_guild": """
+        SELECT a.*, g.activity_name, g.display_name
+        FROM lfg_assignments AS a
+        JOIN lfg_games AS g ON g.game_id = a.game_id
+        WHERE a.guild_id = ?
+        ORDER BY g.display_name COLLATE NOCASE, a.assigned_at
+        """,
+    }
+)
+
+
+def set_lfg_settings(guild_id: int, dashboard_channel_id: int):
+    _execute("lfg_settings.set", (guild_id, dashboard_channel_id))
 
 
 def get_lfg_settings(guild_id: int) -> sqlite3.Row | None:
-    conn = get_db_connection()
-    row = conn.execute("SELECT * FROM lfg_settings WHERE guild_id = ?", (guild_id,)).fetchone()
-    conn.close()
-    return row
+    return _fetchone("lfg_settings.get", (guild_id,))
 
 
 def set_lfg_dashboard_message(guild_id: int, message_id: int | None):
-    conn = get_db_connection()
-    conn.execute(
-        "UPDATE lfg_settings SET dashboard_message_id = ? WHERE guild_id = ?",
-        (message_id, guild_id),
-    )
-    conn.commit()
-    conn.close()
+    _execute("lfg_settings.set_message", (message_id, guild_id))
 
 
 def delete_lfg_settings(guild_id: int):
-    conn = get_db_connection()
-    conn.execute("DELETE FROM lfg_assignments WHERE guild_id = ?", (guild_id,))
-    conn.execute("DELETE FROM lfg_enrollments WHERE guild_id = ?", (guild_id,))
-    conn.execute("DELETE FROM lfg_games WHERE guild_id = ?", (guild_id,))
-    conn.execute("DELETE FROM lfg_settings WHERE guild_id = ?", (guild_id,))
-    conn.commit()
-    conn.close()
+    with _transaction():
+        _execute("lfg_assignments.delete_guild", (guild_id,))
+        _execute("lfg_enrollments.delete_guild", (guild_id,))
+        _execute("lfg_games.delete_guild", (guild_id,))
+        _execute("lfg_settings.delete", (guild_id,))
 
 
 def upsert_lfg_game(
@@ -896,114 +1415,46 @@ def upsert_lfg_game(
     display_name: str,
     role_id: int,
 ) -> sqlite3.Row:
-    conn = get_db_connection()
-    conn.execute(
-        """
-        INSERT INTO lfg_games (guild_id, activity_name, display_name, role_id)
-        VALUES (?, ?, ?, ?)
-        ON CONFLICT(guild_id, activity_name) DO UPDATE SET
-            display_name = excluded.display_name,
-            role_id = excluded.role_id
-        """,
-        (guild_id, activity_name.strip(), display_name.strip(), role_id),
-    )
-    row = conn.execute(
-        "SELECT * FROM lfg_games WHERE guild_id = ? AND activity_name = ? COLLATE NOCASE",
-        (guild_id, activity_name.strip()),
-    ).fetchone()
-    conn.commit()
-    conn.close()
-    return row
+    with _transaction():
+        _execute("lfg_games.upsert", (guild_id, activity_name.strip(), display_name.strip(), role_id))
+        return _fetchone("lfg_games.by_activity", (guild_id, activity_name.strip()))
 
 
 def get_lfg_games(guild_id: int) -> list[sqlite3.Row]:
-    conn = get_db_connection()
-    rows = conn.execute(
-        "SELECT * FROM lfg_games WHERE guild_id = ? ORDER BY display_name COLLATE NOCASE",
-        (guild_id,),
-    ).fetchall()
-    conn.close()
-    return rows
+    return _fetchall("lfg_games.for_guild", (guild_id,))
 
 
 def get_lfg_game_by_activity(guild_id: int, activity_name: str) -> sqlite3.Row | None:
-    conn = get_db_connection()
-    row = conn.execute(
-        "SELECT * FROM lfg_games WHERE guild_id = ? AND activity_name = ? COLLATE NOCASE",
-        (guild_id, activity_name.strip()),
-    ).fetchone()
-    conn.close()
-    return row
+    return _fetchone("lfg_games.by_activity", (guild_id, activity_name.strip()))
 
 
 def delete_lfg_game(guild_id: int, activity_name: str) -> sqlite3.Row | None:
-    conn = get_db_connection()
-    row = conn.execute(
-        "SELECT * FROM lfg_games WHERE guild_id = ? AND activity_name = ? COLLATE NOCASE",
-        (guild_id, activity_name.strip()),
-    ).fetchone()
-    if row is not None:
-        conn.execute(
-            "DELETE FROM lfg_assignments WHERE guild_id = ? AND game_id = ?",
-            (guild_id, row["game_id"]),
-        )
-        conn.execute("DELETE FROM lfg_games WHERE game_id = ?", (row["game_id"],))
-        conn.commit()
-    conn.close()
+    with _transaction():
+        row = _fetchone("lfg_games.by_activity", (guild_id, activity_name.strip()))
+        if row is not None:
+            _execute("lfg_assignments.delete_game", (guild_id, row["game_id"]))
+            _execute("lfg_games.delete", (row["game_id"],))
     return row
 
 
 def enroll_lfg_user(guild_id: int, user_id: int, enrolled_at: str):
-    conn = get_db_connection()
-    conn.execute(
-        """
-        INSERT INTO lfg_enrollments (guild_id, user_id, enrolled_at)
-        VALUES (?, ?, ?)
-        ON CONFLICT(guild_id, user_id) DO NOTHING
-        """,
-        (guild_id, user_id, enrolled_at),
-    )
-    conn.commit()
-    conn.close()
+    _execute("lfg_enrollments.insert", (guild_id, user_id, enrolled_at))
 
 
 def unenroll_lfg_user(guild_id: int, user_id: int) -> sqlite3.Row | None:
-    conn = get_db_connection()
-    assignment = conn.execute(
-        "SELECT * FROM lfg_assignments WHERE guild_id = ? AND user_id = ?",
-        (guild_id, user_id),
-    ).fetchone()
-    conn.execute(
-        "DELETE FROM lfg_assignments WHERE guild_id = ? AND user_id = ?",
-        (guild_id, user_id),
-    )
-    conn.execute(
-        "DELETE FROM lfg_enrollments WHERE guild_id = ? AND user_id = ?",
-        (guild_id, user_id),
-    )
-    conn.commit()
-    conn.close()
+    with _transaction():
+        assignment = _fetchone("lfg_assignments.get", (guild_id, user_id))
+        _execute("lfg_assignments.delete", (guild_id, user_id))
+        _execute("lfg_enrollments.delete", (guild_id, user_id))
     return assignment
 
 
 def is_lfg_enrolled(guild_id: int, user_id: int) -> bool:
-    conn = get_db_connection()
-    row = conn.execute(
-        "SELECT 1 FROM lfg_enrollments WHERE guild_id = ? AND user_id = ?",
-        (guild_id, user_id),
-    ).fetchone()
-    conn.close()
-    return row is not None
+    return _fetchone("lfg_enrollments.exists", (guild_id, user_id)) is not None
 
 
 def get_lfg_enrollments(guild_id: int) -> list[sqlite3.Row]:
-    conn = get_db_connection()
-    rows = conn.execute(
-        "SELECT * FROM lfg_enrollments WHERE guild_id = ?",
-        (guild_id,),
-    ).fetchall()
-    conn.close()
-    return rows
+    return _fetchall("lfg_enrollments.for_guild", (guild_id,))
 
 
 def set_lfg_assignment(
@@ -1013,110 +1464,61 @@ def set_lfg_assignment(
     role_id: int,
     assigned_at: str,
 ):
-    conn = get_db_connection()
-    conn.execute(
-        """
-        INSERT INTO lfg_assignments (guild_id, user_id, game_id, role_id, assigned_at)
-        VALUES (?, ?, ?, ?, ?)
-        ON CONFLICT(guild_id, user_id) DO UPDATE SET
-            game_id = excluded.game_id,
-            role_id = excluded.role_id,
-            assigned_at = excluded.assigned_at
-        """,
-        (guild_id, user_id, game_id, role_id, assigned_at),
-    )
-    conn.commit()
-    conn.close()
+    _execute("lfg_assignments.upsert", (guild_id, user_id, game_id, role_id, assigned_at))
 
 
 def get_lfg_assignment(guild_id: int, user_id: int) -> sqlite3.Row | None:
-    conn = get_db_connection()
-    row = conn.execute(
-        "SELECT * FROM lfg_assignments WHERE guild_id = ? AND user_id = ?",
-        (guild_id, user_id),
-    ).fetchone()
-    conn.close()
-    return row
+    return _fetchone("lfg_assignments.get", (guild_id, user_id))
 
 
 def delete_lfg_assignment(guild_id: int, user_id: int) -> sqlite3.Row | None:
-    conn = get_db_connection()
-    row = conn.execute(
-        "SELECT * FROM lfg_assignments WHERE guild_id = ? AND user_id = ?",
-        (guild_id, user_id),
-    ).fetchone()
-    conn.execute(
-        "DELETE FROM lfg_assignments WHERE guild_id = ? AND user_id = ?",
-        (guild_id, user_id),
-    )
-    conn.commit()
-    conn.close()
+    with _transaction():
+        row = _fetchone("lfg_assignments.get", (guild_id, user_id))
+        _execute("lfg_assignments.delete", (guild_id, user_id))
     return row
 
 
 def get_lfg_assignments(guild_id: int) -> list[sqlite3.Row]:
-    conn = get_db_connection()
-    rows = conn.execute(
-        """
-        SELECT a.*, g.activity_name, g.display_name
-        FROM lfg_assignments AS a
-        JOIN lfg_games AS g ON g.game_id = a.game_id
-        WHERE a.guild_id = ?
-        ORDER BY g.display_name COLLATE NOCASE, a.assigned_at
-        """,
-        (guild_id,),
-    ).fetchall()
-    conn.close()
-    return rows
+    return _fetchall("lfg_assignments.for_guild", (guild_id,))
+
+
+def _upsert_settings_query(table_name: str, columns: list[str]) -> str:
+    """Registra (una vez por combinación de columnas) el upsert de ajustes."""
+    name = f"{table_name}.upsert[{','.join(columns)}]"
+    all_columns = ["guild_id", *columns]
+    placeholders = ", ".join("?" for _ in all_columns)
+    update_clause = ", ".join(f"{column} = excluded.{column}" for column in columns)
+    return query_registry.register(
+        name,
+        f"INSERT INTO {table_name} ({', '.join(all_columns)}) VALUES ({placeholders}) "
+        f"ON CONFLICT(guild_id) DO UPDATE SET {update_clause}",
+    )
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # VANITY MODULE
 # ═══════════════════════════════════════════════════════════════════════════════
+_register(
+    {
+        "vanity_settings.get": "SELECT * FROM vanity_settings WHERE guild_id = ?",
+        "vanity_settings.ensure": "INSERT OR IGNORE INTO vanity_settings (guild_id) VALUES (?)",
+        "vanity_settings.delete": "DELETE FROM vanity_settings WHERE guild_id = ?",
+        "vanity_codes.for_guild": "SELECT * FROM vanity_codes WHERE guild_id = ?",
+        "vanity_codes.insert": "INSERT INTO vanity_codes (guild_id, vanity_code, role_id) VALUES (?, ?, ?)",
+        "vanity_codes.delete": "DELETE FROM vanity_codes WHERE guild_id = ? AND vanity_code = ?",
+        "vanity_codes.delete_guild": "DELETE FROM vanity_codes WHERE guild_id = ?",
+    }
+)
 
 
 def setup_vanity_table():
-    """Crea las tablas de vanity si no existen."""
-    conn = get_db_connection()
-
-    # Configuración general del servidor
-    conn.execute("""
-    CREATE TABLE IF NOT EXISTS vanity_settings (
-        guild_id INTEGER PRIMARY KEY,
-        channel_id INTEGER,
-        embed_title TEXT DEFAULT '✨ ¡Gracias por representarnos!',
-        embed_description TEXT DEFAULT '{user} ahora tiene **{vanity}** en su estado y recibió {role}',
-        embed_color INTEGER DEFAULT 5763719,
-        embed_thumbnail TEXT,
-        embed_image TEXT,
-        remove_enabled INTEGER DEFAULT 0,
-        remove_channel_id INTEGER,
-        remove_title TEXT DEFAULT '👋 Vanity Removida',
-        remove_description TEXT DEFAULT '{user} quitó **{vanity}** de su estado',
-        remove_color INTEGER DEFAULT 15548997
-    )
-    """)
-
-    # Múltiples vanitys por servidor
-    conn.execute("""
-    CREATE TABLE IF NOT EXISTS vanity_codes (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        guild_id INTEGER NOT NULL,
-        vanity_code TEXT NOT NULL,
-        role_id INTEGER NOT NULL,
-        UNIQUE(guild_id, vanity_code)
-    )
-    """)
-
-    conn.commit()
-    conn.close()
+    """Compatibilidad: las tablas de vanity se crean en la migración 3."""
+    setup_database()
 
 
 def get_vanity_settings(guild_id: int) -> dict | None:
     """Obtiene la configuración general de vanity."""
-    conn = get_db_connection()
-    row = conn.execute("SELECT * FROM vanity_settings WHERE guild_id = ?", (guild_id,)).fetchone()
-    conn.close()
+    row = _fetchone("vanity_settings.get", (guild_id,))
     return dict(row) if row else None
 
 
@@ -1126,142 +1528,86 @@ def set_vanity_settings(guild_id: int, **kwargs):
     if invalid_columns:
         raise ValueError(f"Columnas de vanity no permitidas: {sorted(invalid_columns)}")
 
-    conn = get_db_connection()
-
     if not kwargs:
-        conn.execute(
-            "INSERT OR IGNORE INTO vanity_settings (guild_id) VALUES (?)",
-            (guild_id,),
-        )
-    else:
-        columns = ["guild_id", *kwargs.keys()]
-        placeholders = ", ".join("?" for _ in columns)
-        update_clause = ", ".join(f"{k} = excluded.{k}" for k in kwargs)
-        conn.execute(
-            f"INSERT INTO vanity_settings ({', '.join(columns)}) VALUES ({placeholders}) "
-            f"ON CONFLICT(guild_id) DO UPDATE SET {update_clause}",
-            [guild_id, *kwargs.values()],
-        )
+        _execute("vanity_settings.ensure", (guild_id,))
+        return
 
-    conn.commit()
-    conn.close()
+    columns = sorted(kwargs)
+    query = _upsert_settings_query("vanity_settings", columns)
+    _execute(query, [guild_id, *(kwargs[column] for column in columns)])
 
 
 def get_vanity_codes(guild_id: int) -> list[dict]:
     """Obtiene todas las vanitys configuradas."""
-    conn = get_db_connection()
-    rows = conn.execute("SELECT * FROM vanity_codes WHERE guild_id = ?", (guild_id,)).fetchall()
-    conn.close()
-    return [dict(row) for row in rows]
+    return [dict(row) for row in _fetchall("vanity_codes.for_guild", (guild_id,))]
 
 
 def add_vanity_code(guild_id: int, vanity_code: str, role_id: int) -> bool:
     """Añade una vanity. Retorna False si ya existe."""
-    conn = get_db_connection()
     try:
-        conn.execute(
-            "INSERT INTO vanity_codes (guild_id, vanity_code, role_id) VALUES (?, ?, ?)",
-            (guild_id, vanity_code, role_id),
-        )
-        conn.commit()
-        conn.close()
-        return True
+        _execute("vanity_codes.insert", (guild_id, vanity_code, role_id))
     except sqlite3.IntegrityError:
-        conn.close()
         return False
-    except sqlite3.Error:
-        conn.close()
-        raise
+    return True
 
 
 def remove_vanity_code(guild_id: int, vanity_code: str) -> bool:
     """Elimina una vanity. Retorna True si se eliminó."""
-    conn = get_db_connection()
-    cursor = conn.execute(
-        "DELETE FROM vanity_codes WHERE guild_id = ? AND vanity_code = ?", (guild_id, vanity_code)
-    )
-    conn.commit()
-    deleted = cursor.rowcount > 0
-    conn.close()
-    return deleted
+    cursor = _execute("vanity_codes.delete", (guild_id, vanity_code))
+    return cursor.rowcount > 0
 
 
 def delete_all_vanity(guild_id: int):
     """Elimina toda la configuración de vanity del servidor."""
-    conn = get_db_connection()
-    conn.execute("DELETE FROM vanity_settings WHERE guild_id = ?", (guild_id,))
-    conn.execute("DELETE FROM vanity_codes WHERE guild_id = ?", (guild_id,))
-    conn.commit()
-    conn.close()
+    with _transaction():
+        _execute("vanity_settings.delete", (guild_id,))
+        _execute("vanity_codes.delete_guild", (guild_id,))
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # CLAN TAG MODULE
 # ═══════════════════════════════════════════════════════════════════════════════
+_register(
+    {
+        "clantag_settings.get": "SELECT * FROM clantag_settings WHERE guild_id = ?",
+        "clantag_settings.ensure": "INSERT OR IGNORE INTO clantag_settings (guild_id) VALUES (?)",
+        "clantag_settings.delete": "DELETE FROM clantag_settings WHERE guild_id = ?",
+        "clantag_settings.role_guilds": "SELECT guild_id FROM clantag_settings WHERE COALESCE(role_id, 0) != 0",
+    }
+)
 
 
 def setup_clantag_table():
-    """Crea la tabla de clan tag si no existe."""
-    conn = get_db_connection()
-
-    conn.execute("""
-    CREATE TABLE IF NOT EXISTS clantag_settings (
-        guild_id INTEGER PRIMARY KEY,
-        role_id INTEGER,
-        channel_id INTEGER,
-        embed_title TEXT DEFAULT '🏷️ ¡Gracias por representarnos!',
-        embed_description TEXT DEFAULT '{user} ahora tiene el tag **{tag}** y recibió {role}',
-        embed_color INTEGER DEFAULT 5763719,
-        remove_enabled INTEGER DEFAULT 0,
-        remove_channel_id INTEGER,
-        remove_title TEXT DEFAULT '😢 Tag removido',
-        remove_description TEXT DEFAULT '{user} ya no tiene el tag **{tag}**',
-        remove_color INTEGER DEFAULT 15548997
-    )
-    """)
-
-    conn.commit()
-    conn.close()
+    """Compatibilidad: la tabla de clan tag se crea en la migración 3."""
+    setup_database()
 
 
 def get_clantag_settings(guild_id: int) -> dict | None:
     """Obtiene la configuración de clan tag."""
-    conn = get_db_connection()
-    row = conn.execute("SELECT * FROM clantag_settings WHERE guild_id = ?", (guild_id,)).fetchone()
-    conn.close()
+    row = _fetchone("clantag_settings.get", (guild_id,))
     return dict(row) if row else None
 
 
+def get_clantag_role_guild_ids() -> set[int]:
+    """IDs de los servidores con rol de clan tag configurado."""
+    return {row["guild_id"] for row in _fetchall("clantag_settings.role_guilds")}
+
+
 def set_clantag_settings(guild_id: int, **kwargs):
     """Guarda la configuración de clan tag."""
     invalid_columns = set(kwargs) - CLANTAG_SETTING_COLUMNS
     if invalid_columns:
         raise ValueError(f"Columnas de clan tag no permitidas: {sorted(invalid_columns)}")
 
-    conn = get_db_connection()
-
     if not kwargs:
-        conn.execute(
-            "INSERT OR IGNORE INTO clantag_settings (guild_id) VALUES (?)",
-            (guild_id,),
-        )
-    else:
-        columns = ["guild_id", *kwargs.keys()]
-        placeholders = ", ".join("?" for _ in columns)
-        update_clause = ", ".join(f"{k} = excluded.{k}" for k in kwargs)
-        conn.execute(
-            f"INSERT INTO clantag_settings ({', '.join(columns)}) VALUES ({placeholders}) "
-            f"ON CONFLICT(guild_id) DO UPDATE SET {update_clause}",
-            [guild_id, *kwargs.values()],
-        )
+        _execute("clantag_settings.ensure", (guild_id,))
+        return
 
-    conn.commit()
-    conn.close()
+    columns = sorted(kwargs)
+    query = _upsert_settings_query("clantag_settings", columns)
+    _execute(query, [guild_id, *(kwargs[column] for column in columns)])
 
 
 def delete_clantag_settings(guild_id: int):
     """Elimina la configuración de clan tag del servidor."""
-    conn = get_db_connection()
-    conn.execute("DELETE FROM clantag_settings WHERE guild_id = ?", (guild_id,))
-    conn.commit()
-    conn.close()
+    _execute("clantag_settings.delete", (guild_id,))
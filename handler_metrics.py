@@ -0,0 +1,175 @@
+"""Latencia de cada listener y comando de los cogs.
+
+``instrument_cog`` envuelve, antes de registrar un cog, sus métodos
+``Cog.listener`` y el callback de sus comandos de prefijo y slash. Cada
+envoltura anota en ``handler_registry`` la duración, los errores y las
+ejecuciones en curso de ese handler. El registro se publica en Prometheus desde
+``metrics_cog`` y el owner lo consulta con ``c!handlers``.
+
+Solo se mide el cuerpo del handler: checks, conversores y cooldowns quedan
+fuera; para eso están ``copydc_command_duration_seconds`` y el resto de
+métricas de ``metrics_cog``.
+"""
+
+from __future__ import annotations
+
+import bisect
+import functools
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+from discord import app_commands
+from discord.ext import commands
+
+from metrics import DEFAULT_BUCKETS, bucket_quantile
+
+HANDLER_BUCKET_BOUNDS_MS = tuple(bound * 1000 for bound in DEFAULT_BUCKETS)
+SORT_KEYS = ("total", "avg", "p95", "max", "errors", "count")
+
+HandlerKey = tuple[str, str, str]
+
+
+class _HandlerStats:
+    __slots__ = ("buckets", "count", "errors", "in_flight", "max_ms", "total_ms")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(HANDLER_BUCKET_BOUNDS_MS) + 1)
+
+
+class HandlerRegistry:
+    """Estadísticas por ``(cog, handler, kind)``; ``kind`` es listener, prefix o slash."""
+
+    def __init__(self):
+        self._stats: dict[HandlerKey, _HandlerStats] = {}
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def _entry(self, key: HandlerKey) -> _HandlerStats:
+        stats = self._stats.get(key)
+        if stats is None:
+            with self._lock:
+                stats = self._stats.setdefault(key, _HandlerStats())
+        return stats
+
+    def wrap(self, key: HandlerKey, func: Callable) -> Callable:
+        """Envuelve una corrutina para medirla con la clave ``key``."""
+        if getattr(func, "__handler_key__", None) is not None:
+            return func
+        stats = self._entry(key)
+
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with self._lock:
+                stats.in_flight += 1
+            started = time.perf_counter()
+            failed = False
+            try:
+                return await func(*args, **kwargs)
+            except Exception:
+                failed = True
+                raise
+            finally:
+                self._observe(stats, (time.perf_counter() - started) * 1000, failed)
+
+        wrapper.__handler_key__ = key
+        return wrapper
+
+    def _observe(self, stats: _HandlerStats, elapsed_ms: float, failed: bool) -> None:
+        index = bisect.bisect_left(HANDLER_BUCKET_BOUNDS_MS, elapsed_ms)
+        with self._lock:
+            stats.in_flight -= 1
+            stats.count += 1
+            stats.total_ms += elapsed_ms
+            stats.buckets[index] += 1
+            if elapsed_ms > stats.max_ms:
+                stats.max_ms = elapsed_ms
+            if failed:
+                stats.errors += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            handlers = [
+                {
+                    "cog": cog,
+                    "handler": handler,
+                    "kind": kind,
+                    "count": stats.count,
+                    "errors": stats.errors,
+                    "in_flight": stats.in_flight,
+                    "total_ms": stats.total_ms,
+                    "max_ms": stats.max_ms,
+                    "buckets": list(stats.buckets),
+                }
+                for (cog, handler, kind), stats in self._stats.items()
+            ]
+        for item in handlers:
+            count = item["count"]
+            item["avg_ms"] = item["total_ms"] / count if count else 0.0
+            item["p95_ms"] = bucket_quantile(HANDLER_BUCKET_BOUNDS_MS, item["buckets"], 0.95, item["max_ms"])
+        return {
+            "started_at": self.started_at,
+            "bucket_bounds_ms": list(HANDLER_BUCKET_BOUNDS_MS),
+            "handlers": handlers,
+        }
+
+    def top(self, sort: str = "total", limit: int = 10) -> list[dict[str, Any]]:
+        """Handlers ejecutados al menos una vez, de peor a mejor según ``sort``."""
+        if sort not in SORT_KEYS:
+            raise ValueError(f"Orden desconocido: {sort}")
+        field = sort if sort in ("errors", "count") else f"{sort}_ms"
+        rows = [item for item in self.snapshot()["handlers"] if item["count"] or item["in_flight"]]
+        rows.sort(key=lambda item: (item[field], item["count"]), reverse=True)
+        return rows[:limit]
+
+    def reset(self) -> None:
+        """Pone a cero los contadores; las ejecuciones en curso se conservan."""
+        with self._lock:
+            for stats in self._stats.values():
+                in_flight = stats.in_flight
+                stats.__init__()
+                stats.in_flight = in_flight
+            self.started_at = time.time()
+
+
+handler_registry = HandlerRegistry()
+
+
+def instrument_cog(cog: commands.Cog, registry: HandlerRegistry = handler_registry) -> int:
+    """Envuelve los listeners y comandos de ``cog``; devuelve cuántos envolvió.
+
+    Hay que llamarla antes de ``bot.add_cog``: los listeners se registran con
+    ``getattr(cog, nombre)``, así que el atributo de instancia los sustituye y
+    ``remove_cog`` quita la misma envoltura al descargar.
+    """
+    cog_name = cog.qualified_name
+    wrapped = 0
+    for event, method_name in cog.__cog_listeners__:
+        method = getattr(cog, method_name)
+        if getattr(method, "__handler_key__", None) is not None:
+            continue
+        handler = method_name if event == method_name else f"{event}:{method_name}"
+        setattr(cog, method_name, registry.wrap((cog_name, handler, "listener"), method))
+        wrapped += 1
+
+    # Los híbridos registran su parte slash aparte, en ``command.app_command``.
+    app_commands_to_wrap = list(cog.walk_app_commands())
+    for command in cog.walk_commands():
+        app_commands_to_wrap.append(getattr(command, "app_command", None))
+        if getattr(command._callback, "__handler_key__", None) is None:
+            command._callback = registry.wrap((cog_name, command.qualified_name, "prefix"), command._callback)
+            wrapped += 1
+
+    for command in app_commands_to_wrap:
+        if not isinstance(command, app_commands.Command):
+            continue
+        if getattr(command._callback, "__handler_key__", None) is None:
+            command._callback = registry.wrap((cog_name, command.qualified_name, "slash"), command._callback)
+            wrapped += 1
+    return wrapped
@@ -0,0 +1,96 @@
+"""Subsistemas pesados que se cargan en su primer uso.
+
+``lazy_import`` devuelve un sustituto del módulo que lo importa al leer el
+primer atributo. ``LazyResource`` crea un recurso asíncrono, como una
+``aiohttp.ClientSession``, cuando se pide por primera vez y lo reutiliza
+después.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import importlib
+import threading
+from collections.abc import Awaitable, Callable
+from types import ModuleType
+from typing import Any, Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class LazyModule:
+    """Importa ``name`` al acceder a cualquiera de sus atributos.
+
+    El acceso puede llegar desde ``asyncio.to_thread``; el candado evita
+    importar dos veces en paralelo.
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module: ModuleType | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None
+
+    def _load(self) -> ModuleType:
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attribute: str) -> Any:
+        return getattr(self._load(), attribute)
+
+    def __repr__(self) -> str:
+        state = "cargado" if self.loaded else "pendiente"
+        return f"<LazyModule {self._name} ({state})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    return LazyModule(name)
+
+
+class LazyResource(Generic[T]):
+    """Recurso creado con ``factory`` en el primer ``get()`` y compartido después.
+
+    Si ``is_closed`` indica que el recurso ya no sirve, se crea otro.
+    ``close()`` lo libera y el siguiente ``get()`` vuelve a crearlo.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], T],
+        *,
+        close: Callable[[T], Awaitable[None]] | None = None,
+        is_closed: Callable[[T], bool] | None = None,
+    ):
+        self._factory = factory
+        self._close = close
+        self._is_closed = is_closed
+        self._value: T | None = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def created(self) -> bool:
+        return self._value is not None and not self._stale(self._value)
+
+    def _stale(self, value: T) -> bool:
+        return self._is_closed is not None and self._is_closed(value)
+
+    async def get(self) -> T:
+        value = self._value
+        if value is not None and not self._stale(value):
+            return value
+        async with self._lock:
+            if self._value is None or self._stale(self._value):
+                self._value = self._factory()
+            return self._value
+
+    async def close(self) -> None:
+        async with self._lock:
+            value, self._value = self._value, None
+        if value is not None and self._close is not None and not self._stale(value):
+            await self._close(value)
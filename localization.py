@@ -18,22 +18,64 @@ LOCALES_DIR = Path(__file__).resolve().parent / "locales"
 
 log = logging.getLogger("copy.localization")
 
-_catalogs: dict[str, dict[str, str]] = {}
 _guild_modes: dict[int, LanguageMode] = {}
 _formatter = Formatter()
 
 
-def _template_fields(template: str, *, language: str, key: str) -> frozenset[str]:
-    try:
-        return frozenset(
-            field_name for _, field_name, _, _ in _formatter.parse(template) if field_name is not None
-        )
-    except ValueError as exc:
-        raise ValueError(f"Invalid translation template for {language}.{key}: {exc}") from exc
+class CompiledTemplate:
+    """A catalog string split once into literal and field segments.
+
+    Templates without placeholders keep their rendered text. Anything the
+    segment renderer does not handle (attribute or index lookups, nested
+    format specs) falls back to ``str.format``.
+    """
+
+    __slots__ = ("fields", "segments", "static", "text")
+
+    def __init__(self, text: str, *, language: str, key: str):
+        try:
+            parsed = list(_formatter.parse(text))
+        except ValueError as exc:
+            raise ValueError(f"Invalid translation template for {language}.{key}: {exc}") from exc
+
+        self.text = text
+        self.fields = frozenset(field_name for _, field_name, _, _ in parsed if field_name is not None)
+        self.static: str | None = None
+        self.segments: tuple[tuple[str, str | None, str, str | None], ...] | None = tuple(parsed)
+        if not self.fields:
+            self.static = "".join(literal for literal, _, _, _ in parsed)
+        elif any(
+            field_name is not None and (not field_name.isidentifier() or "{" in spec)
+            for _, field_name, spec, _ in parsed
+        ):
+            self.segments = None
+
+    def render(self, values: dict[str, Any]) -> str:
+        if self.static is not None:
+            return self.static
+        if self.segments is None:
+            return self.text.format(**values)
+
+        parts = []
+        for literal, field_name, spec, conversion in self.segments:
+            parts.append(literal)
+            if field_name is None:
+                continue
+            value = values[field_name]
+            if conversion is not None:
+                value = _formatter.convert_field(value, conversion)
+            parts.append(format(value, spec))
+        return "".join(parts)
+
+
+_catalogs: dict[str, dict[str, CompiledTemplate]] = {}
+_catalog_keys: dict[str, frozenset[str]] = {}
+_catalog_generation = 0
 
 
 def load_catalogs() -> None:
     """Load and validate translation catalogs once at startup."""
+    global _catalog_generation
     loaded: dict[str, dict[str, str]] = {}
     for language in sorted(SUPPORTED_LANGUAGES):
         path = LOCALES_DIR / f"{language}.json"
@@ -53,14 +95,14 @@ def load_catalogs() -> None:
             extra = sorted(keys - reference_keys)
             raise ValueError(f"Translation key mismatch for {language}: missing={missing}, extra={extra}")
 
+    compiled = {
+        language: {key: CompiledTemplate(text, language=language, key=key) for key, text in catalog.items()}
+        for language, catalog in loaded.items()
+    }
     for key in sorted(reference_keys):
-        expected_fields = _template_fields(
-            loaded[DEFAULT_LANGUAGE][key],
-            language=DEFAULT_LANGUAGE,
-            key=key,
-        )
-        for language, catalog in loaded.items():
-            fields = _template_fields(catalog[key], language=language, key=key)
+        expected_fields = compiled[DEFAULT_LANGUAGE][key].fields
+        for language, templates in compiled.items():
+            fields = templates[key].fields
             if fields != expected_fields:
                 raise ValueError(
                     f"Translation placeholder mismatch for {language}.{key}: "
@@ -68,7 +110,10 @@ def load_catalogs() -> None:
                 )
 
     _catalogs.clear()
-    _catalogs.update(loaded)
+    _catalogs.update(compiled)
+    _catalog_keys.clear()
+    _catalog_keys.update({language: frozenset(templates) for language, templates in compiled.items()})
+    _catalog_generation += 1
 
 
 def load_guild_modes() -> None:
@@ -144,17 +189,22 @@ def translate_language(lang: str, key: str, **values: Any) -> str:
         return key
 
     try:
-        return template.format(**values)
+        return template.render(values)
     except (KeyError, ValueError):
         log.exception("Invalid translation formatting for key %s", key)
-        return template
+        return template.text
 
 
 def translate(source: Any, key: str, **values: Any) -> str:
     return translate_language(get_language(source), key, **values)
 
 
+def catalog_generation() -> int:
+    """Counter bumped on every catalog load; caches derived from catalogs compare it."""
+    return _catalog_generation
+
+
 def catalog_keys(language: str) -> frozenset[str]:
     if not _catalogs:
         load_catalogs()
-    return frozenset(_catalogs.get(language, {}))
+    return _catalog_keys.get(language, frozenset())
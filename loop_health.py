@@ -0,0 +1,234 @@
+"""Salud del bucle de asyncio: retraso de planificación y callbacks lentos.
+
+``LoopMonitor`` mide dos cosas:
+
+* Retraso: una tarea duerme ``interval`` segundos y anota cuánto tarde se
+  despierta. Un retraso alto significa que algo bloqueó el bucle.
+* Callbacks lentos: cada ``Handle._run`` del hilo del bucle se cronometra. Si
+  uno supera ``slow_threshold``, un hilo vigilante copia la pila del hilo del
+  bucle mientras el callback sigue bloqueando, así que la traza apunta al código
+  síncrono culpable y no al siguiente ``await``.
+
+Solo puede haber un monitor instalado a la vez.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import bisect
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import UTC, datetime
+from typing import Any
+
+from metrics import bucket_quantile, metrics
+
+LAG_SAMPLE_INTERVAL_SEC = 0.5
+SLOW_CALLBACK_SEC = 0.1
+MAX_SLOW_CALLBACKS = 25
+STACK_LIMIT = 12
+
+LOOP_LAG = metrics.histogram(
+    "copydc_event_loop_lag_seconds",
+    "Retraso con el que el bucle de asyncio atiende un temporizador.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+LAG_BOUNDS_MS = tuple(bound * 1000 for bound in LOOP_LAG.bounds)
+SLOW_CALLBACKS = metrics.counter(
+    "copydc_event_loop_slow_callbacks_total",
+    "Callbacks del bucle que superaron el umbral de lentitud.",
+)
+SLOW_CALLBACK_DURATION = metrics.histogram(
+    "copydc_event_loop_slow_callback_seconds",
+    "Duración de los callbacks lentos del bucle.",
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+
+_original_run = asyncio.events.Handle._run
+_active: LoopMonitor | None = None
+
+
+def describe_callback(handle: asyncio.Handle) -> str:
+    """Nombre legible del callback; para pasos de tareas, la corrutina."""
+    callback = handle._callback
+    owner = getattr(callback, "__self__", None)
+    if isinstance(owner, asyncio.Task):
+        coro = owner.get_coro()
+        return getattr(coro, "__qualname__", None) or repr(coro)
+    return getattr(callback, "__qualname__", None) or repr(callback)
+
+
+def _task_stack(handle: asyncio.Handle) -> list[str]:
+    owner = getattr(handle._callback, "__self__", None)
+    if not isinstance(owner, asyncio.Task):
+        return []
+    frames = owner.get_stack(limit=STACK_LIMIT)
+    return traceback.StackSummary.extract((frame, frame.f_lineno) for frame in frames).format()
+
+
+def _monitored_run(handle: asyncio.Handle) -> None:
+    monitor = _active
+    if monitor is None or threading.get_ident() != monitor.thread_id:
+        return _original_run(handle)
+    started = time.perf_counter()
+    monitor._current = (handle, started)
+    try:
+        return _original_run(handle)
+    finally:
+        monitor._current = None
+        elapsed = time.perf_counter() - started
+        if elapsed >= monitor.slow_threshold:
+            monitor._record_slow(handle, elapsed)
+
+
+class LoopMonitor:
+    def __init__(
+        self,
+        *,
+        interval: float = LAG_SAMPLE_INTERVAL_SEC,
+        slow_threshold: float = SLOW_CALLBACK_SEC,
+        max_events: int = MAX_SLOW_CALLBACKS,
+    ):
+        self.interval = interval
+        self.slow_threshold = slow_threshold
+        self.thread_id: int | None = None
+        self.slow_callbacks: deque[dict[str, Any]] = deque(maxlen=max_events)
+        self._current: tuple[asyncio.Handle, float] | None = None
+        self._captured: tuple[asyncio.Handle, list[str]] | None = None
+        self._lag_task: asyncio.Task | None = None
+        self._watchdog: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.reset()
+
+    @property
+    def installed(self) -> bool:
+        return _active is self
+
+    def reset(self) -> None:
+        with self._lock:
+            self.slow_callbacks.clear()
+            self.stats: dict[str, Any] = {
+                "started_at": time.time(),
+                "lag_samples": 0,
+                "lag_last_ms": 0.0,
+                "lag_max_ms": 0.0,
+                "lag_total_ms": 0.0,
+                "lag_over_threshold": 0,
+                "lag_buckets": [0] * (len(LOOP_LAG.bounds) + 1),
+                "slow_callbacks": 0,
+                "slow_max_ms": 0.0,
+            }
+
+    # --- Instalación ---
+    def install(self) -> None:
+        """Empieza a cronometrar los callbacks del hilo actual."""
+        global _active
+        if _active is not None and _active is not self:
+            raise RuntimeError("Ya hay un LoopMonitor instalado.")
+        self.thread_id = threading.get_ident()
+        _active = self
+        asyncio.events.Handle._run = _monitored_run
+        self._stop.clear()
+        if self._watchdog is None:
+            self._watchdog = threading.Thread(target=self._watch, name="loop-health-watchdog", daemon=True)
+            self._watchdog.start()
+
+    def uninstall(self) -> None:
+        global _active
+        if _active is self:
+            _active = None
+            asyncio.events.Handle._run = _original_run
+        self._stop.set()
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1)
+            self._watchdog = None
+
+    async def start(self) -> None:
+        """Instala el monitor y arranca el muestreo de retraso en el bucle actual."""
+        self.install()
+        if self._lag_task is None or self._lag_task.done():
+            self._lag_task = asyncio.create_task(self._sample_lag(), name="loop-health-lag")
+
+    async def stop(self) -> None:
+        if self._lag_task is not None:
+            self._lag_task.cancel()
+            self._lag_task = None
+        self.uninstall()
+
+    # --- Medición ---
+    async def _sample_lag(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.record_lag(max(loop.time() - expected, 0.0))
+
+    def record_lag(self, lag: float) -> None:
+        LOOP_LAG.observe(lag)
+        lag_ms = lag * 1000
+        bucket = bisect.bisect_left(LOOP_LAG.bounds, lag)
+        with self._lock:
+            stats = self.stats
+            stats["lag_buckets"][bucket] += 1
+            stats["lag_samples"] += 1
+            stats["lag_last_ms"] = lag_ms
+            stats["lag_total_ms"] += lag_ms
+            stats["lag_max_ms"] = max(stats["lag_max_ms"], lag_ms)
+            if lag >= self.slow_threshold:
+                stats["lag_over_threshold"] += 1
+
+    def _watch(self) -> None:
+        # Revisa con la mitad del umbral para capturar la pila mientras el
+        # callback aún está bloqueando el bucle.
+        period = max(self.slow_threshold / 2, 0.005)
+        while not self._stop.wait(period):
+            current = self._current
+            if current is None or self.thread_id is None:
+                continue
+            handle, started = current
+            captured = self._captured
+            if captured is not None and captured[0] is handle:
+                continue
+            if time.perf_counter() - started < self.slow_threshold:
+                continue
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = traceback.format_list(traceback.extract_stack(frame, limit=STACK_LIMIT))
+            self._captured = (handle, stack)
+
+    def _record_slow(self, handle: asyncio.Handle, elapsed: float) -> None:
+        captured = self._captured
+        self._captured = None
+        stack = captured[1] if captured is not None and captured[0] is handle else _task_stack(handle)
+        event = {
+            "at": datetime.now(UTC).isoformat(timespec="seconds"),
+            "callback": describe_callback(handle),
+            "duration_ms": round(elapsed * 1000, 3),
+            "stack": "".join(stack).rstrip(),
+        }
+        SLOW_CALLBACKS.inc()
+        SLOW_CALLBACK_DURATION.observe(elapsed)
+        with self._lock:
+            self.slow_callbacks.append(event)
+            self.stats["slow_callbacks"] += 1
+            self.stats["slow_max_ms"] = max(self.stats["slow_max_ms"], event["duration_ms"])
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            buckets = stats.pop("lag_buckets")[:]
+            events = list(self.slow_callbacks)
+        samples = stats["lag_samples"]
+        stats["lag_avg_ms"] = stats["lag_total_ms"] / samples if samples else 0.0
+        stats["lag_p95_ms"] = bucket_quantile(LAG_BOUNDS_MS, buckets, 0.95, stats["lag_max_ms"])
+        stats["slow_threshold_ms"] = self.slow_threshold * 1000
+        stats["installed"] = self.installed
+        return {"stats": stats, "slow_callbacks": events}
+
+
+loop_monitor = LoopMonitor()
@@ -12,8 +12,13 @@ from dotenv import load_dotenv
 
 import database as db
 import localization
-from command_utils import build_presence_activity, resolve_presence_status, send_response
+from command_sync import SyncResult, sync_tree
+from command_utils import build_presence_activity, emoji_index, resolve_presence_status, send_response
+from handler_metrics import instrument_cog
 from localization import get_language, translate, translate_language
+from metrics import rest_trace_config
+from role_sync import role_reconciler
+from startup import StartupProfile, discover_extensions, load_extensions
 
 load_dotenv()
 
@@ -22,6 +27,7 @@ OWNER_ID = int(os.getenv("OWNER_ID", 0))
 BASE_DIR = Path(__file__).resolve().parent
 USER_MODULES_DIR = BASE_DIR / "modules"
 ADMIN_MODULES_DIR = BASE_DIR / "admin_modules"
+STARTUP_PROFILE_FILE = Path(os.getenv("STARTUP_PROFILE_FILE", BASE_DIR / "startup_profile.json"))
 TEXT_PREFIXES = ("c!", "!")
 
 
@@ -127,13 +133,28 @@ class MyBot(commands.Bot):
             command_prefix=commands.when_mentioned_or(*TEXT_PREFIXES),
             intents=intents,
             owner_id=OWNER_ID,
+            http_trace=rest_trace_config(),
         )
         self._app_commands_synced = False
 
+    async def add_cog(self, cog: commands.Cog, /, **kwargs):
+        # Todos los cogs pasan por aquí, también al recargar con c!dev reload.
+        instrument_cog(cog)
+        await super().add_cog(cog, **kwargs)
+
+    async def close(self):
+        await role_reconciler.close()
+        await super().close()
+
     async def setup_hook(self):
+        profile = StartupProfile()
         try:
-            db.setup_database()
-            localization.initialize()
+            with profile.phase("database"):
+                applied = db.setup_database()
+            if applied:
+                log.info(f"Migraciones de base de datos aplicadas: {applied}")
+            with profile.phase("localization"):
+                localization.initialize()
             log.info("Base de datos conectada y lista.")
         except Exception as exc:
             log.error("ERROR CRITICO: no se pudo inicializar la base de datos.")
@@ -156,32 +177,33 @@ class MyBot(commands.Bot):
                 return ctx.author.id == ctx.bot.owner_id
             return True
 
-        async def load_cogs_from(folder: Path, package: str) -> tuple[int, list[str]]:
-            if not folder.is_dir():
+        extensions = {}
+        missing_folders = []
+        for folder, package in ((USER_MODULES_DIR, "modules"), (ADMIN_MODULES_DIR, "admin_modules")):
+            if folder.is_dir():
+                extensions.update(discover_extensions(folder, package))
+            else:
                 log.warning(f"Carpeta no encontrada: {folder}")
-                return 0, [str(folder)]
-
-            loaded = 0
-            failures: list[str] = []
-            for file_path in sorted(folder.glob("*.py")):
-                if file_path.name.startswith("__"):
-                    continue
-
-                extension = f"{package}.{file_path.stem}"
-                try:
-                    await self.load_extension(extension)
-                    loaded += 1
-                    log.info(f"Modulo cargado: {extension}")
-                except Exception as exc:
-                    log.error(f"Fallo al cargar {extension}: {exc}")
-                    failures.append(extension)
-            return loaded, failures
-
-        log.info("---------- MODULOS DE USUARIO ----------")
-        user_loaded, user_failures = await load_cogs_from(USER_MODULES_DIR, "modules")
-
-        log.info("---------- MODULOS DE ADMIN ----------")
-        admin_loaded, admin_failures = await load_cogs_from(ADMIN_MODULES_DIR, "admin_modules")
+                missing_folders.append(package)
+
+        log.info("---------- MODULOS ----------")
+        with profile.phase("extensions"):
+            await load_extensions(self, extensions, profile)
+        for line in profile.summary_lines():
+            log.info(line)
+        try:
+            profile.write(STARTUP_PROFILE_FILE)
+        except OSError as exc:
+            log.warning(f"No se pudo guardar el perfil de arranque: {exc}")
+
+        user_loaded = profile.loaded("modules")
+        admin_loaded = profile.loaded("admin_modules")
+        user_failures = profile.failures("modules")
+        admin_failures = profile.failures("admin_modules")
+        if "modules" in missing_folders:
+            user_failures.append(str(USER_MODULES_DIR))
+        if "admin_modules" in missing_folders:
+            admin_failures.append(str(ADMIN_MODULES_DIR))
 
         if user_loaded == 0:
             log.warning(
@@ -195,7 +217,10 @@ class MyBot(commands.Bot):
         if admin_failures:
             log.warning("Módulos administrativos no disponibles: %s", ", ".join(admin_failures))
 
-        log.info(f"Modulos listos | usuario={user_loaded} admin={admin_loaded}")
+        log.info(
+            f"Modulos listos | usuario={user_loaded} admin={admin_loaded} "
+            f"| arranque={profile.total_ms():.0f} ms"
+        )
         log.info("Todos los modulos han sido procesados.")
 
     async def sync_application_commands_once(self):
@@ -203,30 +228,35 @@ class MyBot(commands.Bot):
             return
 
         try:
-            global_synced = await self.tree.sync()
-            log.info(f"Slash commands globales sincronizados: {len(global_synced)}")
+            result = await sync_tree(self.tree)
         except discord.HTTPException as exc:
             log.error(f"No se pudieron sincronizar los slash commands globales: {exc}")
             return
 
         self._app_commands_synced = True
-        log.info("Los comandos globales quedan disponibles para todos los servidores.")
+        if result.synced:
+            log.info(f"Slash commands globales sincronizados: {result.command_count}")
+            log.info("Los comandos globales quedan disponibles para todos los servidores.")
+        else:
+            log.info(f"Slash commands globales sin cambios ({result.command_count}); no se sincronizan.")
 
     async def sync_guild_application_commands(
         self,
         guild: discord.Guild,
         *,
         log_result: bool = True,
-    ) -> list[app_commands.AppCommand]:
+        force: bool = False,
+    ) -> SyncResult:
         try:
             # Refleja los slash globales en scope de guild para que aparezcan al instante
             # en servidores nuevos, sin esperar a la propagacion global.
             self.tree.clear_commands(guild=guild)
             self.tree.copy_global_to(guild=guild)
-            synced = await self.tree.sync(guild=guild)
+            result = await sync_tree(self.tree, guild=guild, force=force)
             if log_result:
-                log.info(f"Slash commands sincronizados en {guild.name} ({guild.id}): {len(synced)}")
-            return synced
+                state = "sincronizados" if result.synced else "sin cambios"
+                log.info(f"Slash commands {state} en {guild.name} ({guild.id}): {result.command_count}")
+            return result
         except discord.HTTPException as exc:
             log.warning(f"No se pudieron sincronizar slash commands en {guild.name} ({guild.id}): {exc}")
             raise
@@ -296,7 +326,12 @@ bot = MyBot()
 
 @bot.event
 async def on_ready():
-    await asyncio.to_thread(db.sync_guilds, bot.guilds)
+    departed = await asyncio.to_thread(db.sync_guilds, bot.guilds)
+    for guild_id in departed:
+        localization.remove_guild_mode(guild_id)
+    if departed:
+        log.info(f"Limpiada la configuracion de {len(departed)} servidores abandonados sin conexion.")
+    emoji_index.rebuild(bot.guilds)
     await bot.sync_application_commands_once()
     log.info(f"Bot listo | Conectado como {bot.user}")
     log.info(f"Presente en {len(bot.guilds)} servidores.")
@@ -307,6 +342,7 @@ async def on_ready():
 @bot.event
 async def on_guild_join(guild: discord.Guild):
     await asyncio.to_thread(db.add_guild, guild)
+    emoji_index.index_guild(guild)
     await bot.send_guild_welcome(guild)
     total = total_users_all_guilds(bot)
     log.info(f"Se unio a {guild.name} ({guild.id}) | Total: {len(bot.guilds)} servidores, {total} usuarios")
@@ -316,6 +352,7 @@ async def on_guild_join(guild: discord.Guild):
 async def on_guild_remove(guild: discord.Guild):
     await asyncio.to_thread(db.remove_guild, guild)
     localization.remove_guild_mode(guild.id)
+    emoji_index.drop_guild(guild.id)
     total = total_users_all_guilds(bot)
     log.info(
         f"Salio de {guild.name or 'servidor desconocido'} ({guild.id}) | "
@@ -323,6 +360,15 @@ async def on_guild_remove(guild: discord.Guild):
     )
 
 
+@bot.event
+async def on_guild_emojis_update(
+    guild: discord.Guild,
+    before: tuple[discord.Emoji, ...],
+    after: tuple[discord.Emoji, ...],
+):
+    emoji_index.index_guild(guild, after)
+
+
 @bot.event
 async def on_command_error(ctx: commands.Context, error: commands.CommandError):
     if isinstance(error, commands.CheckFailure):
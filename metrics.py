@@ -0,0 +1,421 @@
+"""Métricas de ejecución en formato de texto de Prometheus.
+
+``metrics`` es el registro compartido. Los módulos crean contadores, gauges e
+histogramas con nombre y etiquetas fijas y los actualizan en el momento. Los
+datos que ya se agregan en otro sitio, como el registro de consultas de
+``database.py``, se publican con colectores que se leen en cada scrape.
+``MetricsServer`` sirve ``/metrics`` solo en localhost.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import bisect
+import functools
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Callable, Iterable, Sequence
+from typing import Any
+
+import aiohttp
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Una familia lista para exponer: (nombre, tipo, ayuda, muestras). Cada muestra es
+# (sufijo, etiquetas, valor), p. ej. ("_bucket", {"le": "0.1"}, 3).
+Family = tuple[str, str, str, list[tuple[str, dict[str, str], float]]]
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    if float(value).is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+
+def render_families(families: Iterable[Family]) -> str:
+    lines: list[str] = []
+    for name, kind, documentation, samples in families:
+        help_text = documentation.replace("\\", "\\\\").replace("\n", "\\n")
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for suffix, labels, value in samples:
+            lines.append(f"{name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def _new_child(self) -> Any:
+        """Valor de una serie nueva, p. ej. ``_Value`` o ``_HistogramValue``."""
+
+    def labels(self, *values: Any) -> Any:
+        """Serie para esos valores de etiqueta; conviene guardarla si se usa a menudo."""
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} espera las etiquetas {self.labelnames}")
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _unlabelled(self) -> Any:
+        if self.labelnames:
+            raise ValueError(f"{self.name} necesita etiquetas {self.labelnames}")
+        return self.labels()
+
+    def _series(self) -> list[tuple[dict[str, str], Any]]:
+        with self._lock:
+            items = list(self._children.items())
+        return [(dict(zip(self.labelnames, key, strict=True)), child) for key, child in items]
+
+    @abstractmethod
+    def collect(self) -> Family:
+        """Familia lista para ``render_families`` con todas las series."""
+
+
+class _Value:
+    __slots__ = ("_lock", "value")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = float(value)
+
+
+class Counter(_Metric):
+    """Contador acumulado; por convención su nombre termina en ``_total``."""
+
+    kind = "counter"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._unlabelled().inc(amount)
+
+    def collect(self) -> Family:
+        samples = [("", labels, child.value) for labels, child in self._series()]
+        return self.name, self.kind, self.documentation, samples
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def set(self, value: float) -> None:
+        self._unlabelled().set(value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._unlabelled().inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._unlabelled().dec(amount)
+
+    def collect(self) -> Family:
+        samples = [("", labels, child.value) for labels, child in self._series()]
+        return self.name, self.kind, self.documentation, samples
+
+
+class _HistogramValue:
+    __slots__ = ("_bounds", "_lock", "buckets", "count", "sum")
+
+    def __init__(self, bounds: tuple[float, ...]):
+        self._bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self._bounds, value)
+        with self._lock:
+            self.buckets[index] += 1
+            self.count += 1
+            self.sum += value
+
+
+def histogram_samples(
+    labels: dict[str, str],
+    bounds: Sequence[float],
+    buckets: Sequence[int],
+    total: float,
+) -> list[tuple[str, dict[str, str], float]]:
+    """Muestras ``_bucket``/``_sum``/``_count`` a partir de cubetas no acumuladas.
+
+    ``buckets`` tiene una posición más que ``bounds`` para los valores por
+    encima del último límite.
+    """
+    samples = []
+    cumulative = 0
+    for bound, count in zip(bounds, buckets, strict=False):
+        cumulative += count
+        samples.append(("_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+    cumulative += buckets[-1]
+    samples.append(("_bucket", {**labels, "le": "+Inf"}, cumulative))
+    samples.append(("_sum", labels, total))
+    samples.append(("_count", labels, cumulative))
+    return samples
+
+
+def bucket_quantile(bounds: Sequence[float], buckets: Sequence[int], q: float, max_value: float) -> float:
+    """Límite superior de la cubeta que contiene el cuantil ``q``.
+
+    No pasa de ``max_value``, que también se usa para la cubeta abierta.
+    """
+    total = sum(buckets)
+    if not total:
+        return 0.0
+    rank = math.ceil(q * total)
+    seen = 0
+    for bound, count in zip(bounds, buckets, strict=False):
+        seen += count
+        if seen >= rank:
+            return min(bound, max_value)
+    return max_value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str],
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.bounds = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramValue:
+        return _HistogramValue(self.bounds)
+
+    def observe(self, value: float) -> None:
+        self._unlabelled().observe(value)
+
+    def collect(self) -> Family:
+        samples = []
+        for labels, child in self._series():
+            with child._lock:
+                buckets, total = list(child.buckets), child.sum
+            samples.extend(histogram_samples(labels, self.bounds, buckets, total))
+        return self.name, self.kind, self.documentation, samples
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._collectors: dict[str, Callable[[], Iterable[Family]]] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls: type[_Metric], name: str, *args: Any, **kwargs: Any) -> Any:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, *args, **kwargs)
+                self._metrics[name] = metric
+            elif type(metric) is not cls:
+                raise ValueError(f"La métrica {name} ya existe como {metric.kind}")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        *,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets)
+
+    def add_collector(self, key: str, collector: Callable[[], Iterable[Family]]) -> None:
+        """Registra (o reemplaza) una función que devuelve familias en cada scrape."""
+        with self._lock:
+            self._collectors[key] = collector
+
+    def remove_collector(self, key: str) -> None:
+        with self._lock:
+            self._collectors.pop(key, None)
+
+    def collect(self) -> list[Family]:
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors.values())
+        families = [metric.collect() for metric in metrics]
+        for collector in collectors:
+            families.extend(collector())
+        return families
+
+    def render(self) -> str:
+        return render_families(self.collect())
+
+
+metrics = MetricsRegistry()
+
+TASK_LOOP_DURATION = metrics.histogram(
+    "copydc_task_loop_duration_seconds",
+    "Duración de cada iteración de las tareas periódicas.",
+    ("task",),
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0),
+)
+TASK_LOOP_ERRORS = metrics.counter(
+    "copydc_task_loop_errors_total",
+    "Iteraciones de tareas periódicas que terminaron con una excepción.",
+    ("task",),
+)
+REST_REQUESTS = metrics.counter(
+    "copydc_rest_requests_total",
+    "Peticiones HTTP a la API de Discord por método y código de respuesta.",
+    ("method", "status"),
+)
+REST_RATE_LIMITED = metrics.counter(
+    "copydc_rest_rate_limited_total",
+    "Respuestas 429 de la API de Discord.",
+    ("method",),
+)
+CACHE_REQUESTS = metrics.counter(
+    "copydc_cache_requests_total",
+    "Consultas a cachés internas por resultado (hit o miss).",
+    ("cache", "result"),
+)
+
+
+def cache_counters(cache: str) -> tuple[_Value, _Value]:
+    """Series ``(hit, miss)`` de ``CACHE_REQUESTS`` para una caché."""
+    return CACHE_REQUESTS.labels(cache, "hit"), CACHE_REQUESTS.labels(cache, "miss")
+
+
+def timed_task(name: str) -> Callable:
+    """Mide cada iteración de una tarea; va debajo de ``@tasks.loop``."""
+
+    def decorator(func: Callable) -> Callable:
+        duration = TASK_LOOP_DURATION.labels(name)
+        errors = TASK_LOOP_ERRORS.labels(name)
+
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except Exception:
+                errors.inc()
+                raise
+            finally:
+                duration.observe(time.perf_counter() - started)
+
+        return wrapper
+
+    return decorator
+
+
+def rest_trace_config() -> aiohttp.TraceConfig:
+    """``TraceConfig`` para ``discord.Client(http_trace=...)`` que cuenta peticiones y 429."""
+
+    async def on_request_end(_session, _context, params: aiohttp.TraceRequestEndParams) -> None:
+        status = params.response.status
+        REST_REQUESTS.labels(params.method, status).inc()
+        if status == 429:
+            REST_RATE_LIMITED.labels(params.method).inc()
+
+    async def on_request_exception(_session, _context, params: aiohttp.TraceRequestExceptionParams) -> None:
+        REST_REQUESTS.labels(params.method, "error").inc()
+
+    trace = aiohttp.TraceConfig()
+    trace.on_request_end.append(on_request_end)
+    trace.on_request_exception.append(on_request_exception)
+    return trace
+
+
+class MetricsServer:
+    """Servidor HTTP mínimo que responde ``GET /metrics`` con ``registry.render()``."""
+
+    def __init__(self, registry: MetricsRegistry, host: str = "127.0.0.1", port: int = 9464):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._server: asyncio.Server | None = None
+
+    @property
+    def bound_port(self) -> int | None:
+        if self._server is None or not self._server.sockets:
+            return None
+        return self._server.sockets[0].getsockname()[1]
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+            # Se descartan las cabeceras; no hace falta ninguna.
+            while (await asyncio.wait_for(reader.readline(), timeout=5)) not in (b"\r\n", b"\n", b""):
+                pass
+            parts = request_line.decode("latin-1").split()
+            if len(parts) < 2 or parts[0] != "GET":
+                status, body, content_type = "405 Method Not Allowed", b"", "text/plain"
+            elif parts[1].split("?", 1)[0] != "/metrics":
+                status, body, content_type = "404 Not Found", b"", "text/plain"
+            else:
+                status, content_type = "200 OK", CONTENT_TYPE
+                body = self.registry.render().encode("utf-8")
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1")
+                + body
+            )
+            await writer.drain()
+        except (TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
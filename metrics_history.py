@@ -0,0 +1,196 @@
+"""Historial de métricas en un SQLite aparte de la base principal.
+
+Cada minuto se añade un resumen ``{métrica: valor}`` a un búfer en memoria y
+``flush`` lo escribe de golpe en una sola transacción, así que grabar métricas
+no compite con la base del bot. Las filas de minuto más antiguas que
+``MINUTE_RETENTION_SEC`` se agregan en filas de hora (media ponderada, mínimo y
+máximo) y las de hora caducan tras ``HOUR_RETENTION_SEC``.
+
+Las consultas mezclan ambas resoluciones: cada fila pesa tantas muestras como
+minutos resume.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from collections.abc import Mapping
+from typing import Any
+
+MINUTE = 60
+HOUR = 3600
+MINUTE_RETENTION_SEC = 7 * 86400
+HOUR_RETENTION_SEC = 400 * 86400
+# Tope del búfer si el archivo no se puede escribir; se pierden las filas más viejas.
+MAX_PENDING_ROWS = 50_000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollups (
+    resolution INTEGER NOT NULL,
+    metric TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    value REAL NOT NULL,
+    samples INTEGER NOT NULL,
+    minimum REAL NOT NULL,
+    maximum REAL NOT NULL,
+    PRIMARY KEY (resolution, metric, bucket)
+) WITHOUT ROWID
+"""
+
+# Combina una fila con la que ya existe para ese minuto u hora.
+UPSERT = """
+INSERT INTO rollups (resolution, metric, bucket, value, samples, minimum, maximum)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (resolution, metric, bucket) DO UPDATE SET
+    value = (value * samples + excluded.value * excluded.samples) / (samples + excluded.samples),
+    samples = samples + excluded.samples,
+    minimum = MIN(minimum, excluded.minimum),
+    maximum = MAX(maximum, excluded.maximum)
+"""
+
+DOWNSAMPLE = f"""
+INSERT INTO rollups (resolution, metric, bucket, value, samples, minimum, maximum)
+SELECT {HOUR}, metric, bucket - bucket % {HOUR}, SUM(value * samples) / SUM(samples),
+       SUM(samples), MIN(minimum), MAX(maximum)
+FROM rollups
+WHERE resolution = {MINUTE} AND bucket < ?
+GROUP BY metric, bucket - bucket % {HOUR}
+ON CONFLICT (resolution, metric, bucket) DO UPDATE SET
+    value = (value * samples + excluded.value * excluded.samples) / (samples + excluded.samples),
+    samples = samples + excluded.samples,
+    minimum = MIN(minimum, excluded.minimum),
+    maximum = MAX(maximum, excluded.maximum)
+"""
+
+
+class MetricsHistory:
+    def __init__(self, path: str):
+        self.path = path
+        self._pending: list[tuple[int, str, int, float, int, float, float]] = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    def record(self, bucket: int, values: Mapping[str, float]) -> None:
+        """Añade al búfer el resumen del minuto que empieza en ``bucket`` (epoch)."""
+        bucket -= bucket % MINUTE
+        rows = [
+            (MINUTE, metric, bucket, float(value), 1, float(value), float(value))
+            for metric, value in values.items()
+        ]
+        with self._lock:
+            self._pending.extend(rows)
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute(SCHEMA)
+        return conn
+
+    def flush(self, now: float | None = None) -> int:
+        """Escribe el búfer y compacta lo antiguo; devuelve las filas escritas.
+
+        Es bloqueante: desde el bucle de asyncio hay que llamarla con
+        ``asyncio.to_thread``.
+        """
+        with self._lock:
+            rows, self._pending = self._pending, []
+        if not rows:
+            return 0
+        now = time.time() if now is None else now
+        try:
+            with self._write_lock:
+                self._write(rows, now)
+        except sqlite3.Error:
+            # Se reintenta en el siguiente flush.
+            with self._lock:
+                self._pending = (rows + self._pending)[-MAX_PENDING_ROWS:]
+            raise
+        return len(rows)
+
+    def _write(self, rows: list[tuple], now: float) -> None:
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(UPSERT, rows)
+                self._compact(conn, now)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _compact(conn: sqlite3.Connection, now: float) -> None:
+        # Corte en hora exacta para no partir una hora entre dos pasadas.
+        cutoff = int(now - MINUTE_RETENTION_SEC)
+        cutoff -= cutoff % HOUR
+        conn.execute(DOWNSAMPLE, (cutoff,))
+        conn.execute("DELETE FROM rollups WHERE resolution = ? AND bucket < ?", (MINUTE, cutoff))
+        conn.execute(
+            "DELETE FROM rollups WHERE resolution = ? AND bucket < ?", (HOUR, int(now - HOUR_RETENTION_SEC))
+        )
+
+    def _query(self, sql: str, params: tuple) -> list[sqlite3.Row]:
+        with self._write_lock:
+            conn = self._connect()
+            try:
+                conn.row_factory = sqlite3.Row
+                return conn.execute(sql, params).fetchall()
+            finally:
+                conn.close()
+
+    def series(self, metric: str, since: float, until: float, *, points: int = 48) -> list[dict[str, Any]]:
+        """Hasta ``points`` puntos de ``metric`` entre ``since`` y ``until``."""
+        span = max(int(until - since), MINUTE)
+        step = max(MINUTE, -(-span // points // MINUTE) * MINUTE)
+        rows = self._query(
+            """
+            SELECT bucket - bucket % ? AS slot, SUM(value * samples) / SUM(samples) AS value,
+                   MIN(minimum) AS minimum, MAX(maximum) AS maximum, SUM(samples) AS samples
+            FROM rollups
+            WHERE metric = ? AND bucket >= ? AND bucket < ?
+            GROUP BY slot
+            ORDER BY slot
+            """,
+            (step, metric, int(since), int(until)),
+        )
+        return [dict(row) for row in rows]
+
+    def summaries(self, since: float, until: float) -> dict[str, dict[str, float]]:
+        """``{métrica: {value, minimum, maximum, samples}}`` del periodo."""
+        rows = self._query(
+            """
+            SELECT metric, SUM(value * samples) / SUM(samples) AS value,
+                   MIN(minimum) AS minimum, MAX(maximum) AS maximum, SUM(samples) AS samples
+            FROM rollups
+            WHERE bucket >= ? AND bucket < ?
+            GROUP BY metric
+            ORDER BY metric
+            """,
+            (int(since), int(until)),
+        )
+        return {
+            row["metric"]: {key: row[key] for key in ("value", "minimum", "maximum", "samples")}
+            for row in rows
+        }
+
+
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+
+def sparkline(values: list[float]) -> str:
+    if not values:
+        return ""
+    low, high = min(values), max(values)
+    if high <= low:
+        return SPARK_CHARS[0] * len(values)
+    scale = (len(SPARK_CHARS) - 1) / (high - low)
+    return "".join(SPARK_CHARS[round((value - low) * scale)] for value in values)
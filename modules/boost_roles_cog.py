@@ -17,50 +17,14 @@ from discord import app_commands
 from discord.ext import commands, tasks
 
 import database as db
-from command_utils import RestrictedView
+from command_utils import PaginationView
 from localization import translate
+from metrics import timed_task
 
 ENTRIES_PER_PAGE = 10  # roles por página en /boostrole list
 log = logging.getLogger("bot")
 
 
-# ╭────────────────────────── Paginated View ───────────────────────────╮
-class PaginationView(RestrictedView):
-    """Botones ◀️ / ▶️ para navegar páginas de /boostrole list."""
-
-    def __init__(self, embeds: list[discord.Embed], author_id: int):
-        super().__init__(author_id=author_id, timeout=120)
-        self.embeds = embeds
-        self.index = 0
-        self.message: discord.Message | None = None
-        self._sync_buttons()
-
-    def _sync_buttons(self):
-        self.prev_button.disabled = self.index <= 0
-        self.next_button.disabled = self.index >= len(self.embeds) - 1
-
-    @discord.ui.button(label="◀️", style=discord.ButtonStyle.secondary)
-    async def prev_button(self, interaction: discord.Interaction, _):
-        self.index -= 1
-        self._sync_buttons()
-        await interaction.response.edit_message(embed=self.embeds[self.index], view=self)
-
-    @discord.ui.button(label="▶️", style=discord.ButtonStyle.secondary)
-    async def next_button(self, interaction: discord.Interaction, _):
-        self.index += 1
-        self._sync_buttons()
-        await interaction.response.edit_message(embed=self.embeds[self.index], view=self)
-
-    async def on_timeout(self):
-        for child in self.children:
-            child.disabled = True
-        if self.message:
-            await self.message.edit(view=self)
-
-
-# ╰──────────────────────────────────────────────────────────────────────────╯
-
-
 class BoostRolesCog(commands.Cog):
     """Gestión de roles exclusivos para boosters."""
 
@@ -404,6 +368,7 @@ class BoostRolesCog(commands.Cog):
 
     # ─────────────── Auditoría periódica ────────────────
     @tasks.loop(hours=12)
+    @timed_task("boost_roles.audit")
     async def audit_boost_roles(self):
         """Revisa cada 12 h que los 'boost-linked' sigan en boosters."""
         for guild in self.bot.guilds:
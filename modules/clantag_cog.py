@@ -5,19 +5,134 @@ Da roles a usuarios que tengan el tag del clan del servidor
 
 import asyncio
 import logging
-import re
+import math
 import time
+from collections import OrderedDict
 
 import discord
 from discord import ui
 from discord.ext import commands
 
-from command_utils import RestrictedView
-from database import delete_clantag_settings, get_clantag_settings, set_clantag_settings, setup_clantag_table
+from command_utils import PaginationView, RestrictedView, convert_guild_emojis, get_compiled_embed_text
+from database import (
+    delete_clantag_settings,
+    get_clantag_role_guild_ids,
+    get_clantag_settings,
+    set_clantag_settings,
+)
 from localization import get_language, translate, translate_language
+from metrics import cache_counters
+from role_sync import role_reconciler
 
 log = logging.getLogger("bot")
 
+CLANTAG_EMBED_FIELDS = frozenset({"user", "role", "tag", "server"})
+CLAN_CACHE_MAX_USERS = 5000
+_CLAN_CACHE_HITS, _CLAN_CACHE_MISSES = cache_counters("clantag_primary_guild")
+RECENT_ACTION_WINDOW_SEC = 3.0
+WEARER_INDEX_CHUNK = 1000
+LIST_ENTRIES_PER_PAGE = 20
+
+
+def clan_for_guild(user: discord.User | discord.Member, guild_id: int) -> str | None:
+    """Devuelve el tag si el servidor principal en caché del usuario es ``guild_id``."""
+    primary_guild = getattr(user, "primary_guild", None)
+    if primary_guild is None or primary_guild.identity_enabled is False:
+        return None
+    if getattr(primary_guild, "id", None) != guild_id:
+        return None
+    return getattr(primary_guild, "tag", None) or None
+
+
+class ClanTagWearerIndex:
+    """Índice por servidor de los miembros que llevan su clan tag.
+
+    Se construye la primera vez que se consulta un servidor, por bloques para
+    no bloquear el event loop, y después se mantiene con los eventos de
+    miembros, así que el tag y el recuento son O(1).
+    """
+
+    def __init__(self, chunk_size: int = WEARER_INDEX_CHUNK):
+        self.chunk_size = chunk_size
+        self._wearers: dict[int, dict[int, str]] = {}
+        self._tags: dict[int, str] = {}
+        self._ready: set[int] = set()
+        self._builds: dict[int, asyncio.Task] = {}
+
+    def is_ready(self, guild_id: int) -> bool:
+        return guild_id in self._ready
+
+    async def ensure_built(self, guild: discord.Guild):
+        if guild.id in self._ready:
+            return
+        task = self._builds.get(guild.id)
+        if task is None:
+            task = asyncio.create_task(self._build(guild))
+            self._builds[guild.id] = task
+            task.add_done_callback(lambda done: self._forget_build(guild.id, done))
+        try:
+            await asyncio.shield(task)
+        except asyncio.CancelledError:
+            # ``drop_guild`` canceló la construcción: el índice queda vacío.
+            if task.cancelled() and not asyncio.current_task().cancelling():
+                return
+            raise
+
+    def _forget_build(self, guild_id: int, task: asyncio.Task):
+        # Una construcción cancelada no debe olvidar otra más reciente.
+        if self._builds.get(guild_id) is task:
+            del self._builds[guild_id]
+
+    async def _build(self, guild: discord.Guild):
+        # Los eventos que llegan durante la construcción ya se aplican sobre
+        # este diccionario, y los miembros pendientes se leen en su estado actual.
+        self._wearers[guild.id] = {}
+        members = list(guild.members)
+        for start in range(0, len(members), self.chunk_size):
+            for member in members[start : start + self.chunk_size]:
+                if member.guild.get_member(member.id) is not None:
+                    self.update(member)
+            await asyncio.sleep(0)
+        self._ready.add(guild.id)
+
+    def update(self, member: discord.Member):
+        wearers = self._wearers.get(member.guild.id)
+        if wearers is None:
+            return
+        tag = None if member.bot else clan_for_guild(member, member.guild.id)
+        if tag is None:
+            self.discard(member.guild.id, member.id)
+            return
+        wearers[member.id] = tag
+        self._tags[member.guild.id] = tag
+
+    def discard(self, guild_id: int, member_id: int):
+        wearers = self._wearers.get(guild_id)
+        if wearers is None or wearers.pop(member_id, None) is None:
+            return
+        if not wearers:
+            self._tags.pop(guild_id, None)
+
+    def drop_guild(self, guild_id: int):
+        self._wearers.pop(guild_id, None)
+        self._tags.pop(guild_id, None)
+        self._ready.discard(guild_id)
+        task = self._builds.pop(guild_id, None)
+        if task is not None:
+            task.cancel()
+
+    def tag(self, guild_id: int) -> str | None:
+        return self._tags.get(guild_id)
+
+    def count(self, guild_id: int) -> int:
+        return len(self._wearers.get(guild_id, ()))
+
+    def member_ids(self, guild_id: int) -> list[int]:
+        return list(self._wearers.get(guild_id, ()))
+
+    def guild_ids(self) -> list[int]:
+        return list(self._wearers)
+
 
 class EmbedEditorModal(ui.Modal):
     """Modal para editar el embed."""
@@ -80,17 +195,31 @@ class ClanTagCog(commands.Cog):
 
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        setup_clantag_table()
-        # Cache para evitar spam de peticiones
-        self._clan_cache = {}
+        # Cache LRU acotada para evitar spam de peticiones a fetch_user
+        self._clan_cache: OrderedDict[int, dict] = OrderedDict()
         self._clan_cache_ttl_sec = 60.0
+        self._clan_cache_max_users = CLAN_CACHE_MAX_USERS
+        # Peticiones fetch_user en curso, compartidas entre eventos simultáneos
+        self._clan_fetches: dict[int, asyncio.Task] = {}
         # Anti-duplicados: {(guild_id, user_id): {'action': 'add'/'remove', 'time': float}}
-        self._recent_actions = {}
+        # Se mantiene en orden de inserción para poder descartar los más antiguos.
+        self._recent_actions: OrderedDict[tuple[int, int], dict] = OrderedDict()
+        self.wearers = ClanTagWearerIndex()
         self._settings_cache = {}
         self._settings_cache_ttl_sec = 30.0
+        # Servidores con rol configurado; se carga en el primer cambio de tag
+        # y se mantiene al leer o borrar la configuración.
+        self._role_guilds: set[int] | None = None
 
     def _invalidate_settings_cache(self, guild_id: int):
         self._settings_cache.pop(guild_id, None)
+        if self._role_guilds is not None:
+            self._role_guilds.discard(guild_id)
+
+    def _get_role_guilds(self) -> set[int]:
+        if self._role_guilds is None:
+            self._role_guilds = get_clantag_role_guild_ids()
+        return self._role_guilds
 
     def _get_settings_cached(self, guild_id: int) -> dict:
         now = time.monotonic()
@@ -99,12 +228,24 @@ class ClanTagCog(commands.Cog):
             return dict(cached["value"])
 
         settings = get_clantag_settings(guild_id) or {}
+        if self._role_guilds is not None:
+            if settings.get("role_id"):
+                self._role_guilds.add(guild_id)
+            else:
+                self._role_guilds.discard(guild_id)
         self._settings_cache[guild_id] = {
             "expires_at": now + self._settings_cache_ttl_sec,
             "value": settings,
+            # Las plantillas se validan contra su texto de origen, así que
+            # sobreviven a la expiración del TTL pero no a una invalidación.
+            "templates": cached["templates"] if cached else {},
         }
         return dict(settings)
 
+    def _get_embed_templates(self, guild_id: int) -> dict:
+        cached = self._settings_cache.get(guild_id)
+        return cached["templates"] if cached else {}
+
     def _refresh_settings_cache(self, guild_id: int):
         self._invalidate_settings_cache(guild_id)
         self._get_settings_cached(guild_id)
@@ -126,13 +267,27 @@ class ClanTagCog(commands.Cog):
             "guild_id": int(guild_id),
         }
 
-    async def fetch_user_clan(self, user_id: int) -> dict | None:
-        """Obtiene el servidor principal mediante la API soportada por discord.py."""
-        cached = self._clan_cache.get(user_id)
-        now = time.monotonic()
-        if cached and now < cached["expires_at"]:
-            return cached["value"]
+    @staticmethod
+    def _primary_guild_signature(user: discord.User | discord.Member) -> tuple | None:
+        primary_guild = getattr(user, "primary_guild", None)
+        if primary_guild is None:
+            return None
+        return (
+            getattr(primary_guild, "id", None),
+            getattr(primary_guild, "tag", None),
+            getattr(primary_guild, "identity_enabled", None),
+        )
 
+    def _remember_clan(self, user_id: int, value: dict | None, now: float):
+        self._clan_cache[user_id] = {
+            "value": value,
+            "expires_at": now + self._clan_cache_ttl_sec,
+        }
+        self._clan_cache.move_to_end(user_id)
+        while len(self._clan_cache) > self._clan_cache_max_users:
+            self._clan_cache.popitem(last=False)
+
+    async def _fetch_user_clan_uncached(self, user_id: int) -> dict | None:
         user = self.bot.get_user(user_id)
         try:
             if user is None:
@@ -144,37 +299,83 @@ class ClanTagCog(commands.Cog):
             log.warning("No pude consultar primary_guild para user=%s: %s", user_id, exc)
             return None
 
-        self._clan_cache[user_id] = {
-            "value": value,
-            "expires_at": now + self._clan_cache_ttl_sec,
-        }
+        self._remember_clan(user_id, value, time.monotonic())
         return value
 
+    async def fetch_user_clan(self, user_id: int) -> dict | None:
+        """Obtiene el servidor principal mediante la API soportada por discord.py."""
+        cached = self._clan_cache.get(user_id)
+        if cached and time.monotonic() < cached["expires_at"]:
+            self._clan_cache.move_to_end(user_id)
+            _CLAN_CACHE_HITS.inc()
+            return cached["value"]
+        _CLAN_CACHE_MISSES.inc()
+
+        task = self._clan_fetches.get(user_id)
+        if task is None:
+            task = asyncio.create_task(self._fetch_user_clan_uncached(user_id))
+            self._clan_fetches[user_id] = task
+            task.add_done_callback(lambda _: self._clan_fetches.pop(user_id, None))
+        return await asyncio.shield(task)
+
+    def _prune_recent_actions(self, now: float):
+        while self._recent_actions:
+            oldest = next(iter(self._recent_actions.values()))
+            if now - oldest["time"] < RECENT_ACTION_WINDOW_SEC:
+                break
+            self._recent_actions.popitem(last=False)
+
+    def _record_action(self, key: tuple[int, int], action: str, now: float):
+        self._recent_actions[key] = {"action": action, "time": now}
+        self._recent_actions.move_to_end(key)
+
     def convert_emojis(self, text: str, guild: discord.Guild) -> str:
         """Convierte :emoji: al formato <:emoji:id> automáticamente."""
-        pattern = r":([a-zA-Z0-9_]+):"
-
-        def replace_emoji(match):
-            emoji_name = match.group(1)
-            for emoji in guild.emojis:
-                if emoji.name.lower() == emoji_name.lower():
-                    if emoji.animated:
-                        return f"<a:{emoji.name}:{emoji.id}>"
-                    else:
-                        return f"<:{emoji.name}:{emoji.id}>"
-            return match.group(0)
-
-        return re.sub(pattern, replace_emoji, text)
+        return convert_guild_emojis(text, guild)
 
     async def get_guild_clan_tag(self, guild: discord.Guild) -> str | None:
-        """Obtiene el clan tag del servidor buscando en los miembros via API."""
-        for member in guild.members:
-            if member.bot:
-                continue
-            clan_data = self._extract_primary_guild(member)
-            if clan_data and clan_data.get("guild_id") == guild.id:
-                return clan_data.get("tag")
-        return None
+        """Obtiene el clan tag del servidor a partir del índice de miembros."""
+        await self.wearers.ensure_built(guild)
+        return self.wearers.tag(guild.id)
+
+    async def build_list_embeds(self, source, guild: discord.Guild) -> list[discord.Embed]:
+        """Construye las páginas de ``clantag list`` directamente desde el índice."""
+        await self.wearers.ensure_built(guild)
+        clan_tag = self.wearers.tag(guild.id)
+        members = [
+            member
+            for member_id in self.wearers.member_ids(guild.id)
+            if (member := guild.get_member(member_id)) is not None
+        ]
+        if not members:
+            return [
+                discord.Embed(
+                    title=translate(source, "clantag.list_title"),
+                    description=translate(source, "clantag.list_none"),
+                    color=0xFEE75C,
+                )
+            ]
+
+        pages = math.ceil(len(members) / LIST_ENTRIES_PER_PAGE)
+        embeds = []
+        for page in range(pages):
+            chunk = members[page * LIST_ENTRIES_PER_PAGE : (page + 1) * LIST_ENTRIES_PER_PAGE]
+            embed = discord.Embed(
+                title=translate(source, "clantag.list_title_tag", tag=clan_tag),
+                description="\n".join(f"• {member.mention}" for member in chunk),
+                color=0x5865F2,
+            )
+            embed.set_footer(
+                text=translate(
+                    source,
+                    "clantag.list_page",
+                    page=page + 1,
+                    pages=pages,
+                    count=len(members),
+                )
+            )
+            embeds.append(embed)
+        return embeds
 
     async def member_has_server_clan(self, member: discord.Member, guild_id: int) -> tuple[bool, str | None]:
         """Verifica si el miembro tiene el clan del servidor específico via API.
@@ -189,41 +390,58 @@ class ClanTagCog(commands.Cog):
     def build_embed(
         self, settings: dict, member: discord.Member, tag: str, role: discord.Role, is_add: bool
     ) -> discord.Embed:
-        """Construye el embed personalizado."""
+        """Construye el embed personalizado a partir de la plantilla compilada."""
+        language = get_language(member)
         if is_add:
-            title = settings.get("embed_title") or translate(member, "clantag.default_add_title")
-            desc = settings.get("embed_description") or translate(
-                member,
-                "clantag.default_add_description",
-                user="{user}",
-                tag="{tag}",
-                role="{role}",
+            compiled = get_compiled_embed_text(
+                self._get_embed_templates(member.guild.id),
+                ("add", language),
+                member.guild,
+                title=settings.get("embed_title"),
+                description=settings.get("embed_description"),
+                fields=CLANTAG_EMBED_FIELDS,
+                defaults=lambda: (
+                    translate_language(language, "clantag.default_add_title"),
+                    translate_language(
+                        language,
+                        "clantag.default_add_description",
+                        user="{user}",
+                        tag="{tag}",
+                        role="{role}",
+                    ),
+                ),
             )
             color = settings.get("embed_color", 0x57F287)
         else:
-            title = settings.get("remove_title") or translate(member, "clantag.default_remove_title")
-            desc = settings.get("remove_description") or translate(
-                member,
-                "clantag.default_remove_description",
-                user="{user}",
-                tag="{tag}",
+            compiled = get_compiled_embed_text(
+                self._get_embed_templates(member.guild.id),
+                ("remove", language),
+                member.guild,
+                title=settings.get("remove_title"),
+                description=settings.get("remove_description"),
+                fields=CLANTAG_EMBED_FIELDS,
+                defaults=lambda: (
+                    translate_language(language, "clantag.default_remove_title"),
+                    translate_language(
+                        language,
+                        "clantag.default_remove_description",
+                        user="{user}",
+                        tag="{tag}",
+                    ),
+                ),
             )
             color = settings.get("remove_color", 0xED4245)
 
-        # Reemplazar variables
-        desc = desc.replace("{user}", member.mention)
-        desc = desc.replace(
-            "{role}",
-            role.mention if role else translate(member, "clantag.role_field").lower(),
+        desc = compiled.description.render(
+            {
+                "user": member.mention,
+                "role": role.mention if role else translate_language(language, "clantag.role_field").lower(),
+                "tag": tag,
+                "server": member.guild.name,
+            }
         )
-        desc = desc.replace("{tag}", tag)
-        desc = desc.replace("{server}", member.guild.name)
-
-        # Convertir :emoji: a formato completo
-        title = self.convert_emojis(title, member.guild)
-        desc = self.convert_emojis(desc, member.guild)
 
-        embed = discord.Embed(title=title, description=desc, color=color)
+        embed = discord.Embed(title=compiled.title, description=desc, color=color)
         embed.set_thumbnail(url=member.display_avatar.url)
         embed.timestamp = discord.utils.utcnow()
 
@@ -235,10 +453,66 @@ class ClanTagCog(commands.Cog):
 
     @commands.Cog.listener()
     async def on_member_update(self, before: discord.Member, after: discord.Member):
-        """Detecta cuando un miembro cambia su clan tag."""
+        """Reacciona cuando cambian los roles del miembro."""
         if after.bot:
             return
 
+        # discord.py comparte el User interno entre before y after, así que los
+        # cambios de tag llegan por on_user_update; aquí solo importan los roles.
+        if (
+            self._primary_guild_signature(before) == self._primary_guild_signature(after)
+            and before.roles == after.roles
+        ):
+            return
+
+        await self.sync_member(after)
+
+    @commands.Cog.listener()
+    async def on_user_update(self, before: discord.User, after: discord.User):
+        """Detecta cuando un usuario cambia su clan tag."""
+        if after.bot:
+            return
+        if self._primary_guild_signature(before) == self._primary_guild_signature(after):
+            return
+
+        value = self._extract_primary_guild(after)
+        self._remember_clan(after.id, value, time.monotonic())
+        for guild_id in self.wearers.guild_ids():
+            member = self._mutual_member(guild_id, after.id)
+            if member is not None:
+                self.wearers.update(member)
+
+        # Solo los servidores con rol configurado pueden cambiar algo, y cada
+        # sincronización espera su propia ventana del reconciliador.
+        role_guilds = self._role_guilds
+        if role_guilds is None:
+            role_guilds = await asyncio.to_thread(self._get_role_guilds)
+        members = [
+            member
+            for guild_id in list(role_guilds)
+            if (member := self._mutual_member(guild_id, after.id)) is not None
+        ]
+        if members:
+            await asyncio.gather(*(self.sync_member(member) for member in members))
+
+    def _mutual_member(self, guild_id: int, user_id: int) -> discord.Member | None:
+        guild = self.bot.get_guild(guild_id)
+        return guild.get_member(user_id) if guild is not None else None
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member: discord.Member):
+        self.wearers.update(member)
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member: discord.Member):
+        self.wearers.discard(member.guild.id, member.id)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        self.wearers.drop_guild(guild.id)
+
+    async def sync_member(self, after: discord.Member):
+        """Ajusta el rol de clan tag de un miembro según su servidor principal."""
         settings = await asyncio.to_thread(self._get_settings_cached, after.guild.id)
         if not settings or not settings.get("role_id"):
             return
@@ -256,16 +530,22 @@ class ClanTagCog(commands.Cog):
         key = (after.guild.id, after.id)
         action = "add" if has_clan else "remove"
         now = time.time()
+        self._prune_recent_actions(now)
 
         recent = self._recent_actions.get(key)
-        if recent and recent["action"] == action and (now - recent["time"]) < 3:
+        if recent and recent["action"] == action and (now - recent["time"]) < RECENT_ACTION_WINDOW_SEC:
             return  # Ignorar duplicado (menos de 3 segundos)
 
         # Si tiene el clan y no tiene el rol → dar rol
         if has_clan and not has_role:
             try:
-                self._recent_actions[key] = {"action": "add", "time": now}
-                await after.add_roles(role, reason=f"Clan Tag: {clan_tag}")
+                self._record_action(key, "add", now)
+                await role_reconciler.reconcile(
+                    after,
+                    desired=[role],
+                    managed=[role],
+                    reason=f"Clan Tag: {clan_tag}",
+                )
 
                 # Enviar embed
                 channel_id = settings.get("channel_id")
@@ -291,8 +571,13 @@ class ClanTagCog(commands.Cog):
         # Si no tiene el clan y tiene el rol → quitar rol
         elif not has_clan and has_role:
             try:
-                self._recent_actions[key] = {"action": "remove", "time": now}
-                await after.remove_roles(role, reason="Clan Tag removido")
+                self._record_action(key, "remove", now)
+                await role_reconciler.reconcile(
+                    after,
+                    desired=[],
+                    managed=[role],
+                    reason="Clan Tag removido",
+                )
 
                 # Enviar embed de removido si está habilitado
                 if settings.get("remove_enabled"):
@@ -451,64 +736,17 @@ class ClanTagCog(commands.Cog):
     @clantag.command(name="list", aliases=["users", "lista"])
     @commands.has_permissions(administrator=True)
     async def clantag_list(self, ctx: commands.Context):
-        """Muestra usuarios con el clan tag via API."""
+        """Muestra usuarios con el clan tag del servidor."""
         msg = await ctx.send(translate(ctx, "clantag.list_searching"))
+        embeds = await self.build_list_embeds(ctx, ctx.guild)
 
-        users_with_tag = []
-        clan_tag = None
-        checked = 0
-
-        for member in ctx.guild.members:
-            if member.bot:
-                continue
-            checked += 1
-
-            # Actualizar mensaje cada 50 usuarios
-            if checked % 50 == 0:
-                await msg.edit(
-                    content=translate(
-                        ctx,
-                        "clantag.list_verifying",
-                        checked=checked,
-                        total=len(ctx.guild.members),
-                    )
-                )
-
-            has_clan, tag = await self.member_has_server_clan(member, ctx.guild.id)
-            if has_clan:
-                users_with_tag.append(member)
-                if not clan_tag:
-                    clan_tag = tag
-
-        if not users_with_tag:
-            embed = discord.Embed(
-                title=translate(ctx, "clantag.list_title"),
-                description=translate(ctx, "clantag.list_none"),
-                color=0xFEE75C,
-            )
-            await msg.edit(content=None, embed=embed)
+        if len(embeds) == 1:
+            await msg.edit(content=None, embed=embeds[0])
             return
 
-        # Crear embed con lista
-        embed = discord.Embed(
-            title=translate(ctx, "clantag.list_title_tag", tag=clan_tag),
-            color=0x5865F2,
-        )
-
-        # Mostrar máximo 20 usuarios
-        user_list = users_with_tag[:20]
-        user_text = "\n".join(f"• {m.mention}" for m in user_list)
-
-        if len(users_with_tag) > 20:
-            user_text += "\n" + translate(
-                ctx,
-                "clantag.list_more",
-                count=len(users_with_tag) - 20,
-            )
-
-        embed.description = user_text
-        embed.set_footer(text=translate(ctx, "common.total_users", count=len(users_with_tag)))
-        await msg.edit(content=None, embed=embed)
+        view = PaginationView(embeds, ctx.author.id)
+        await msg.edit(content=None, embed=embeds[0], view=view)
+        view.message = msg
 
     @clantag.command(name="embed")
     @commands.has_permissions(administrator=True)
@@ -4,7 +4,7 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 
-from command_utils import RestrictedView
+from command_utils import PaginationView, RestrictedView
 from database import delete_clantag_settings, set_clantag_settings
 from localization import get_language, translate, translate_language
 from modules.clantag_cog import ClanTagCog
@@ -251,41 +251,14 @@ class ClanTagSlashCog(commands.Cog):
             return
 
         await interaction.response.defer(ephemeral=True)
-        users_with_tag = []
-        clan_tag = None
-
-        for member in interaction.guild.members:
-            if member.bot:
-                continue
-            has_clan, tag = await cog.member_has_server_clan(member, interaction.guild.id)
-            if has_clan:
-                users_with_tag.append(member)
-                if not clan_tag:
-                    clan_tag = tag
-        if not users_with_tag:
-            embed = discord.Embed(
-                title=translate(interaction, "clantag.list_title"),
-                description=translate(interaction, "clantag.list_none"),
-                color=0xFEE75C,
-            )
-            await interaction.followup.send(embed=embed, ephemeral=True)
+        embeds = await cog.build_list_embeds(interaction, interaction.guild)
+
+        if len(embeds) == 1:
+            await interaction.followup.send(embed=embeds[0], ephemeral=True)
             return
 
-        embed = discord.Embed(
-            title=translate(interaction, "clantag.list_title_tag", tag=clan_tag),
-            color=0x5865F2,
-        )
-        listed = users_with_tag[:20]
-        description = "\n".join(f"- {member.mention}" for member in listed)
-        if len(users_with_tag) > 20:
-            description += "\n" + translate(
-                interaction,
-                "clantag.list_more",
-                count=len(users_with_tag) - 20,
-            )
-        embed.description = description
-        embed.set_footer(text=translate(interaction, "common.total_users", count=len(users_with_tag)))
-        await interaction.followup.send(embed=embed, ephemeral=True)
+        view = PaginationView(embeds, interaction.user.id)
+        view.message = await interaction.followup.send(embed=embeds[0], view=view, ephemeral=True, wait=True)
 
     @clantag.command(name="reset", description="Borra toda la configuracion de clan tag")
     async def clantag_reset(self, interaction: discord.Interaction):
@@ -1,4 +1,6 @@
 # modules/expression_cog.py
+from __future__ import annotations
+
 import io
 import logging
 import os
@@ -9,12 +11,17 @@ import string
 import aiohttp
 import discord
 from discord.ext import commands
-from PIL import Image, ImageOps
 
+from lazy import LazyResource, lazy_import
 from localization import translate
 
 log = logging.getLogger("bot")
 
+# Pillow solo se importa al procesar la primera imagen.
+Image = lazy_import("PIL.Image")
+ImageOps = lazy_import("PIL.ImageOps")
+HTTP_TIMEOUT = aiohttp.ClientTimeout(total=20, connect=8, sock_read=15)
+
 # ────────────── UTILIDADES ──────────────
 TAG_REGEX = re.compile(r"<a?:\w+:\d+>")
 PARSE_REGEX = re.compile(r"<(a?):(\w+):(\d+)>")
@@ -191,21 +198,19 @@ def describe_processing_error(source, exc: ValueError) -> str:
 class ExpressionCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.session: aiohttp.ClientSession | None = None
-
-    async def cog_load(self):
-        timeout = aiohttp.ClientTimeout(total=20, connect=8, sock_read=15)
-        self.session = aiohttp.ClientSession(timeout=timeout)
+        # La sesión HTTP se abre con la primera descarga, no al cargar el módulo.
+        self.session: LazyResource[aiohttp.ClientSession] = LazyResource(
+            lambda: aiohttp.ClientSession(timeout=HTTP_TIMEOUT),
+            close=lambda session: session.close(),
+            is_closed=lambda session: session.closed,
+        )
 
     async def cog_unload(self):
-        if self.session is not None and not self.session.closed:
-            await self.session.close()
+        await self.session.close()
 
     async def _fetch_bytes(self, url: str) -> bytes | None:
-        if self.session is None or self.session.closed:
-            raise RuntimeError("La sesión HTTP del módulo no está disponible.")
         try:
-            return await fetch_bytes(self.session, url)
+            return await fetch_bytes(await self.session.get(), url)
         except (TimeoutError, aiohttp.ClientError) as exc:
             log.warning("No pude descargar un recurso de expresión: %s", exc)
             return None
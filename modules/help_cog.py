@@ -1,6 +1,7 @@
 import discord
 from discord.ext import commands
 
+from command_utils import EmbedPageCache
 from localization import get_language, resolve_discord_locale
 
 PRIVACY_URL = "https://copy.tyr.lat/privacy"
@@ -573,50 +574,49 @@ def get_help_embeds(lang: str = "es") -> list[discord.Embed]:
     ]
 
 
+# Las páginas se construyen una vez por idioma; cada uso recibe una copia.
+help_pages = EmbedPageCache(get_help_embeds, name="help_pages")
+
+HELP_SECTIONS = {
+    "en": (
+        ("Setup Guide", "Important info before starting"),
+        ("Expressions", "Emojis and stickers"),
+        ("Threads", "Automatic threads"),
+        ("Information", "Users, roles and server"),
+        ("Counting", "Numeric counting channel"),
+        ("Auto Reactions", "Automatic emoji reactions"),
+        ("Boost Roles", "Roles for boosters"),
+        ("Vanity Roles", "Vanity URL in custom status"),
+        ("Clan Tag", "Server clan tag roles"),
+        ("Support Cases", "Private support transcripts"),
+        ("Live LFG", "Real-time game matchmaking"),
+    ),
+    "es": (
+        ("Guia de configuracion", "Info importante antes de empezar"),
+        ("Expresiones", "Emojis y stickers"),
+        ("Hilos", "Hilos automaticos"),
+        ("Informacion", "Usuarios, roles y servidor"),
+        ("Conteo", "Canal de conteo numerico"),
+        ("Reacciones", "Reacciones automaticas"),
+        ("Boost Roles", "Roles para boosters"),
+        ("Vanity Roles", "Vanity URL en estado"),
+        ("Clan Tag", "Roles por clan tag"),
+        ("Casos de soporte", "Expedientes privados de soporte"),
+        ("LFG en vivo", "Grupos por actividad en tiempo real"),
+    ),
+}
+HELP_PLACEHOLDERS = {"en": "Choose a help section...", "es": "Elige una seccion de ayuda..."}
+
+
 def get_select_options(lang: str, current_index: int = 0) -> tuple[list[discord.SelectOption], str]:
     """Opciones del menu por idioma. Retorna (options, placeholder)."""
-    if lang == "en":
-        labels = [
-            ("Setup Guide", "Important info before starting"),
-            ("Expressions", "Emojis and stickers"),
-            ("Threads", "Automatic threads"),
-            ("Information", "Users, roles and server"),
-            ("Counting", "Numeric counting channel"),
-            ("Auto Reactions", "Automatic emoji reactions"),
-            ("Boost Roles", "Roles for boosters"),
-            ("Vanity Roles", "Vanity URL in custom status"),
-            ("Clan Tag", "Server clan tag roles"),
-            ("Support Cases", "Private support transcripts"),
-            ("Live LFG", "Real-time game matchmaking"),
-        ]
-        placeholder = "Choose a help section..."
-    else:
-        labels = [
-            ("Guia de configuracion", "Info importante antes de empezar"),
-            ("Expresiones", "Emojis y stickers"),
-            ("Hilos", "Hilos automaticos"),
-            ("Informacion", "Usuarios, roles y servidor"),
-            ("Conteo", "Canal de conteo numerico"),
-            ("Reacciones", "Reacciones automaticas"),
-            ("Boost Roles", "Roles para boosters"),
-            ("Vanity Roles", "Vanity URL en estado"),
-            ("Clan Tag", "Roles por clan tag"),
-            ("Casos de soporte", "Expedientes privados de soporte"),
-            ("LFG en vivo", "Grupos por actividad en tiempo real"),
-        ]
-        placeholder = "Elige una seccion de ayuda..."
-
-    options: list[discord.SelectOption] = []
-    for idx, (label, desc) in enumerate(labels):
-        options.append(
-            discord.SelectOption(
-                label=label,
-                description=desc,
-                value=str(idx),
-                default=(idx == current_index),
-            )
-        )
-    return options, placeholder
+    if lang not in HELP_SECTIONS:
+        lang = "es"
+    options = [
+        discord.SelectOption(label=label, description=desc, value=str(idx), default=(idx == current_index))
+        for idx, (label, desc) in enumerate(HELP_SECTIONS[lang])
+    ]
+    return options, HELP_PLACEHOLDERS[lang]
 
 
 class HelpSelect(discord.ui.Select):
@@ -629,7 +629,7 @@ class HelpSelect(discord.ui.Select):
         index = int(self.values[0])
         assert isinstance(self.view, HelpView)
         self.view.current_index = index
-        await interaction.response.edit_message(embed=self.view.embeds[index], view=self.view)
+        await interaction.response.edit_message(embed=self.view.page(index), view=self.view)
 
 
 class LangButton(discord.ui.Button):
@@ -646,7 +646,7 @@ class LangButton(discord.ui.Button):
             return
 
         new_view = HelpView(lang=self.lang, current_index=self.view.current_index)
-        new_embed = new_view.embeds[self.view.current_index]
+        new_embed = new_view.page(self.view.current_index)
         await interaction.response.edit_message(embed=new_embed, view=new_view)
 
 
@@ -655,7 +655,6 @@ class HelpView(discord.ui.View):
         super().__init__(timeout=180)
         self.lang = lang
         self.current_index = current_index
-        self.embeds = get_help_embeds(lang)
 
         self.add_item(HelpSelect(lang=self.lang, current_index=self.current_index))
         self.add_item(LangButton("es", active=(self.lang == "es")))
@@ -665,17 +664,25 @@ class HelpView(discord.ui.View):
         )
         self.add_item(discord.ui.Button(label="Terms", style=discord.ButtonStyle.link, url=TERMS_URL, row=2))
 
+    def page(self, index: int) -> discord.Embed:
+        return help_pages.embed(self.lang, index)
+
 
 class HelpCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self.bot.remove_command("help")
+        for lang in HELP_SECTIONS:
+            help_pages.pages(lang)
+
+    def cog_unload(self):
+        help_pages.clear()
 
     @commands.command(name="help")
     async def custom_help(self, ctx: commands.Context):
         """Muestra el menu de ayuda con selector de idioma y secciones."""
         view = HelpView(lang=get_language(ctx), current_index=0)
-        await ctx.reply(embed=view.embeds[0], view=view, mention_author=False)
+        await ctx.reply(embed=view.page(0), view=view, mention_author=False)
 
 
 async def setup(bot: commands.Bot):
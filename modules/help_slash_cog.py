@@ -13,7 +13,7 @@ class HelpSlashCog(commands.Cog):
     @app_commands.command(name="help", description="Muestra el menu de ayuda")
     async def slash_help(self, interaction: discord.Interaction):
         view = HelpView(lang=get_language(interaction), current_index=0)
-        await interaction.response.send_message(embed=view.embeds[0], view=view, ephemeral=True)
+        await interaction.response.send_message(embed=view.page(0), view=view, ephemeral=True)
 
 
 async def setup(bot: commands.Bot):
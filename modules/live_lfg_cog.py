@@ -12,6 +12,8 @@ from discord.ext import commands, tasks
 import database as db
 from command_utils import maybe_defer, send_response
 from localization import get_language, translate, translate_language
+from metrics import timed_task
+from role_sync import role_reconciler
 
 log = logging.getLogger("bot")
 MAX_CONFIGURED_GAMES = 20
@@ -92,21 +94,33 @@ class LiveLFGCog(commands.Cog):
         me = guild.me
         return bool(me and not role.is_default() and not role.managed and role < me.top_role)
 
-    async def _remove_tracked_role(self, member: discord.Member, assignment: Any | None):
+    def _tracked_role(self, member: discord.Member, assignment: Any | None) -> discord.Role | None:
         if assignment is None:
-            return
+            return None
         role = member.guild.get_role(assignment["role_id"])
         if role is not None and role in member.roles and self._manageable_role(member.guild, role):
-            try:
-                await member.remove_roles(role, reason="Live LFG activity ended")
-            except discord.HTTPException as exc:
-                log.warning(
-                    "No se pudo retirar rol LFG %s a %s en %s: %s",
-                    role.id,
-                    member.id,
-                    member.guild.id,
-                    exc,
-                )
+            return role
+        return None
+
+    async def _remove_tracked_role(self, member: discord.Member, assignment: Any | None):
+        role = self._tracked_role(member, assignment)
+        if role is None:
+            return
+        try:
+            await role_reconciler.reconcile(
+                member,
+                desired=[],
+                managed=[role],
+                reason="Live LFG activity ended",
+            )
+        except discord.HTTPException as exc:
+            log.warning(
+                "No se pudo retirar rol LFG %s a %s en %s: %s",
+                role.id,
+                member.id,
+                member.guild.id,
+                exc,
+            )
 
     async def process_member(self, member: discord.Member) -> bool:
         """Reconcilia un miembro y retorna True si cambió el panel."""
@@ -151,20 +165,30 @@ class LiveLFGCog(commands.Cog):
             if same_assignment:
                 if new_role not in member.roles:
                     try:
-                        await member.add_roles(new_role, reason="Live LFG active game")
+                        await role_reconciler.reconcile(
+                            member,
+                            desired=[new_role],
+                            managed=[],
+                            reason="Live LFG active game",
+                        )
                     except discord.HTTPException as exc:
                         log.warning("No se pudo restaurar rol LFG a %s: %s", member.id, exc)
                 return False
 
-            await self._remove_tracked_role(member, current)
+            # El rol anterior y el nuevo se aplican en una sola edición del miembro.
+            stale_role = self._tracked_role(member, current)
             if current is not None:
                 await asyncio.to_thread(db.delete_lfg_assignment, member.guild.id, member.id)
-            if new_role not in member.roles:
-                try:
-                    await member.add_roles(new_role, reason="Live LFG active game")
-                except discord.HTTPException as exc:
-                    log.warning("No se pudo asignar rol LFG a %s: %s", member.id, exc)
-                    return current is not None
+            try:
+                await role_reconciler.reconcile(
+                    member,
+                    desired=[new_role],
+                    managed=[stale_role] if stale_role is not None else [],
+                    reason="Live LFG active game",
+                )
+            except discord.HTTPException as exc:
+                log.warning("No se pudo asignar rol LFG a %s: %s", member.id, exc)
+                return current is not None
             await asyncio.to_thread(
                 db.set_lfg_assignment,
                 member.guild.id,
@@ -567,6 +591,7 @@ class LiveLFGCog(commands.Cog):
                 await asyncio.to_thread(db.delete_lfg_assignment, guild.id, assignment["user_id"])
 
     @tasks.loop(minutes=15)
+    @timed_task("lfg.reconcile_state")
     async def reconcile_lfg_state(self):
         for guild in self.bot.guilds:
             if await asyncio.to_thread(db.get_lfg_settings, guild.id) is not None:
@@ -8,7 +8,6 @@ import json
 import logging
 import re
 import sqlite3
-import zipfile
 from datetime import UTC, datetime
 from typing import Any
 from urllib.parse import urlsplit
@@ -19,9 +18,13 @@ from discord.ext import commands, tasks
 
 import database as db
 from command_utils import maybe_defer, send_response
+from lazy import lazy_import
 from localization import get_language, translate, translate_language
+from metrics import timed_task
 
 log = logging.getLogger("bot")
+# Solo se comprimen expedientes que superan el límite de subida.
+zipfile = lazy_import("zipfile")
 MAX_SUBJECT_LENGTH = 100
 MAX_TRANSCRIPT_MESSAGES = 25_000
 
@@ -662,21 +665,33 @@ class SupportCasesCog(commands.Cog):
         )
 
     @tasks.loop(hours=1)
+    @timed_task("support.cleanup_archives")
     async def cleanup_expired_archives(self):
-        rows = await asyncio.to_thread(db.get_expired_support_archives, utc_now_iso())
-        for row in rows:
-            guild = self.bot.get_guild(row["guild_id"])
-            channel = guild.get_channel(row["archive_channel_id"]) if guild else None
-            if isinstance(channel, discord.TextChannel):
-                try:
-                    message = await channel.fetch_message(row["archive_message_id"])
-                    await message.delete()
-                except discord.NotFound:
-                    pass
-                except discord.HTTPException as exc:
-                    log.warning("No se pudo purgar el expediente #%s: %s", row["case_id"], exc)
-                    continue
-            await asyncio.to_thread(db.clear_support_archive, row["case_id"])
+        now_iso = utc_now_iso()
+        after = None
+        while True:
+            rows = await asyncio.to_thread(db.get_expired_support_archives, now_iso, after=after)
+            for row in rows:
+                await self._purge_archive(row)
+            if len(rows) < db.SUPPORT_PURGE_BATCH:
+                break
+            # Los expedientes que fallan siguen en el índice; se avanza por clave
+            # para no volver a leerlos en la misma pasada.
+            after = (rows[-1]["purge_after"], rows[-1]["case_id"])
+
+    async def _purge_archive(self, row: sqlite3.Row):
+        guild = self.bot.get_guild(row["guild_id"])
+        channel = guild.get_channel(row["archive_channel_id"]) if guild else None
+        if isinstance(channel, discord.TextChannel):
+            try:
+                message = await channel.fetch_message(row["archive_message_id"])
+                await message.delete()
+            except discord.NotFound:
+                pass
+            except discord.HTTPException as exc:
+                log.warning("No se pudo purgar el expediente #%s: %s", row["case_id"], exc)
+                return
+        await asyncio.to_thread(db.clear_support_archive, row["case_id"])
 
     @cleanup_expired_archives.before_loop
     async def before_cleanup_expired_archives(self):
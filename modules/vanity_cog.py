@@ -12,7 +12,7 @@ import discord
 from discord import ui
 from discord.ext import commands
 
-from command_utils import RestrictedView
+from command_utils import RestrictedView, convert_guild_emojis, get_compiled_embed_text
 from database import (
     add_vanity_code,
     delete_all_vanity,
@@ -20,12 +20,68 @@ from database import (
     get_vanity_settings,
     remove_vanity_code,
     set_vanity_settings,
-    setup_vanity_table,
 )
 from localization import get_language, translate, translate_language
+from role_sync import role_reconciler
 
 log = logging.getLogger("bot")
 
+VANITY_EMBED_FIELDS = frozenset({"user", "role", "vanity", "server"})
+
+
+def custom_status_text(member: discord.Member) -> str:
+    """Devuelve el texto del estado personalizado en minúsculas, o cadena vacía."""
+    return "\n".join(
+        activity.name.lower()
+        for activity in member.activities
+        if isinstance(activity, discord.CustomActivity) and activity.name
+    )
+
+
+class VanityMatcher:
+    """Buscador compilado con las vanitys de un servidor.
+
+    Una sola pasada del patrón sobre el estado encuentra la vanity con mayor
+    prioridad (el orden de la lista configurada), igual que recorrerlas una a una.
+    """
+
+    def __init__(self, vanity_codes: list[dict]):
+        self.codes: list[tuple[str, int]] = []
+        self._priority: dict[str, int] = {}
+        self.code_for_role: dict[int, str] = {}
+        for item in vanity_codes:
+            # Todo rol configurado se gestiona, aunque su vanity ya esté en el patrón.
+            self.code_for_role.setdefault(item["role_id"], item["vanity_code"])
+            code = item["vanity_code"].lower()
+            if not code or code in self._priority:
+                continue
+            self._priority[code] = len(self.codes)
+            self.codes.append((item["vanity_code"], item["role_id"]))
+        self.role_ids = frozenset(self.code_for_role)
+
+        self._pattern = None
+        if self.codes:
+            # El lookahead permite coincidencias solapadas; en cada posición se
+            # prueba primero la vanity de mayor prioridad.
+            alternation = "|".join(re.escape(code) for code in self._priority)
+            self._pattern = re.compile(f"(?=({alternation}))")
+
+    def match(self, status_text: str) -> tuple[str | None, int | None]:
+        """Retorna (vanity_code, role_id) de la primera vanity presente en el texto."""
+        if self._pattern is None or not status_text:
+            return None, None
+
+        best = None
+        for found in self._pattern.finditer(status_text):
+            priority = self._priority[found.group(1)]
+            if best is None or priority < best:
+                best = priority
+                if best == 0:
+                    break
+        if best is None:
+            return None, None
+        return self.codes[best]
+
 
 class EmbedEditorModal(ui.Modal):
     """Modal para editar el embed."""
@@ -88,7 +144,6 @@ class VanityCog(commands.Cog):
 
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        setup_vanity_table()
         self._settings_cache = {}
         self._codes_cache = {}
         self._cache_ttl_sec = 30.0
@@ -107,9 +162,16 @@ class VanityCog(commands.Cog):
         self._settings_cache[guild_id] = {
             "expires_at": now + self._cache_ttl_sec,
             "value": settings,
+            # Las plantillas se validan contra su texto de origen, así que
+            # sobreviven a la expiración del TTL pero no a una invalidación.
+            "templates": cached["templates"] if cached else {},
         }
         return dict(settings)
 
+    def _get_embed_templates(self, guild_id: int) -> dict:
+        cached = self._settings_cache.get(guild_id)
+        return cached["templates"] if cached else {}
+
     def _get_codes_cached(self, guild_id: int) -> list:
         now = time.monotonic()
         cached = self._codes_cache.get(guild_id)
@@ -121,9 +183,24 @@ class VanityCog(commands.Cog):
         self._codes_cache[guild_id] = {
             "expires_at": now + self._cache_ttl_sec,
             "value": normalized,
+            "matcher": VanityMatcher(normalized),
         }
         return [dict(item) for item in normalized]
 
+    def _peek_matcher(self, guild_id: int) -> VanityMatcher | None:
+        """Devuelve el matcher en caché sin tocar la base de datos."""
+        cached = self._codes_cache.get(guild_id)
+        if cached and time.monotonic() < cached["expires_at"]:
+            return cached["matcher"]
+        return None
+
+    def _get_matcher_cached(self, guild_id: int) -> VanityMatcher:
+        matcher = self._peek_matcher(guild_id)
+        if matcher is None:
+            self._get_codes_cached(guild_id)
+            matcher = self._codes_cache[guild_id]["matcher"]
+        return matcher
+
     def _refresh_guild_cache(self, guild_id: int):
         self._invalidate_guild_cache(guild_id)
         self._get_settings_cached(guild_id)
@@ -131,79 +208,63 @@ class VanityCog(commands.Cog):
 
     def convert_emojis(self, text: str, guild: discord.Guild) -> str:
         """Convierte :emoji: al formato <:emoji:id> automáticamente."""
-        # Busca patrones :nombre: que no sean ya formato completo
-        pattern = r":([a-zA-Z0-9_]+):"
-
-        def replace_emoji(match):
-            emoji_name = match.group(1)
-            # Buscar el emoji en el servidor
-            for emoji in guild.emojis:
-                if emoji.name.lower() == emoji_name.lower():
-                    if emoji.animated:
-                        return f"<a:{emoji.name}:{emoji.id}>"
-                    else:
-                        return f"<:{emoji.name}:{emoji.id}>"
-            # Si no lo encuentra, dejarlo como está
-            return match.group(0)
-
-        return re.sub(pattern, replace_emoji, text)
-
-    def check_vanity(self, member: discord.Member, vanity_code: str) -> bool:
-        """Revisa si el usuario tiene la vanity en su estado."""
-        for activity in member.activities:
-            if (
-                isinstance(activity, discord.CustomActivity)
-                and activity.name
-                and vanity_code.lower() in activity.name.lower()
-            ):
-                return True
-        return False
-
-    def get_matching_vanity(self, member: discord.Member, vanity_codes: list) -> tuple:
-        """Retorna (vanity_code, role_id) si el usuario tiene alguna vanity."""
-        for vc in vanity_codes:
-            if self.check_vanity(member, vc["vanity_code"]):
-                return vc["vanity_code"], vc["role_id"]
-        return None, None
+        return convert_guild_emojis(text, guild)
 
     def build_embed(
         self, settings: dict, member: discord.Member, vanity: str, role: discord.Role, is_add: bool
     ) -> discord.Embed:
-        """Construye el embed personalizado."""
+        """Construye el embed personalizado a partir de la plantilla compilada."""
+        language = get_language(member)
         if is_add:
-            title = settings.get("embed_title") or translate(member, "vanity.default_add_title")
-            desc = settings.get("embed_description") or translate(
-                member,
-                "vanity.default_add_description",
-                user="{user}",
-                vanity="{vanity}",
-                role="{role}",
+            compiled = get_compiled_embed_text(
+                self._get_embed_templates(member.guild.id),
+                ("add", language),
+                member.guild,
+                title=settings.get("embed_title"),
+                description=settings.get("embed_description"),
+                fields=VANITY_EMBED_FIELDS,
+                defaults=lambda: (
+                    translate_language(language, "vanity.default_add_title"),
+                    translate_language(
+                        language,
+                        "vanity.default_add_description",
+                        user="{user}",
+                        vanity="{vanity}",
+                        role="{role}",
+                    ),
+                ),
             )
             color = settings.get("embed_color", 0x57F287)
         else:
-            title = settings.get("remove_title") or translate(member, "vanity.default_remove_title")
-            desc = settings.get("remove_description") or translate(
-                member,
-                "vanity.default_remove_description",
-                user="{user}",
-                vanity="{vanity}",
+            compiled = get_compiled_embed_text(
+                self._get_embed_templates(member.guild.id),
+                ("remove", language),
+                member.guild,
+                title=settings.get("remove_title"),
+                description=settings.get("remove_description"),
+                fields=VANITY_EMBED_FIELDS,
+                defaults=lambda: (
+                    translate_language(language, "vanity.default_remove_title"),
+                    translate_language(
+                        language,
+                        "vanity.default_remove_description",
+                        user="{user}",
+                        vanity="{vanity}",
+                    ),
+                ),
             )
             color = settings.get("remove_color", 0xED4245)
 
-        # Reemplazar variables
-        desc = desc.replace("{user}", member.mention)
-        desc = desc.replace(
-            "{role}",
-            role.mention if role else translate(member, "clantag.role_field").lower(),
+        desc = compiled.description.render(
+            {
+                "user": member.mention,
+                "role": role.mention if role else translate_language(language, "clantag.role_field").lower(),
+                "vanity": vanity,
+                "server": member.guild.name,
+            }
         )
-        desc = desc.replace("{vanity}", vanity)
-        desc = desc.replace("{server}", member.guild.name)
 
-        # Convertir :emoji: a formato completo
-        title = self.convert_emojis(title, member.guild)
-        desc = self.convert_emojis(desc, member.guild)
-
-        embed = discord.Embed(title=title, description=desc, color=color)
+        embed = discord.Embed(title=compiled.title, description=desc, color=color)
         embed.set_thumbnail(url=member.display_avatar.url)
         embed.timestamp = discord.utils.utcnow()
 
@@ -225,35 +286,38 @@ class VanityCog(commands.Cog):
         if after.status == discord.Status.offline:
             return
 
-        vanity_codes = await asyncio.to_thread(self._get_codes_cached, after.guild.id)
-        if not vanity_codes:
+        matcher = self._peek_matcher(after.guild.id)
+        if matcher is None:
+            matcher = await asyncio.to_thread(self._get_matcher_cached, after.guild.id)
+        if not matcher.codes:
             return
 
-        settings = await asyncio.to_thread(self._get_settings_cached, after.guild.id)
-        channel_id = settings.get("channel_id")
-        channel = after.guild.get_channel(channel_id) if channel_id else None
-
         # Ver qué vanity tiene (si alguna)
-        matched_vanity, matched_role_id = self.get_matching_vanity(after, vanity_codes)
+        matched_vanity, matched_role_id = matcher.match(custom_status_text(after))
 
         # Roles de vanity que tiene actualmente
-        vanity_role_ids = {vc["role_id"] for vc in vanity_codes}
-        current_vanity_roles = [r for r in after.roles if r.id in vanity_role_ids]
+        current_vanity_roles = [r for r in after.roles if r.id in matcher.role_ids]
+        if not matched_vanity and not current_vanity_roles:
+            return
+        if matched_vanity and [r.id for r in current_vanity_roles] == [matched_role_id]:
+            return
+
+        settings = await asyncio.to_thread(self._get_settings_cached, after.guild.id)
+        channel_id = settings.get("channel_id")
+        channel = after.guild.get_channel(channel_id) if channel_id else None
 
         if matched_vanity:
             # Tiene una vanity → asegurar que tenga el rol correcto
             role = after.guild.get_role(matched_role_id)
             if role:
                 try:
-                    stale_roles = [
-                        old_role for old_role in current_vanity_roles if old_role.id != matched_role_id
-                    ]
-                    if stale_roles:
-                        await after.remove_roles(*stale_roles, reason="Cambió de vanity")
-
                     role_was_added = role not in after.roles
-                    if role_was_added:
-                        await after.add_roles(role, reason=f"Vanity: {matched_vanity}")
+                    await role_reconciler.reconcile(
+                        after,
+                        desired=[role],
+                        managed=current_vanity_roles,
+                        reason=f"Vanity: {matched_vanity}",
+                    )
 
                     if role_was_added and channel:
                         embed = self.build_embed(settings, after, matched_vanity, role, is_add=True)
@@ -273,35 +337,35 @@ class VanityCog(commands.Cog):
                     )
         else:
             # No tiene ninguna vanity → quitar roles de vanity
-            for role in current_vanity_roles:
-                try:
-                    vanity_for_role = next(
-                        (vc["vanity_code"] for vc in vanity_codes if vc["role_id"] == role.id), "vanity"
-                    )
-                    await after.remove_roles(role, reason="Vanity removida")
-
-                    # Enviar embed de removido si está habilitado
-                    if settings.get("remove_enabled"):
-                        remove_channel_id = settings.get("remove_channel_id")
-                        remove_channel = (
-                            after.guild.get_channel(remove_channel_id) if remove_channel_id else None
-                        )
-                        if remove_channel:
-                            embed = self.build_embed(settings, after, vanity_for_role, role, is_add=False)
-                            await remove_channel.send(embed=embed)
-                except discord.Forbidden:
-                    log.warning(
-                        "No pude retirar un rol de vanity en guild=%s member=%s.",
-                        after.guild.id,
-                        after.id,
-                    )
-                except discord.HTTPException as exc:
-                    log.warning(
-                        "Discord rechazó el retiro de vanity en guild=%s member=%s: %s",
-                        after.guild.id,
-                        after.id,
-                        exc,
-                    )
+            try:
+                await role_reconciler.reconcile(
+                    after,
+                    desired=[],
+                    managed=current_vanity_roles,
+                    reason="Vanity removida",
+                )
+
+                # Enviar embed de removido si está habilitado
+                remove_channel_id = settings.get("remove_channel_id")
+                remove_channel = after.guild.get_channel(remove_channel_id) if remove_channel_id else None
+                if settings.get("remove_enabled") and remove_channel:
+                    for role in current_vanity_roles:
+                        vanity_for_role = matcher.code_for_role.get(role.id, "vanity")
+                        embed = self.build_embed(settings, after, vanity_for_role, role, is_add=False)
+                        await remove_channel.send(embed=embed)
+            except discord.Forbidden:
+                log.warning(
+                    "No pude retirar un rol de vanity en guild=%s member=%s.",
+                    after.guild.id,
+                    after.id,
+                )
+            except discord.HTTPException as exc:
+                log.warning(
+                    "Discord rechazó el retiro de vanity en guild=%s member=%s: %s",
+                    after.guild.id,
+                    after.id,
+                    exc,
+                )
 
     # ══════════════════════════════════════════════════════════
     # COMANDOS PRINCIPALES
@@ -469,13 +533,13 @@ class VanityCog(commands.Cog):
         for vc in vanity_codes:
             results[vc["vanity_code"]] = []
 
+        matcher = self._get_matcher_cached(ctx.guild.id)
         for member in ctx.guild.members:
             if member.bot:
                 continue
-            for vc in vanity_codes:
-                if self.check_vanity(member, vc["vanity_code"]):
-                    results[vc["vanity_code"]].append(member)
-                    break
+            matched_vanity, _ = matcher.match(custom_status_text(member))
+            if matched_vanity:
+                results[matched_vanity].append(member)
 
         embed = discord.Embed(title=translate(ctx, "vanity.list_title"), color=0x5865F2)
 
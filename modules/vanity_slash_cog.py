@@ -7,7 +7,7 @@ from discord.ext import commands
 from command_utils import RestrictedView
 from database import add_vanity_code, delete_all_vanity, remove_vanity_code, set_vanity_settings
 from localization import get_language, translate, translate_language
-from modules.vanity_cog import VanityCog
+from modules.vanity_cog import VanityCog, custom_status_text
 
 
 class ConfirmResetView(RestrictedView):
@@ -294,13 +294,13 @@ class VanitySlashCog(commands.Cog):
             return
 
         results = {item["vanity_code"]: [] for item in vanity_codes}
+        matcher = cog._get_matcher_cached(interaction.guild.id)
         for member in interaction.guild.members:
             if member.bot:
                 continue
-            for item in vanity_codes:
-                if cog.check_vanity(member, item["vanity_code"]):
-                    results[item["vanity_code"]].append(member)
-                    break
+            matched_vanity, _ = matcher.match(custom_status_text(member))
+            if matched_vanity:
+                results[matched_vanity].append(member)
 
         embed = discord.Embed(title=translate(interaction, "vanity.list_title"), color=0x5865F2)
         total = 0
@@ -0,0 +1,248 @@
+"""Reconciliación de roles por miembro compartida entre módulos.
+
+Vanity, Clan Tag y LFG declaran qué roles de su ámbito debe tener un miembro.
+Las declaraciones que llegan dentro de una ventana corta se combinan y se
+aplican con un único ``member.edit(roles=...)`` en lugar de varias llamadas
+``add_roles``/``remove_roles``.
+
+Ese PATCH envía la lista completa de roles, así que un rol que otro bot o un
+moderador cambie entre la lectura de la caché y la petición se revertiría. Para
+acotar esa ventana, la lista se recalcula desde ``guild.get_member()`` justo
+antes del PATCH, después de la espera del bucket; solo cambian los roles que
+declaró algún módulo.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import Iterable
+from typing import Any
+
+import discord
+
+ROLE_BATCH_WINDOW_SEC = 0.35
+GUILD_BUCKET_CAPACITY = 10
+GUILD_BUCKET_REFILL_PER_SEC = 1.0
+
+
+class GuildRateBucket:
+    """Token bucket local por servidor para espaciar los PATCH de miembros.
+
+    discord.py ya respeta los 429 de Discord; este bucket evita llegar a ellos
+    cuando un servidor recibe ráfagas de cambios de presencia.
+    """
+
+    def __init__(self, capacity: int, refill_per_sec: float):
+        self.capacity = capacity
+        self.refill_per_sec = refill_per_sec
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+
+    def reserve(self) -> float:
+        """Consume un token y devuelve cuántos segundos hay que esperar."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_per_sec)
+        self.updated_at = now
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.refill_per_sec
+
+
+class _PendingChange:
+    def __init__(self, member: discord.Member):
+        self.member = member
+        self.changes: dict[int, bool] = {}
+        self.roles: dict[int, discord.Role] = {}
+        self.reasons: list[str] = []
+        self.naive_calls = 0
+        self.waiters: list[asyncio.Future] = []
+
+
+class RoleReconciler:
+    """Combina los cambios de roles pendientes de cada miembro."""
+
+    def __init__(
+        self,
+        *,
+        window: float = ROLE_BATCH_WINDOW_SEC,
+        bucket_capacity: int = GUILD_BUCKET_CAPACITY,
+        bucket_refill_per_sec: float = GUILD_BUCKET_REFILL_PER_SEC,
+    ):
+        self.window = window
+        self.bucket_capacity = bucket_capacity
+        self.bucket_refill_per_sec = bucket_refill_per_sec
+        self._pending: dict[tuple[int, int], _PendingChange] = {}
+        self._buckets: dict[int, GuildRateBucket] = {}
+        self._flush_tasks: set[asyncio.Task] = set()
+        self._stats = self._empty_stats()
+
+    @staticmethod
+    def _empty_stats() -> dict[str, Any]:
+        return {
+            "requests": 0,
+            "coalesced_requests": 0,
+            "rest_calls": 0,
+            "rest_calls_saved": 0,
+            "noop_flushes": 0,
+            "rate_limit_waits": 0,
+            "rate_limit_wait_sec": 0.0,
+            "http_429": 0,
+            "errors": 0,
+        }
+
+    def _bucket(self, guild_id: int) -> GuildRateBucket:
+        bucket = self._buckets.get(guild_id)
+        if bucket is None:
+            bucket = GuildRateBucket(self.bucket_capacity, self.bucket_refill_per_sec)
+            self._buckets[guild_id] = bucket
+        return bucket
+
+    async def reconcile(
+        self,
+        member: discord.Member,
+        *,
+        desired: Iterable[discord.Role],
+        managed: Iterable[discord.Role],
+        reason: str,
+    ) -> None:
+        """Declara qué roles de ``managed`` debe tener el miembro.
+
+        Los roles de ``desired`` se añaden y el resto de ``managed`` se retira.
+        La corrutina termina cuando el cambio combinado se ha aplicado y
+        propaga ``discord.HTTPException`` si Discord lo rechaza.
+        """
+        desired_roles = {role.id: role for role in desired}
+        managed_roles = {role.id: role for role in managed}
+        managed_roles.update(desired_roles)
+
+        current_ids = {role.id for role in member.roles}
+        needs_add = any(role_id not in current_ids for role_id in desired_roles)
+        needs_remove = any(
+            role_id in current_ids for role_id in managed_roles if role_id not in desired_roles
+        )
+
+        key = (member.guild.id, member.id)
+        pending = self._pending.get(key)
+        self._stats["requests"] += 1
+        if pending is None and not (needs_add or needs_remove):
+            return
+
+        if pending is None:
+            pending = _PendingChange(member)
+            self._pending[key] = pending
+            task = asyncio.create_task(self._flush_later(key, pending), name=f"role-sync-{key[0]}-{key[1]}")
+            self._flush_tasks.add(task)
+            task.add_done_callback(self._flush_tasks.discard)
+        else:
+            self._stats["coalesced_requests"] += 1
+            pending.member = member
+
+        for role_id, role in managed_roles.items():
+            pending.changes[role_id] = role_id in desired_roles
+            pending.roles[role_id] = role
+        pending.reasons.append(reason)
+        pending.naive_calls += int(needs_add) + int(needs_remove)
+
+        waiter = asyncio.get_running_loop().create_future()
+        pending.waiters.append(waiter)
+        await waiter
+
+    async def _flush_later(self, key: tuple[int, int], pending: _PendingChange) -> None:
+        error: BaseException | None = None
+        try:
+            await asyncio.sleep(self.window)
+            # Lo que se declare a partir de aquí abre otro lote.
+            self._pending.pop(key, None)
+            await self._apply(pending)
+        except asyncio.CancelledError as exc:
+            error = exc
+            raise
+        except Exception as exc:
+            error = exc
+        finally:
+            if self._pending.get(key) is pending:
+                del self._pending[key]
+            self._release(pending, error)
+
+    @staticmethod
+    def _release(pending: _PendingChange, error: BaseException | None) -> None:
+        # Ningún ``reconcile`` se queda esperando, ni siquiera si se cancela el lote.
+        for waiter in pending.waiters:
+            if waiter.done():
+                continue
+            if error is None:
+                waiter.set_result(None)
+            elif isinstance(error, asyncio.CancelledError):
+                waiter.cancel()
+            else:
+                waiter.set_exception(error)
+
+    @staticmethod
+    def _target_roles(
+        pending: _PendingChange,
+    ) -> tuple[discord.Member, dict[int, discord.Role], dict[int, discord.Role]]:
+        """Miembro más reciente de la caché, sus roles y los que debe tener."""
+        member = pending.member
+        fresh = member.guild.get_member(member.id) or member
+        current = {role.id: role for role in fresh.roles if not role.is_default()}
+        target = dict(current)
+        for role_id, wanted in pending.changes.items():
+            if wanted:
+                target[role_id] = pending.roles[role_id]
+            else:
+                target.pop(role_id, None)
+        return fresh, current, target
+
+    async def _apply(self, pending: _PendingChange) -> None:
+        fresh, current, target = self._target_roles(pending)
+        if target.keys() != current.keys():
+            wait_sec = self._bucket(fresh.guild.id).reserve()
+            if wait_sec > 0:
+                self._stats["rate_limit_waits"] += 1
+                self._stats["rate_limit_wait_sec"] += wait_sec
+                await asyncio.sleep(wait_sec)
+                # Durante la espera otros pudieron cambiar roles del miembro.
+                fresh, current, target = self._target_roles(pending)
+
+        if target.keys() == current.keys():
+            self._stats["noop_flushes"] += 1
+            self._stats["rest_calls_saved"] += pending.naive_calls
+            return
+
+        reason = " | ".join(dict.fromkeys(pending.reasons))[:512]
+        try:
+            await fresh.edit(roles=list(target.values()), reason=reason)
+        except discord.HTTPException as exc:
+            self._stats["errors"] += 1
+            if exc.status == 429:
+                self._stats["http_429"] += 1
+            raise
+        finally:
+            self._stats["rest_calls"] += 1
+        self._stats["rest_calls_saved"] += max(pending.naive_calls - 1, 0)
+
+    async def close(self) -> None:
+        """Cancela los lotes pendientes; sus ``reconcile`` terminan con ``CancelledError``."""
+        tasks = list(self._flush_tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # Una tarea cancelada antes de empezar no llega a su ``finally``.
+        pending, self._pending = list(self._pending.values()), {}
+        for change in pending:
+            self._release(change, asyncio.CancelledError())
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            **self._stats,
+            "pending_members": len(self._pending),
+            "tracked_guilds": len(self._buckets),
+        }
+
+    def reset_stats(self) -> None:
+        self._stats = self._empty_stats()
+
+
+role_reconciler = RoleReconciler()
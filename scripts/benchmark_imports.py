@@ -0,0 +1,74 @@
+"""Mide el tiempo de import de cada extensión con ``python -X importtime``.
+
+Cada extensión se importa en un proceso nuevo después de discord.py y de los
+módulos compartidos del bot, así que el tiempo mostrado es lo que añade ella.
+
+Uso: ``python -m scripts.benchmark_imports`` desde la raíz del proyecto.
+"""
+
+import re
+import subprocess
+import sys
+from argparse import ArgumentParser
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+BASELINE = "import discord.ext.commands, database, localization, command_utils, role_sync, lazy"
+MARKER = "-- base --"
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| \s*(\S+)$")
+# Módulos que solo deben importarse cuando se usan.
+LAZY_MODULES = ("PIL.Image", "PIL.ImageOps", "zipfile")
+
+
+def import_times(*modules: str) -> dict[str, tuple[int, int]]:
+    """Devuelve ``{módulo: (propio_µs, acumulado_µs)}`` de lo importado tras la línea base."""
+    statement = f"{BASELINE}; import sys; sys.stderr.write({MARKER!r} + '\\n'); import " + ", ".join(modules)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=BASE_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times: dict[str, tuple[int, int]] = {}
+    _, _, imported = result.stderr.partition(MARKER)
+    for line in imported.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match is not None:
+            times[match[3]] = (int(match[1]), int(match[2]))
+    return times
+
+
+def extension_names() -> list[str]:
+    names = []
+    for package in ("modules", "admin_modules"):
+        for path in sorted((BASE_DIR / package).glob("*.py")):
+            if not path.name.startswith("__"):
+                names.append(f"{package}.{path.stem}")
+    return names
+
+
+def run(limit: int) -> None:
+    rows = []
+    for name in extension_names():
+        times = import_times(name)
+        cumulative = times.get(name, (0, 0))[1]
+        heavy = [module for module in LAZY_MODULES if module in times]
+        rows.append((cumulative, name, heavy))
+
+    print(f"{'extensión':<36} | {'import ms':>9} | cargas pesadas")
+    print("-" * 66)
+    for cumulative, name, heavy in sorted(rows, reverse=True)[:limit]:
+        print(f"{name:<36} | {cumulative / 1000:>9.1f} | {', '.join(heavy) or '-'}")
+    print(f"{'total':<36} | {sum(row[0] for row in rows) / 1000:>9.1f} |")
+
+
+def main() -> None:
+    parser = ArgumentParser()
+    parser.add_argument("--limit", type=int, default=30)
+    args = parser.parse_args()
+    run(args.limit)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Compara traducciones por segundo con y sin plantillas precompiladas.
+
+Uso: ``python -m scripts.benchmark_localization`` desde la raíz del proyecto.
+"""
+
+import json
+from argparse import ArgumentParser
+from timeit import Timer
+
+import localization
+from localization import DEFAULT_LANGUAGE, LOCALES_DIR, translate_language
+
+CASES = {
+    "sin variables": ("clantag.list_title", {}),
+    "una variable": ("error.missing_permissions", {"permissions": "Manage Roles"}),
+    "varias variables": ("clantag.list_page", {"page": 2, "pages": 9, "count": 180}),
+}
+
+
+def load_raw_catalogs() -> dict[str, dict[str, str]]:
+    return {
+        language: json.loads((LOCALES_DIR / f"{language}.json").read_text(encoding="utf-8"))
+        for language in sorted(localization.SUPPORTED_LANGUAGES)
+    }
+
+
+def legacy_translate(catalogs: dict[str, dict[str, str]], lang: str, key: str, **values) -> str:
+    """Ruta anterior: búsqueda y ``str.format`` en cada llamada."""
+    template = catalogs.get(lang, {}).get(key)
+    if template is None:
+        template = catalogs[DEFAULT_LANGUAGE].get(key, key)
+    return template.format(**values)
+
+
+def legacy_catalog_keys(catalogs: dict[str, dict[str, str]], language: str) -> frozenset[str]:
+    return frozenset(catalogs.get(language, {}))
+
+
+def run(number: int) -> None:
+    localization.load_catalogs()
+    raw = load_raw_catalogs()
+    print(f"{'caso':<18} | {'anterior /s':>12} | {'compilado /s':>13}")
+    print("-" * 50)
+    for label, (key, values) in CASES.items():
+        legacy = Timer(lambda k=key, v=values: legacy_translate(raw, "es", k, **v)).timeit(number)
+        compiled = Timer(lambda k=key, v=values: translate_language("es", k, **v)).timeit(number)
+        print(f"{label:<18} | {number / legacy:>12,.0f} | {number / compiled:>13,.0f}")
+
+    legacy = Timer(lambda: legacy_catalog_keys(raw, "es")).timeit(number // 10)
+    cached = Timer(lambda: localization.catalog_keys("es")).timeit(number // 10)
+    print(f"{'catalog_keys':<18} | {number // 10 / legacy:>12,.0f} | {number // 10 / cached:>13,.0f}")
+
+
+def main() -> None:
+    parser = ArgumentParser()
+    parser.add_argument("--number", type=int, default=200_000)
+    args = parser.parse_args()
+    run(args.number)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""Mide las consultas frecuentes de ``database`` sobre una base sembrada.
+
+Compara cada consulta con y sin los índices de la migración 4.
+
+Uso: ``python -m scripts.benchmark_queries --guilds 10000`` desde la raíz del proyecto.
+"""
+
+import random
+import sqlite3
+import tempfile
+from argparse import ArgumentParser
+from collections.abc import Callable
+from contextlib import closing
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from timeit import Timer
+
+import database as db
+
+GUILD_ID_BASE = 1_000_000
+BASE_TIME = datetime(2026, 1, 1, tzinfo=UTC)
+
+
+def _iso(moment: datetime) -> str:
+    return moment.isoformat(timespec="seconds")
+
+
+def seed_database(conn: sqlite3.Connection, guild_count: int, *, seed: int = 1) -> list[int]:
+    """Rellena todas las tablas con ``guild_count`` servidores y devuelve sus IDs."""
+    rng = random.Random(seed)
+    guild_ids = [GUILD_ID_BASE + index for index in range(guild_count)]
+    rows: dict[str, list[tuple]] = {name: [] for name in db.GUILD_OWNED_TABLES}
+    case_id = 0
+    for index, guild_id in enumerate(guild_ids):
+        channel = guild_id * 100
+        rows["guilds"].append((guild_id, f"Servidor {index}"))
+        rows["guild_languages"].append((guild_id, rng.choice(("auto", "en", "es"))))
+        rows["thread_configs"].extend((channel + slot, guild_id, "all") for slot in range(2))
+        rows["counting_channels"].append((channel + 10, guild_id, rng.randrange(500), 0, rng.randrange(900)))
+        rows["auto_reactions"].extend((guild_id, f"palabra{slot}", '["👍"]', 0) for slot in range(3))
+        rows["boost_roles"].extend((channel + 20 + slot, guild_id, slot % 2) for slot in range(2))
+        rows["boost_logs"].append((guild_id, channel + 30))
+        rows["vanity_settings"].append((guild_id, channel + 40))
+        rows["vanity_codes"].extend(
+            (guild_id, f"discord.gg/s{index}v{slot}", channel + 41) for slot in range(3)
+        )
+        rows["clantag_settings"].append((guild_id, channel + 50, channel + 51))
+        retention_days = rng.randint(1, 90)
+        rows["support_settings"].append((guild_id, channel + 60, channel + 61, channel + 62, retention_days))
+        for slot in range(5):
+            case_id += 1
+            created = BASE_TIME + timedelta(days=rng.randrange(180))
+            closed_at = created + timedelta(hours=rng.randrange(1, 72))
+            closed = slot < 4
+            rows["support_cases"].append(
+                (
+                    case_id,
+                    guild_id,
+                    channel + 70 + slot,
+                    guild_id * 10 + slot,
+                    "Caso",
+                    "closed" if closed else "open",
+                    channel + 60 if closed else None,
+                    case_id if closed else None,
+                    _iso(created),
+                    _iso(closed_at) if closed else None,
+                    _iso(closed_at + timedelta(days=retention_days)) if closed else None,
+                )
+            )
+        rows["lfg_settings"].append((guild_id, channel + 80, None))
+        rows["lfg_games"].extend(
+            (index * 3 + slot + 1, guild_id, f"Juego {slot}", f"Juego {slot}", channel + 81 + slot)
+            for slot in range(3)
+        )
+        rows["lfg_enrollments"].extend(
+            (guild_id, guild_id * 10 + user, _iso(BASE_TIME)) for user in range(20)
+        )
+        rows["lfg_assignments"].extend(
+            (
+                guild_id,
+                guild_id * 10 + user,
+                index * 3 + user % 3 + 1,
+                channel + 81 + user % 3,
+                _iso(BASE_TIME),
+            )
+            for user in range(5)
+        )
+
+    columns = {
+        "guilds": "guild_id, guild_name",
+        "guild_languages": "guild_id, language_mode",
+        "thread_configs": "channel_id, guild_id, mode",
+        "counting_channels": "channel_id, guild_id, current_number, last_user_id, high_score",
+        "auto_reactions": "guild_id, trigger_word, emojis, case_sensitive",
+        "boost_roles": "role_id, guild_id, linked_to_boost",
+        "boost_logs": "guild_id, channel_id",
+        "vanity_settings": "guild_id, channel_id",
+        "vanity_codes": "guild_id, vanity_code, role_id",
+        "clantag_settings": "guild_id, role_id, channel_id",
+        "support_settings": "guild_id, archive_channel_id, category_id, support_role_id, retention_days",
+        "support_cases": (
+            "case_id, guild_id, channel_id, opener_id, subject, status, "
+            "archive_channel_id, archive_message_id, created_at, closed_at, purge_after"
+        ),
+        "lfg_settings": "guild_id, dashboard_channel_id, dashboard_message_id",
+        "lfg_games": "game_id, guild_id, activity_name, display_name, role_id",
+        "lfg_enrollments": "guild_id, user_id, enrolled_at",
+        "lfg_assignments": "guild_id, user_id, game_id, role_id, assigned_at",
+    }
+    with conn:
+        for table_name, table_columns in columns.items():
+            placeholders = ", ".join("?" for _ in table_columns.split(","))
+            conn.executemany(
+                f"INSERT INTO {table_name} ({table_columns}) VALUES ({placeholders})",
+                rows[table_name],
+            )
+        conn.executemany(
+            "INSERT INTO bot_presence_presets (name, activity_type, status, activity_text, is_active) "
+            "VALUES (?, 'custom', 'online', ?, ?)",
+            [(f"Preset{slot}", f"Estado {slot}", int(slot == 0)) for slot in range(50)],
+        )
+    return guild_ids
+
+
+def drop_hot_indexes(conn: sqlite3.Connection) -> None:
+    """Deja los índices como estaban antes de la migración 4."""
+    with conn:
+        conn.execute("DROP INDEX IF EXISTS idx_vanity_codes_guild_cover")
+        conn.execute("DROP INDEX IF EXISTS idx_lfg_assignments_guild_game")
+        conn.execute("DROP INDEX IF EXISTS idx_presence_presets_lower_name")
+        conn.execute("DROP INDEX IF EXISTS idx_presence_presets_active")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_lfg_assignments_guild_id ON lfg_assignments(guild_id)")
+
+
+def hot_calls(guild_ids: list[int], rng: random.Random) -> dict[str, Callable[[], object]]:
+    def guild() -> int:
+        return rng.choice(guild_ids)
+
+    return {
+        "get_vanity_codes": lambda: db.get_vanity_codes(guild()),
+        "is_lfg_enrolled": lambda: db.is_lfg_enrolled(guild(), guild() * 10 + 3),
+        "get_lfg_enrollments": lambda: db.get_lfg_enrollments(guild()),
+        "get_lfg_assignments": lambda: db.get_lfg_assignments(guild()),
+        "get_open_support_case_for_user": lambda: db.get_open_support_case_for_user(
+            guild(), guild() * 10 + 4
+        ),
+        "get_expired_support_archives": lambda: db.get_expired_support_archives("2026-03-01T00:00:00+00:00"),
+        "get_bot_presence_preset": lambda: db.get_bot_presence_preset(f"preset{rng.randrange(50)}"),
+        "get_active_bot_presence_preset": db.get_active_bot_presence_preset,
+    }
+
+
+def measure(guild_ids: list[int], number: int) -> dict[str, float]:
+    results = {}
+    for name, call in hot_calls(guild_ids, random.Random(7)).items():
+        runs = max(number // 50, 1) if name == "get_expired_support_archives" else number
+        results[name] = Timer(call).timeit(runs) / runs * 1e6
+    return results
+
+
+def run(guild_count: int, number: int) -> None:
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db.DB_FILE = str(Path(temp_dir) / "benchmark.db")
+        db.setup_database()
+        with closing(db.get_db_connection()) as conn:
+            guild_ids = seed_database(conn, guild_count)
+            conn.execute("ANALYZE")
+        indexed = measure(guild_ids, number)
+
+        with closing(db.get_db_connection()) as conn:
+            drop_hot_indexes(conn)
+            conn.execute("ANALYZE")
+        db.query_registry.close_all()
+        baseline = measure(guild_ids, number)
+        db.query_registry.close_all()
+
+    print(f"{guild_count} servidores sembrados")
+    print(f"{'consulta':<32} | {'sin v4 µs':>10} | {'con v4 µs':>10}")
+    print("-" * 58)
+    for name, value in indexed.items():
+        print(f"{name:<32} | {baseline[name]:>10.1f} | {value:>10.1f}")
+
+
+def main() -> None:
+    parser = ArgumentParser()
+    parser.add_argument("--guilds", type=int, default=10_000)
+    parser.add_argument("--number", type=int, default=2_000)
+    args = parser.parse_args()
+    run(args.guilds, args.number)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Mide el coste por evento de presencia del matcher de vanitys.
+
+Uso: ``python -m scripts.benchmark_vanity_matcher`` desde la raíz del proyecto.
+"""
+
+from argparse import ArgumentParser
+from timeit import Timer
+from types import SimpleNamespace
+
+import discord
+
+from modules.vanity_cog import VanityMatcher, custom_status_text
+
+
+def legacy_match(member, vanity_codes: list[dict]) -> tuple[str | None, int | None]:
+    """Recorrido anterior: una pasada por vanity y por actividad."""
+    for item in vanity_codes:
+        for activity in member.activities:
+            if (
+                isinstance(activity, discord.CustomActivity)
+                and activity.name
+                and item["vanity_code"].lower() in activity.name.lower()
+            ):
+                return item["vanity_code"], item["role_id"]
+    return None, None
+
+
+def build_codes(count: int) -> list[dict]:
+    return [{"vanity_code": f"discord.gg/server{index:03d}", "role_id": index} for index in range(count)]
+
+
+def run(counts: list[int], number: int) -> None:
+    members = {
+        "sin vanity": SimpleNamespace(activities=(discord.CustomActivity(name="Jugando con amigos"),)),
+        "última vanity": None,
+    }
+    print(f"{'códigos':>8} | {'caso':<14} | {'anterior µs':>12} | {'matcher µs':>11}")
+    print("-" * 56)
+    for count in counts:
+        codes = build_codes(count)
+        matcher = VanityMatcher(codes)
+        members["última vanity"] = SimpleNamespace(
+            activities=(discord.CustomActivity(name=f"Únete a discord.gg/server{count - 1:03d} ya"),)
+        )
+        for label, member in members.items():
+            legacy = Timer(lambda m=member, c=codes: legacy_match(m, c)).timeit(number)
+            compiled = Timer(lambda m=member, v=matcher: v.match(custom_status_text(m))).timeit(number)
+            print(
+                f"{count:>8} | {label:<14} | {legacy / number * 1e6:>12.2f} | {compiled / number * 1e6:>11.2f}"
+            )
+
+
+def main() -> None:
+    parser = ArgumentParser()
+    parser.add_argument("--counts", type=int, nargs="+", default=[1, 10, 25, 50, 100])
+    parser.add_argument("--number", type=int, default=20_000)
+    args = parser.parse_args()
+    run(args.counts, args.number)
+
+
+if __name__ == "__main__":
+    main()
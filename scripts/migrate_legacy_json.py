@@ -1,58 +1,36 @@
-"""Migra las configuraciones JSON de versiones antiguas a SQLite."""
+"""Migra las configuraciones JSON de versiones antiguas a SQLite.
+
+La importación forma parte de las migraciones de ``database`` (versión 1); este
+script permite ejecutarla contra otra carpeta o base de datos.
+"""
 
-import json
 import sqlite3
 from argparse import ArgumentParser
 from contextlib import closing
 from pathlib import Path
 
+import database as db
+
 
 def migrate(source_dir: Path, database_file: Path) -> None:
     print("Iniciando migración de JSON a SQLite...")
     database_file.parent.mkdir(parents=True, exist_ok=True)
-    with closing(sqlite3.connect(database_file)) as conn, conn:
-        cursor = conn.cursor()
-
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS guilds (
-            guild_id INTEGER PRIMARY KEY,
-            guild_name TEXT NOT NULL
-        )
-        """)
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS thread_configs (
-            channel_id INTEGER PRIMARY KEY,
-            guild_id INTEGER NOT NULL,
-            mode TEXT NOT NULL
-        )
-        """)
-
-        guilds_file = source_dir / "guilds.json"
-        if guilds_file.exists():
-            guilds_data = json.loads(guilds_file.read_text(encoding="utf-8"))
-            for guild_id, guild_name in guilds_data.items():
-                cursor.execute(
-                    "INSERT OR REPLACE INTO guilds (guild_id, guild_name) VALUES (?, ?)",
-                    (int(guild_id), guild_name),
-                )
-            print(f"✅ Migrados {len(guilds_data)} servidores desde guilds.json.")
-        else:
-            print("ℹ️ No se encontró guilds.json, se omite.")
-
-        threads_file = source_dir / "thread_channels.json"
-        if threads_file.exists():
-            threads_data = json.loads(threads_file.read_text(encoding="utf-8"))
-            count = 0
-            for guild_id, channels in threads_data.items():
-                for channel_id, mode in channels.items():
-                    cursor.execute(
-                        "INSERT OR REPLACE INTO thread_configs (guild_id, channel_id, mode) VALUES (?, ?, ?)",
-                        (int(guild_id), int(channel_id), mode),
-                    )
-                    count += 1
-            print(f"✅ Migradas {count} configuraciones de hilos desde thread_channels.json.")
-        else:
-            print("ℹ️ No se encontró thread_channels.json, se omite.")
+    with closing(sqlite3.connect(database_file)) as conn:
+        conn.row_factory = sqlite3.Row
+        # Sin ``legacy_json_dir`` la v1 no importa la carpeta del bot; los
+        # JSON se importan una sola vez, desde ``source_dir``.
+        db.apply_migrations(conn)
+        with conn:
+            guild_count, thread_count = db.import_legacy_json(conn, source_dir)
+
+    if guild_count is None:
+        print("ℹ️ No se encontró guilds.json, se omite.")
+    else:
+        print(f"✅ Migrados {guild_count} servidores desde guilds.json.")
+    if thread_count is None:
+        print("ℹ️ No se encontró thread_channels.json, se omite.")
+    else:
+        print(f"✅ Migradas {thread_count} configuraciones de hilos desde thread_channels.json.")
 
     print("Migración completada.")
 
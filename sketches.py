@@ -0,0 +1,291 @@
+"""Resúmenes de memoria acotada para métricas que crecen con el uptime.
+
+``LogHistogram`` estima cuantiles con cubetas logarítmicas al estilo HDR o
+DDSketch: cada valor cae en la cubeta ``ceil(log_gamma(v))``, así que el error
+relativo de cualquier cuantil está acotado por ``relative_accuracy`` y el número
+de cubetas por el rango ``[min_value, max_value]``.
+
+``SpaceSaving`` guarda como mucho ``capacity`` claves con sus conteos. Cuando
+llega una clave nueva y no hay hueco, sustituye a la de menor conteo y hereda
+ese conteo como error; las claves frecuentes nunca se pierden y su conteo
+sobreestima el real en, como mucho, ``error``. La de menor conteo sale de un
+montículo que se actualiza de forma perezosa, así que sustituir cuesta
+O(log capacity) amortizado.
+
+``RateTracker`` calcula tasas de 1 min, 5 min o 1 h y medias exponenciales con
+un búfer circular de muestras de contadores acumulados.
+"""
+
+from __future__ import annotations
+
+import bisect
+import heapq
+import itertools
+import math
+import time
+from collections import deque
+from collections.abc import Hashable, Iterable, Mapping
+
+
+class LogHistogram:
+    __slots__ = (
+        "_buckets",
+        "_gamma_log",
+        "count",
+        "max",
+        "max_value",
+        "min",
+        "min_value",
+        "relative_accuracy",
+    )
+
+    def __init__(
+        self, relative_accuracy: float = 0.02, *, min_value: float = 0.001, max_value: float = 3_600_000.0
+    ):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy debe estar entre 0 y 1")
+        self.relative_accuracy = relative_accuracy
+        self.min_value = min_value
+        self.max_value = max_value
+        self._gamma_log = math.log((1 + relative_accuracy) / (1 - relative_accuracy))
+        self._buckets: dict[int, int] = {}
+        self.count = 0
+        self.min = math.inf
+        self.max = 0.0
+
+    @property
+    def max_buckets(self) -> int:
+        """Límite de cubetas en memoria para este rango y precisión."""
+        return self._index(self.max_value) - self._index(self.min_value) + 1
+
+    def _index(self, value: float) -> int:
+        return math.ceil(math.log(value) / self._gamma_log)
+
+    def _estimate(self, index: int) -> float:
+        # Punto de la cubeta con el mismo error relativo a ambos lados.
+        gamma = math.exp(self._gamma_log)
+        return 2 * gamma**index / (gamma + 1)
+
+    def add(self, value: float, count: int = 1) -> None:
+        clamped = min(max(value, self.min_value), self.max_value)
+        index = self._index(clamped)
+        self._buckets[index] = self._buckets.get(index, 0) + count
+        self.count += count
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: LogHistogram) -> None:
+        if other._gamma_log != self._gamma_log:
+            raise ValueError("Solo se pueden combinar histogramas con la misma precisión")
+        for index, count in other._buckets.items():
+            self._buckets[index] = self._buckets.get(index, 0) + count
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> float:
+        return self.quantiles((q,))[0]
+
+    def quantiles(self, qs: Iterable[float]) -> list[float]:
+        """Cuantiles ``qs`` (ordenados o no) con un único recorrido de las cubetas."""
+        qs = list(qs)
+        if not self.count:
+            return [0.0] * len(qs)
+        ranks = sorted((max(math.ceil(q * self.count), 1), position) for position, q in enumerate(qs))
+        results = [0.0] * len(qs)
+        pending = iter(ranks)
+        rank, position = next(pending)
+        seen = 0
+        for index in sorted(self._buckets):
+            seen += self._buckets[index]
+            while seen >= rank:
+                if rank >= self.count:
+                    results[position] = self.max
+                else:
+                    results[position] = min(max(self._estimate(index), self.min), self.max)
+                step = next(pending, None)
+                if step is None:
+                    return results
+                rank, position = step
+        return results
+
+    def difference(self, older: LogHistogram) -> LogHistogram:
+        """Valores añadidos desde ``older``, un estado anterior de este histograma.
+
+        El mínimo y el máximo exactos del intervalo no se conocen, así que se
+        acotan con la estimación de sus cubetas extremas; ``quantile(1.0)`` del
+        intervalo tiene el mismo error relativo que el resto de cuantiles.
+        """
+        delta = LogHistogram(self.relative_accuracy, min_value=self.min_value, max_value=self.max_value)
+        for index, count in self._buckets.items():
+            remaining = count - older._buckets.get(index, 0)
+            if remaining > 0:
+                delta._buckets[index] = remaining
+                delta.count += remaining
+        if delta.count:
+            delta.min = self._estimate(min(delta._buckets))
+            delta.max = self._estimate(max(delta._buckets))
+        return delta
+
+    def clear(self) -> None:
+        self._buckets.clear()
+        self.count = 0
+        self.min = math.inf
+        self.max = 0.0
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class SpaceSaving:
+    """Top de claves más frecuentes en memoria fija (algoritmo Space-Saving)."""
+
+    __slots__ = ("_counts", "_errors", "_heap", "_sequence", "capacity", "total")
+
+    def __init__(self, capacity: int):
+        if capacity < 1:
+            raise ValueError("capacity debe ser al menos 1")
+        self.capacity = capacity
+        self._counts: dict[Hashable, int] = {}
+        self._errors: dict[Hashable, int] = {}
+        # Una entrada ``(conteo, orden, clave)`` por clave vigilada. Los conteos
+        # solo suben, así que una entrada puede quedarse corta pero nunca pasarse.
+        self._heap: list[tuple[int, int, Hashable]] = []
+        self._sequence = itertools.count()
+        self.total = 0
+
+    def add(self, key: Hashable, weight: int = 1) -> None:
+        self.total += weight
+        counts = self._counts
+        if key in counts:
+            counts[key] += weight
+            return
+        if len(counts) < self.capacity:
+            counts[key] = weight
+            self._errors[key] = 0
+            heapq.heappush(self._heap, (weight, next(self._sequence), key))
+            return
+        victim, floor = self._pop_min()
+        del counts[victim]
+        del self._errors[victim]
+        counts[key] = floor + weight
+        self._errors[key] = floor
+        heapq.heappush(self._heap, (floor + weight, next(self._sequence), key))
+
+    def _pop_min(self) -> tuple[Hashable, int]:
+        heap = self._heap
+        while True:
+            count, _, key = heap[0]
+            current = self._counts[key]
+            if current == count:
+                heapq.heappop(heap)
+                return key, count
+            # Entrada atrasada: se reubica con su conteo real. Cada reubicación
+            # corresponde a incrementos previos, así que el coste se amortiza.
+            heapq.heapreplace(heap, (current, next(self._sequence), key))
+
+    def count(self, key: Hashable) -> int:
+        """Conteo estimado; 0 si la clave no está entre las vigiladas."""
+        return self._counts.get(key, 0)
+
+    def error(self, key: Hashable) -> int:
+        return self._errors.get(key, 0)
+
+    def keys(self) -> list[Hashable]:
+        return list(self._counts)
+
+    def top(self, limit: int | None = None) -> list[tuple[Hashable, int, int]]:
+        """``(clave, conteo, error)`` de mayor a menor conteo."""
+        rows = sorted(self._counts.items(), key=lambda item: item[1], reverse=True)
+        if limit is not None:
+            rows = rows[:limit]
+        return [(key, count, self._errors[key]) for key, count in rows]
+
+    def clear(self) -> None:
+        self._counts.clear()
+        self._errors.clear()
+        self._heap.clear()
+        self.total = 0
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+
+class RateTracker:
+    """Tasas recientes a partir de muestras periódicas de contadores acumulados.
+
+    ``sample`` guarda ``{serie: total}`` en un búfer circular que cubre la ventana
+    más larga. La tasa de una ventana es el incremento entre el total actual y la
+    muestra de hace ``window`` segundos; si el proceso lleva menos tiempo, se usa
+    la muestra más antigua. Además mantiene medias móviles exponenciales de la
+    tasa (``ewma_*``), que reaccionan rápido sin olvidar de golpe.
+
+    Todas las tasas van por minuto.
+    """
+
+    def __init__(self, windows: dict[str, float], *, interval: float):
+        self.windows = dict(windows)
+        self.interval = interval
+        self._samples: deque[tuple[float, dict[str, float]]] = deque(
+            maxlen=math.ceil(max(self.windows.values()) / interval) + 2
+        )
+        self._ewma: dict[str, dict[str, float]] = {}
+
+    def sample(self, totals: Mapping[str, float], now: float | None = None) -> None:
+        now = time.monotonic() if now is None else now
+        if self._samples:
+            previous_at, previous = self._samples[-1]
+            elapsed = now - previous_at
+            if elapsed > 0:
+                for series, total in totals.items():
+                    rate = _increase(previous.get(series, 0), total) / elapsed * 60
+                    averages = self._ewma.setdefault(series, dict.fromkeys(self.windows, rate))
+                    for label, window in self.windows.items():
+                        alpha = 1 - math.exp(-elapsed / window)
+                        averages[label] += alpha * (rate - averages[label])
+        self._samples.append((now, dict(totals)))
+
+    def increase(
+        self, totals: Mapping[str, float], window: float, now: float | None = None
+    ) -> tuple[dict[str, float], float]:
+        """Incremento de cada serie en los últimos ``window`` segundos y segundos cubiertos."""
+        now = time.monotonic() if now is None else now
+        start = self._sample_before(now - window)
+        if start is None or now <= start[0]:
+            return dict.fromkeys(totals, 0.0), 0.0
+        started_at, previous = start
+        increases = {series: _increase(previous.get(series, 0), total) for series, total in totals.items()}
+        return increases, now - started_at
+
+    def rates(self, totals: Mapping[str, float], now: float | None = None) -> dict[str, dict[str, float]]:
+        """``{serie: {ventana: tasa, "ewma_<ventana>": tasa}}`` hasta ``now``."""
+        now = time.monotonic() if now is None else now
+        result: dict[str, dict[str, float]] = {series: {} for series in totals}
+        for label, window in self.windows.items():
+            increases, span = self.increase(totals, window, now)
+            for series, amount in increases.items():
+                result[series][label] = amount / span * 60 if span else 0.0
+        for series in totals:
+            averages = self._ewma.get(series, {})
+            for label in self.windows:
+                result[series][f"ewma_{label}"] = averages.get(label, 0.0)
+        return result
+
+    def _sample_before(self, moment: float) -> tuple[float, dict[str, float]] | None:
+        """Última muestra tomada en o antes de ``moment``; si no hay, la más antigua."""
+        samples = self._samples
+        if not samples:
+            return None
+        index = bisect.bisect_right(samples, moment, key=lambda item: item[0])
+        return samples[max(index - 1, 0)]
+
+    def clear(self) -> None:
+        self._samples.clear()
+        self._ewma.clear()
+
+
+def _increase(previous: float, current: float) -> float:
+    # Un contador que baja se reinició: cuenta solo lo acumulado desde entonces.
+    return current - previous if current >= previous else current
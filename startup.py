@@ -0,0 +1,272 @@
+"""Carga de extensiones por oleadas y perfil de arranque.
+
+Las dependencias entre extensiones se deducen de sus imports de nivel de
+módulo (``vanity_slash_cog`` importa ``modules.vanity_cog``). Las extensiones
+sin dependencias pendientes forman una oleada y se cargan a la vez; antes, las
+librerías que importan se precargan en hilos. Cada fase y cada extensión quedan
+cronometradas en un ``StartupProfile`` que se guarda como JSON.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import importlib
+import json
+import logging
+import re
+import sys
+import time
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager, suppress
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+from discord.ext import commands
+
+PREFETCH_WORKERS = 4
+
+log = logging.getLogger("bot")
+
+
+def discover_extensions(folder: Path, package: str) -> dict[str, Path]:
+    """Devuelve ``{nombre_de_extensión: ruta}`` de los módulos de ``folder``."""
+    return {
+        f"{package}.{file_path.stem}": file_path
+        for file_path in sorted(folder.glob("*.py"))
+        if not file_path.name.startswith("__")
+    }
+
+
+IMPORT_LINE = re.compile(
+    r"^(?:from[ \t]+(?P<module>[\w.]+)[ \t]+import[ \t]+(?:\((?P<group>[^)]*)\)|(?P<names>[^\n#]*))"
+    r"|import[ \t]+(?P<plain>[^\n#]+))",
+    re.MULTILINE,
+)
+
+
+def _import_names(text: str) -> list[str]:
+    return [part.split()[0] for part in text.split(",") if part.strip()]
+
+
+def module_imports(path: Path, packages: Iterable[str] = ()) -> set[str]:
+    """Módulos importados en el nivel superior de ``path``.
+
+    Solo cuentan las líneas ``import``/``from`` sin sangría: los imports dentro
+    de funciones son perezosos a propósito. ``from paquete import x`` añade
+    ``paquete.x`` si ``paquete`` está en ``packages``. Se lee el texto en vez
+    de usar ``ast`` porque el análisis completo costaba más que lo que ahorra.
+    """
+    packages = set(packages)
+    imported: set[str] = set()
+    for match in IMPORT_LINE.finditer(path.read_text(encoding="utf-8")):
+        module = match["module"]
+        if module is None:
+            imported.update(_import_names(match["plain"]))
+            continue
+        imported.add(module)
+        if module in packages:
+            names = match["group"] if match["group"] is not None else match["names"]
+            imported.update(f"{module}.{name}" for name in _import_names(names))
+    return imported
+
+
+def _scan(extensions: dict[str, Path]) -> dict[str, set[str]]:
+    packages = {name.rpartition(".")[0] for name in extensions}
+    return {name: module_imports(path, packages) for name, path in extensions.items()}
+
+
+def _dependencies(imports: dict[str, set[str]]) -> dict[str, set[str]]:
+    return {name: (modules & imports.keys()) - {name} for name, modules in imports.items()}
+
+
+def resolve_dependencies(extensions: dict[str, Path]) -> dict[str, set[str]]:
+    """Extensiones de las que depende cada una según sus imports."""
+    return _dependencies(_scan(extensions))
+
+
+def load_waves(dependencies: dict[str, set[str]]) -> list[list[str]]:
+    """Agrupa las extensiones en oleadas que respetan sus dependencias.
+
+    Una dependencia fuera de ``dependencies`` se ignora. Lanza ``ValueError``
+    si hay un ciclo.
+    """
+    pending = {name: deps & dependencies.keys() for name, deps in dependencies.items()}
+    waves: list[list[str]] = []
+    while pending:
+        ready = sorted(name for name, deps in pending.items() if not deps)
+        if not ready:
+            raise ValueError("Dependencias circulares entre extensiones: " + ", ".join(sorted(pending)))
+        waves.append(ready)
+        for name in ready:
+            del pending[name]
+        for deps in pending.values():
+            deps.difference_update(ready)
+    return waves
+
+
+def _prefetch(module_name: str) -> float:
+    started = time.perf_counter()
+    # Si falla, el error real aparecerá al cargar la extensión, con su traza.
+    with suppress(Exception):
+        importlib.import_module(module_name)
+    return (time.perf_counter() - started) * 1000
+
+
+async def prefetch_imports(module_names: Iterable[str]) -> dict[str, float]:
+    """Importa en hilos las librerías que aún no están en ``sys.modules``.
+
+    ``load_extension`` ejecuta el módulo en el hilo del bucle; si sus
+    dependencias ya están importadas, esa parte queda en casi nada.
+    """
+    missing = sorted(name for name in set(module_names) if name not in sys.modules)
+    timings: dict[str, float] = {}
+    semaphore = asyncio.Semaphore(PREFETCH_WORKERS)
+
+    async def run(name: str) -> None:
+        async with semaphore:
+            timings[name] = await asyncio.to_thread(_prefetch, name)
+
+    await asyncio.gather(*(run(name) for name in missing))
+    return timings
+
+
+class StartupProfile:
+    """Tiempos del arranque: fases generales y detalle por extensión."""
+
+    def __init__(self):
+        self.started_at = datetime.now(UTC)
+        self._started = time.perf_counter()
+        self.phases: dict[str, float] = {}
+        self.waves: list[list[str]] = []
+        self.prefetch: dict[str, float] = {}
+        self.extensions: dict[str, dict[str, Any]] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = round((time.perf_counter() - started) * 1000, 3)
+
+    def record_extension(
+        self,
+        name: str,
+        *,
+        wave: int,
+        depends_on: Iterable[str],
+        load_ms: float,
+        status: str,
+        error: str | None = None,
+    ) -> None:
+        self.extensions[name] = {
+            "wave": wave,
+            "depends_on": sorted(depends_on),
+            "load_ms": round(load_ms, 3),
+            "status": status,
+            "error": error,
+        }
+
+    def failures(self, package: str | None = None) -> list[str]:
+        return [
+            name
+            for name, entry in self.extensions.items()
+            if entry["status"] != "ok" and (package is None or name.startswith(f"{package}."))
+        ]
+
+    def loaded(self, package: str) -> int:
+        return sum(
+            1
+            for name, entry in self.extensions.items()
+            if entry["status"] == "ok" and name.startswith(f"{package}.")
+        )
+
+    def total_ms(self) -> float:
+        return round((time.perf_counter() - self._started) * 1000, 3)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "total_ms": self.total_ms(),
+            "python": sys.version.split()[0],
+            "phases": self.phases,
+            "waves": self.waves,
+            "prefetch_ms": {name: round(value, 3) for name, value in sorted(self.prefetch.items())},
+            "extensions": self.extensions,
+        }
+
+    def write(self, path: Path) -> dict[str, Any]:
+        data = self.to_dict()
+        temp_path = path.with_suffix(path.suffix + ".tmp")
+        temp_path.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+        temp_path.replace(path)
+        return data
+
+    def summary_lines(self, limit: int = 10) -> list[str]:
+        """Líneas legibles con las fases y las extensiones más lentas."""
+        lines = [
+            "Fases: " + " | ".join(f"{name}={value:.1f} ms" for name, value in self.phases.items()),
+        ]
+        slowest = sorted(self.extensions.items(), key=lambda item: item[1]["load_ms"], reverse=True)
+        for name, entry in slowest[:limit]:
+            lines.append(f"  {entry['load_ms']:>8.1f} ms  oleada {entry['wave']}  {name} ({entry['status']})")
+        return lines
+
+
+async def load_extensions(
+    bot: commands.Bot,
+    extensions: dict[str, Path],
+    profile: StartupProfile,
+) -> StartupProfile:
+    """Carga ``extensions`` por oleadas y anota cada resultado en ``profile``.
+
+    Una extensión cuya dependencia falló se marca como ``skipped`` sin
+    intentar cargarla.
+    """
+    imports = _scan(extensions)
+    dependencies = _dependencies(imports)
+    waves = load_waves(dependencies)
+    profile.waves = waves
+
+    libraries = {module for modules in imports.values() for module in modules if module not in extensions}
+    with profile.phase("prefetch"):
+        profile.prefetch = await prefetch_imports(libraries)
+
+    failed: set[str] = set()
+
+    async def load_one(name: str, wave: int) -> None:
+        deps = dependencies[name]
+        broken = sorted(deps & failed)
+        if broken:
+            failed.add(name)
+            profile.record_extension(
+                name,
+                wave=wave,
+                depends_on=deps,
+                load_ms=0.0,
+                status="skipped",
+                error="depende de " + ", ".join(broken),
+            )
+            log.error(f"Omitido {name}: depende de {', '.join(broken)}")
+            return
+
+        started = time.perf_counter()
+        try:
+            await bot.load_extension(name)
+        except Exception as exc:
+            elapsed = (time.perf_counter() - started) * 1000
+            failed.add(name)
+            profile.record_extension(
+                name, wave=wave, depends_on=deps, load_ms=elapsed, status="failed", error=str(exc)
+            )
+            log.error(f"Fallo al cargar {name}: {exc}")
+            return
+        elapsed = (time.perf_counter() - started) * 1000
+        profile.record_extension(name, wave=wave, depends_on=deps, load_ms=elapsed, status="ok")
+        log.info(f"Modulo cargado: {name} ({elapsed:.1f} ms)")
+
+    for index, wave in enumerate(waves):
+        with profile.phase(f"wave_{index}"):
+            await asyncio.gather(*(load_one(name, index) for name in wave))
+    return profile
@@ -0,0 +1,33 @@
+"""Con ``COPYDC_SLOW_CALLBACK_MS`` definido, un callback del bucle más lento que
+ese umbral hace fallar el test que lo ejecutó."""
+
+import os
+
+import pytest
+
+from loop_health import LoopMonitor
+
+SLOW_CALLBACK_MS = os.getenv("COPYDC_SLOW_CALLBACK_MS")
+
+
+@pytest.fixture(autouse=True)
+def fail_on_slow_callbacks(request):
+    if not SLOW_CALLBACK_MS or request.node.get_closest_marker("allow_slow_callbacks"):
+        yield
+        return
+    monitor = LoopMonitor(slow_threshold=float(SLOW_CALLBACK_MS) / 1000)
+    monitor.install()
+    try:
+        yield
+    finally:
+        monitor.uninstall()
+    events = monitor.snapshot()["slow_callbacks"]
+    if events:
+        details = "\n\n".join(
+            f"{event['callback']} ({event['duration_ms']:.1f}ms)\n{event['stack']}" for event in events
+        )
+        pytest.fail(f"Callbacks del bucle más lentos que {SLOW_CALLBACK_MS}ms:\n{details}", pytrace=False)
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "allow_slow_callbacks: no falla por callbacks lentos del bucle")
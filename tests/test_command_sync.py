@@ -0,0 +1,95 @@
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+import discord
+from discord import app_commands
+
+import database as db
+from command_sync import command_payload, fingerprint, sync_tree
+
+APPLICATION_ID = 4242
+
+
+def make_tree(*names: str) -> app_commands.CommandTree:
+    client = discord.Client(intents=discord.Intents.none())
+    client._connection.application_id = APPLICATION_ID
+    tree = app_commands.CommandTree(client)
+    for name in names:
+        tree.add_command(app_commands.Command(name=name, description=f"{name} command", callback=_noop))
+    tree.sync = mock.AsyncMock(side_effect=lambda guild=None: list(tree.get_commands(guild=guild)))
+    return tree
+
+
+async def _noop(interaction: discord.Interaction) -> None:
+    pass
+
+
+class CommandSyncTests(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = str(Path(self.temp_dir.name) / "copydc-sync.db")
+        self.db_file_patch = mock.patch.object(db, "DB_FILE", self.db_path)
+        self.db_file_patch.start()
+        db.setup_database()
+
+    def tearDown(self):
+        db.query_registry.close_all()
+        self.db_file_patch.stop()
+        self.temp_dir.cleanup()
+
+    async def test_fingerprint_ignores_registration_order(self):
+        first = await command_payload(make_tree("alpha", "beta"))
+        second = await command_payload(make_tree("beta", "alpha"))
+
+        self.assertEqual(fingerprint(first), fingerprint(second))
+        self.assertNotEqual(fingerprint(first), fingerprint(await command_payload(make_tree("alpha"))))
+
+    async def test_skips_unchanged_tree_unless_forced(self):
+        tree = make_tree("alpha", "beta")
+
+        first = await sync_tree(tree)
+        second = await sync_tree(tree)
+        forced = await sync_tree(tree, force=True)
+
+        self.assertTrue(first.synced)
+        self.assertEqual(first.command_count, 2)
+        self.assertFalse(second.synced)
+        self.assertEqual(second.command_count, 2)
+        self.assertTrue(forced.synced)
+        self.assertEqual(tree.sync.await_count, 2)
+        stored = db.get_app_command_sync(APPLICATION_ID)
+        self.assertEqual(stored["fingerprint"], first.fingerprint)
+
+        tree.add_command(app_commands.Command(name="gamma", description="gamma command", callback=_noop))
+        changed = await sync_tree(tree)
+        self.assertTrue(changed.synced)
+        self.assertEqual(changed.command_count, 3)
+
+    async def test_failed_sync_is_not_recorded(self):
+        tree = make_tree("alpha")
+        tree.sync.side_effect = discord.HTTPException(SimpleNamespace(status=429, reason="Too Many"), "limit")
+
+        with self.assertRaises(discord.HTTPException):
+            await sync_tree(tree)
+
+        self.assertIsNone(db.get_app_command_sync(APPLICATION_ID))
+
+    async def test_guild_scopes_are_tracked_separately_and_dropped_with_the_guild(self):
+        tree = make_tree("alpha")
+        guild = discord.Object(id=77)
+        tree.copy_global_to(guild=guild)
+
+        self.assertTrue((await sync_tree(tree, guild=guild)).synced)
+        self.assertTrue((await sync_tree(tree)).synced)
+        self.assertFalse((await sync_tree(tree, guild=guild)).synced)
+
+        db.remove_guilds([77])
+        self.assertIsNone(db.get_app_command_sync(APPLICATION_ID, 77))
+        self.assertIsNotNone(db.get_app_command_sync(APPLICATION_ID))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,11 +1,14 @@
+import io
 import sqlite3
 import tempfile
 import unittest
+from contextlib import closing, redirect_stdout
 from pathlib import Path
 from types import SimpleNamespace
 from unittest import mock
 
 import database as db
+from scripts.migrate_legacy_json import migrate
 
 
 class DatabaseIntegrityTests(unittest.TestCase):
@@ -19,6 +22,7 @@ class DatabaseIntegrityTests(unittest.TestCase):
         db.setup_clantag_table()
 
     def tearDown(self):
+        db.query_registry.close_all()
         self.db_file_patch.stop()
         self.temp_dir.cleanup()
 
@@ -60,6 +64,7 @@ class DatabaseIntegrityTests(unittest.TestCase):
                 """,
                 (100, 10, 19, 42),
             )
+            conn.execute("PRAGMA user_version = 1")
             conn.commit()
         finally:
             conn.close()
@@ -71,6 +76,49 @@ class DatabaseIntegrityTests(unittest.TestCase):
         self.assertEqual(row["last_user_id"], 42)
         self.assertEqual(row["high_score"], 19)
 
+    def test_migrations_run_once_and_then_take_the_fast_path(self):
+        conn = db.get_db_connection()
+        try:
+            self.assertEqual(db.get_schema_version(conn), db.SCHEMA_VERSION)
+            self.assertEqual(db.apply_migrations(conn), [])
+        finally:
+            conn.close()
+
+    def test_fresh_database_imports_legacy_json(self):
+        legacy_dir = Path(self.temp_dir.name) / "legacy"
+        legacy_dir.mkdir()
+        (legacy_dir / "guilds.json").write_text('{"10": "Legacy"}', encoding="utf-8")
+        (legacy_dir / "thread_channels.json").write_text('{"10": {"101": "all"}}', encoding="utf-8")
+        fresh_path = str(Path(self.temp_dir.name) / "fresh.db")
+
+        with (
+            mock.patch.object(db, "DB_FILE", fresh_path),
+            mock.patch.object(db, "LEGACY_JSON_DIR", legacy_dir),
+        ):
+            self.assertEqual(db.setup_database(), [version for version, _ in db.MIGRATIONS])
+            self.assertEqual([row["guild_name"] for row in db.get_all_guilds()], ["Legacy"])
+            self.assertEqual(db.get_thread_config_for_channel(101)["mode"], "all")
+
+    def test_migration_script_imports_only_from_its_source(self):
+        bot_dir = Path(self.temp_dir.name) / "bot"
+        source_dir = Path(self.temp_dir.name) / "source"
+        for folder, name in ((bot_dir, "Bot"), (source_dir, "Source")):
+            folder.mkdir()
+            (folder / "guilds.json").write_text(f'{{"10": "{name}"}}', encoding="utf-8")
+        fresh_path = Path(self.temp_dir.name) / "script.db"
+
+        with (
+            mock.patch.object(db, "LEGACY_JSON_DIR", bot_dir),
+            mock.patch.object(db, "import_legacy_json", wraps=db.import_legacy_json) as import_json,
+            redirect_stdout(io.StringIO()),
+        ):
+            migrate(source_dir, fresh_path)
+
+        import_json.assert_called_once()
+        with closing(sqlite3.connect(fresh_path)) as conn:
+            self.assertEqual(conn.execute("SELECT guild_name FROM guilds").fetchall(), [("Source",)])
+            self.assertEqual(db.get_schema_version(conn), db.SCHEMA_VERSION)
+
     def test_remove_guild_clears_all_owned_configuration(self):
         guild = SimpleNamespace(id=10, name="Test Guild")
         db.add_guild(guild)
@@ -124,6 +172,44 @@ class DatabaseIntegrityTests(unittest.TestCase):
         finally:
             conn.close()
 
+    def test_sync_guilds_applies_only_the_difference(self):
+        db.add_guild(SimpleNamespace(id=10, name="Old Name"))
+        db.add_guild(SimpleNamespace(id=20, name="Gone"))
+        db.add_thread_config(20, 201, "all")
+        db.set_guild_language(20, "en")
+
+        departed = db.sync_guilds(
+            [SimpleNamespace(id=10, name="New Name"), SimpleNamespace(id=30, name="Joined")]
+        )
+
+        self.assertEqual(departed, [20])
+        guilds = {row["guild_id"]: row["guild_name"] for row in db.get_all_guilds()}
+        self.assertEqual(guilds, {10: "New Name", 30: "Joined"})
+        self.assertEqual(db.get_all_thread_configs_for_guild(20), [])
+        self.assertEqual(db.get_guild_language(20), "auto")
+
+    def test_sync_guilds_ignores_an_empty_guild_cache(self):
+        db.add_guild(SimpleNamespace(id=10, name="Kept"))
+        db.add_thread_config(10, 101, "all")
+
+        self.assertEqual(db.sync_guilds([]), [])
+        self.assertEqual(len(db.get_all_thread_configs_for_guild(10)), 1)
+
+    def test_configured_module_summary_groups_all_guilds(self):
+        db.add_thread_config(10, 101, "all")
+        db.add_thread_config(10, 102, "all")
+        db.add_auto_reaction(10, "hola", ["👋"])
+        db.set_vanity_settings(10, channel_id=105)
+        db.set_clantag_settings(20)
+        db.set_boost_log_channel(20, 104)
+        db.add_vanity_code(30, "discord.gg/test", 106)
+
+        summary = db.get_configured_module_summary()
+
+        self.assertEqual(summary[10], {"thread": 2, "react": 1, "vanity_settings": 1})
+        self.assertEqual(summary[20], {"boost_log": 1})
+        self.assertEqual(summary[30], {"vanity_codes": 1})
+
     def test_dynamic_setting_columns_are_restricted(self):
         with self.assertRaises(ValueError):
             db.set_vanity_settings(10, malicious_column="x")
@@ -154,6 +240,45 @@ class DatabaseIntegrityTests(unittest.TestCase):
         expired = db.get_expired_support_archives("2026-07-15T00:00:00+00:00")
         self.assertEqual([row["case_id"] for row in expired], [case_id])
 
+    def test_expired_support_archives_are_paginated_by_purge_date(self):
+        db.set_support_settings(10, 100, 101, 102, 1)
+        case_ids = []
+        for day in (3, 1, 2):
+            case_id = db.create_support_case(10, 110 + day, 40 + day, "Caso", "2026-06-01T00:00:00+00:00")
+            db.close_support_case(case_id, 100, 200 + day, f"2026-06-0{day}T00:00:00+00:00")
+            case_ids.append(case_id)
+        self.assertEqual(db.get_support_case(10, case_ids[1])["purge_after"], "2026-06-02T00:00:00+00:00")
+
+        now = "2026-07-01T00:00:00+00:00"
+        first = db.get_expired_support_archives(now, limit=2)
+        self.assertEqual([row["case_id"] for row in first], [case_ids[1], case_ids[2]])
+        last = first[-1]
+        second = db.get_expired_support_archives(now, after=(last["purge_after"], last["case_id"]), limit=2)
+        self.assertEqual([row["case_id"] for row in second], [case_ids[0]])
+
+        db.clear_support_archive(case_ids[1])
+        self.assertEqual(
+            [row["case_id"] for row in db.get_expired_support_archives(now)],
+            [case_ids[2], case_ids[0]],
+        )
+
+    def test_migration_backfills_purge_after_for_existing_archives(self):
+        db.set_support_settings(10, 100, 101, 102, 30)
+        case_id = db.create_support_case(10, 103, 42, "Caso", "2026-06-01T00:00:00+00:00")
+        db.close_support_case(case_id, 100, 104, "2026-06-15T00:00:00+00:00")
+        conn = db.get_db_connection()
+        try:
+            conn.execute("UPDATE support_cases SET purge_after = NULL")
+            conn.execute("PRAGMA user_version = 4")
+            conn.commit()
+            self.assertEqual(
+                db.apply_migrations(conn), [version for version, _ in db.MIGRATIONS if version > 4]
+            )
+        finally:
+            conn.close()
+
+        self.assertEqual(db.get_support_case(10, case_id)["purge_after"], "2026-07-15T00:00:00+00:00")
+
     def test_user_can_only_have_one_open_support_case(self):
         db.create_support_case(10, 100, 42, "Primero", "2026-07-28T12:00:00+00:00")
 
@@ -174,6 +299,41 @@ class DatabaseIntegrityTests(unittest.TestCase):
         self.assertIsNone(db.get_lfg_assignment(10, 42))
         self.assertFalse(db.is_lfg_enrolled(10, 42))
 
+    def test_query_registry_times_each_named_query(self):
+        db.query_registry.reset()
+        db.add_thread_config(10, 100, "text")
+        db.get_thread_config_for_channel(100)
+        db.get_thread_config_for_channel(100)
+        db.create_support_case(10, 200, 42, "Primero", "2026-07-28T12:00:00+00:00")
+        with self.assertRaises(sqlite3.IntegrityError):
+            db.create_support_case(10, 201, 42, "Segundo", "2026-07-28T12:01:00+00:00")
+
+        queries = db.query_registry.snapshot()["queries"]
+        lookup = queries["thread_configs.get"]
+        self.assertEqual(lookup["kind"], "read")
+        self.assertEqual(lookup["count"], 2)
+        self.assertEqual(sum(lookup["buckets"]), 2)
+        self.assertEqual(queries["thread_configs.replace"]["kind"], "write")
+        # Una restricción violada es una respuesta esperada, no un fallo de la base.
+        self.assertEqual(queries["support_cases.insert"]["constraint_errors"], 1)
+        self.assertEqual(queries["support_cases.insert"]["errors"], 0)
+
+    def test_query_registry_reuses_one_connection_per_thread(self):
+        first = db.query_registry.connection()
+        db.get_all_guilds()
+        self.assertIs(db.query_registry.connection(), first)
+
+        other_path = str(Path(self.temp_dir.name) / "other.db")
+        with mock.patch.object(db, "DB_FILE", other_path):
+            self.assertIsNot(db.query_registry.connection(), first)
+
+    def test_transaction_rolls_back_every_statement(self):
+        db.set_lfg_settings(10, 100)
+        with self.assertRaises(RuntimeError), db._transaction():
+            db.set_lfg_dashboard_message(10, 555)
+            raise RuntimeError("fallo simulado")
+        self.assertIsNone(db.get_lfg_settings(10)["dashboard_message_id"])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+
+import discord
+from discord.ext import commands
+
+import database as db
+from admin_modules.db_health_cog import DBHealthCog, format_change, parse_period
+
+
+class DBHealthRecommendationTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        bot = commands.Bot(command_prefix="!", intents=discord.Intents.none())
+        # Prepara el bucle del cliente sin conectarse: las tareas que esperan a
+        # ``wait_until_ready`` quedan en espera en vez de fallar.
+        await bot._async_setup_hook()
+        self.cog = DBHealthCog(bot)
+        self.addAsyncCleanup(self.cog.cog_unload)
+
+    def test_flags_bursts_against_the_hourly_rate(self):
+        rates = {series: {"1m": 0.0, "1h": 0.0} for series in ("writes", "ops", "commands")}
+        rates.update(
+            messages={"1m": 240.0, "1h": 20.0},
+            presence_updates={"1m": 50.0, "1h": 40.0},
+            member_updates={"1m": 5.0, "1h": 0.0},
+        )
+        bursts = DBHealthCog._detect_bursts(rates)
+        self.assertEqual([burst["series"] for burst in bursts], ["messages"])
+
+    async def test_recommendation_uses_recent_windows(self):
+        snap = self.cog._snapshot()
+        self.assertEqual(snap["rate_window"], "5m")
+        self.assertIn("1h", snap["db"]["rates"]["writes"])
+        self.assertEqual(self.cog._recommendation(snap)["level"], "green")
+
+        snap["db"]["locked_errors"] = 50
+        snap["db"]["writes_per_min"] = 45.0
+        snap["bursts"] = [{"series": "writes", "rate_1m": 120.0, "rate_1h": 20.0}]
+        rec = self.cog._recommendation(snap)
+        # Los locks antiguos ya no cuentan; el pico y la tasa reciente sí.
+        self.assertEqual(rec["level"], "yellow")
+        self.assertEqual(rec["bursts"], ["writes"])
+        self.assertTrue(any("Pico de writes" in reason for reason in rec["reasons"]))
+
+    async def test_history_values_are_per_minute_increases(self):
+        # La primera vuelta del bucle ya tomó una línea base; se parte de cero.
+        self.cog._history_previous = None
+        self.assertIsNone(self.cog._history_values())
+        for _ in range(3):
+            self.cog._record_traffic("messages", 1)
+        self.cog._record_traffic("presence_updates", None)
+
+        values = self.cog._history_values()
+        self.assertEqual((values["messages"], values["presence_updates"], values["db_ops"]), (3, 1, 0))
+        # Sin consultas en el minuto no se inventan cuantiles.
+        self.assertNotIn("db_p95_ms", values)
+        self.assertEqual(self.cog._history_values()["messages"], 0)
+
+    async def test_minute_quantiles_ignore_latency_before_the_baseline(self):
+        self.addCleanup(db.query_registry.reset)
+        db.query_registry.reset()
+        db.query_registry._record("demo.read", "read", 900.0, None)
+        self.cog._history_previous = None
+        self.cog._history_values()
+        for _ in range(40):
+            db.query_registry._record("demo.read", "read", 2.0, None)
+
+        values = self.cog._history_values()
+        for metric in ("db_p50_ms", "db_p95_ms", "db_p99_ms"):
+            self.assertAlmostEqual(values[metric], 2.0, delta=0.05)
+
+
+class TrendHelpersTests(unittest.TestCase):
+    def test_parse_period(self):
+        self.assertEqual(parse_period("24h"), 86400)
+        self.assertEqual(parse_period("7D"), 7 * 86400)
+        for text in ("0d", "7w", "abc", "401d"):
+            self.assertIsNone(parse_period(text), text)
+
+    def test_format_change(self):
+        self.assertEqual(format_change(15, 10), "+50.0%")
+        self.assertEqual(format_change(5, 10), "-50.0%")
+        self.assertEqual(format_change(5, None), "n/a")
+        self.assertEqual(format_change(5, 0), "n/a")
+
+
+if __name__ == "__main__":
+    unittest.main()
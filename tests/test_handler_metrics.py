@@ -0,0 +1,119 @@
+import asyncio
+import unittest
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from handler_metrics import HandlerRegistry, instrument_cog
+
+
+class SampleCog(commands.Cog):
+    def __init__(self):
+        self.release = asyncio.Event()
+
+    @commands.Cog.listener("on_message")
+    async def track_message(self, message):
+        await self.release.wait()
+
+    @commands.Cog.listener()
+    async def on_member_update(self, before, after):
+        raise RuntimeError("fallo")
+
+    @commands.command(name="ping")
+    async def ping(self, ctx):
+        return "pong"
+
+    @commands.hybrid_command(name="echo")
+    async def echo(self, ctx, text: str):
+        return text
+
+    @app_commands.command(name="info")
+    async def info(self, interaction: discord.Interaction):
+        return "info"
+
+
+def by_handler(registry: HandlerRegistry) -> dict[tuple[str, str], dict]:
+    return {(item["handler"], item["kind"]): item for item in registry.snapshot()["handlers"]}
+
+
+class InstrumentCogTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.registry = HandlerRegistry()
+        self.bot = commands.Bot(command_prefix="!", intents=discord.Intents.none())
+        self.cog = SampleCog()
+        instrument_cog(self.cog, self.registry)
+        await self.bot.add_cog(self.cog)
+
+    async def test_wraps_listeners_and_every_command_kind(self):
+        self.assertEqual(
+            set(by_handler(self.registry)),
+            {
+                ("on_message:track_message", "listener"),
+                ("on_member_update", "listener"),
+                ("ping", "prefix"),
+                ("echo", "prefix"),
+                ("echo", "slash"),
+                ("info", "slash"),
+            },
+        )
+        # Instrumentar dos veces no anida envolturas.
+        self.assertEqual(instrument_cog(self.cog, self.registry), 0)
+
+    async def test_counts_duration_errors_and_in_flight(self):
+        pending = asyncio.create_task(self.bot.extra_events["on_message"][0](object()))
+        await asyncio.sleep(0)
+        self.assertEqual(by_handler(self.registry)[("on_message:track_message", "listener")]["in_flight"], 1)
+        self.cog.release.set()
+        await pending
+
+        with self.assertRaises(RuntimeError):
+            await self.cog.on_member_update(None, None)
+        self.assertEqual(await self.bot.get_command("ping").callback(self.cog, None), "pong")
+        info = self.bot.tree.get_command("info")
+        self.assertEqual(await info.callback(self.cog, None), "info")
+
+        stats = by_handler(self.registry)
+        message = stats[("on_message:track_message", "listener")]
+        self.assertEqual((message["count"], message["in_flight"], message["errors"]), (1, 0, 0))
+        self.assertGreater(message["total_ms"], 0)
+        self.assertEqual(stats[("on_member_update", "listener")]["errors"], 1)
+        self.assertEqual(stats[("ping", "prefix")]["count"], 1)
+        self.assertEqual(stats[("info", "slash")]["count"], 1)
+
+    async def test_remove_cog_drops_wrapped_listeners(self):
+        await self.bot.remove_cog("SampleCog")
+        self.assertEqual(self.bot.extra_events.get("on_message", []), [])
+
+
+class HandlerRegistryTests(unittest.IsolatedAsyncioTestCase):
+    async def test_top_sorts_and_reset_keeps_in_flight(self):
+        registry = HandlerRegistry()
+
+        async def fast():
+            return None
+
+        async def slow():
+            await asyncio.sleep(0.02)
+
+        wrapped_fast = registry.wrap(("Cog", "fast", "listener"), fast)
+        wrapped_slow = registry.wrap(("Cog", "slow", "listener"), slow)
+        for _ in range(3):
+            await wrapped_fast()
+        await wrapped_slow()
+
+        self.assertEqual([item["handler"] for item in registry.top("max")], ["slow", "fast"])
+        self.assertEqual([item["handler"] for item in registry.top("count")], ["fast", "slow"])
+        with self.assertRaises(ValueError):
+            registry.top("desconocido")
+
+        pending = asyncio.create_task(wrapped_slow())
+        await asyncio.sleep(0)
+        registry.reset()
+        self.assertEqual([(item["handler"], item["in_flight"]) for item in registry.top()], [("slow", 1)])
+        await pending
+        self.assertEqual(registry.top()[0]["in_flight"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import sys
+import unittest
+
+from lazy import LazyResource, lazy_import
+from scripts.benchmark_imports import LAZY_MODULES, import_times
+
+
+class FakeSession:
+    def __init__(self):
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+class LazyModuleTests(unittest.TestCase):
+    def test_imports_on_first_attribute_access(self):
+        proxy = lazy_import("json")
+
+        self.assertFalse(proxy.loaded)
+        self.assertEqual(proxy.dumps([1]), "[1]")
+        self.assertTrue(proxy.loaded)
+        self.assertIs(proxy.dumps, sys.modules["json"].dumps)
+
+
+class LazyResourceTests(unittest.IsolatedAsyncioTestCase):
+    async def test_creates_once_and_recreates_after_close(self):
+        created = []
+        resource = LazyResource(
+            lambda: created.append(FakeSession()) or created[-1],
+            close=lambda session: session.close(),
+            is_closed=lambda session: session.closed,
+        )
+        self.assertFalse(resource.created)
+
+        first = await resource.get()
+        self.assertIs(await resource.get(), first)
+        self.assertEqual(len(created), 1)
+
+        await resource.close()
+        self.assertTrue(first.closed)
+        second = await resource.get()
+        self.assertIsNot(second, first)
+        self.assertEqual(len(created), 2)
+
+
+class ImportTimeTests(unittest.TestCase):
+    def test_extensions_do_not_import_heavy_subsystems(self):
+        times = import_times("modules.expression_cog", "modules.support_cases_cog")
+
+        self.assertIn("modules.expression_cog", times)
+        self.assertIn("modules.support_cases_cog", times)
+        for module in LAZY_MODULES:
+            with self.subTest(module=module):
+                self.assertNotIn(module, times)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -21,6 +21,7 @@ class LocalizationTests(unittest.TestCase):
         localization.initialize()
 
     def tearDown(self):
+        db.query_registry.close_all()
         self.db_file_patch.stop()
         self.temp_dir.cleanup()
 
@@ -75,6 +76,29 @@ class LocalizationTests(unittest.TestCase):
         )
         self.assertIn("English", translated)
 
+    def test_compiled_templates_match_str_format(self):
+        for language in ("en", "es"):
+            catalog_path = localization.LOCALES_DIR / f"{language}.json"
+            catalog = json.loads(catalog_path.read_text(encoding="utf-8"))
+            for key, text in catalog.items():
+                compiled = localization.CompiledTemplate(text, language=language, key=key)
+                values = {field: f"<{field}>" for field in compiled.fields}
+                with self.subTest(language=language, key=key):
+                    self.assertEqual(compiled.render(values), text.format(**values))
+
+    def test_compiled_template_handles_specs_and_fallbacks(self):
+        compiled = localization.CompiledTemplate("{count:>3}|{name!r}", language="en", key="demo")
+        self.assertEqual(compiled.render({"count": 7, "name": "x"}), "  7|'x'")
+        nested = localization.CompiledTemplate("{user.name}", language="en", key="demo")
+        self.assertIsNone(nested.segments)
+        self.assertEqual(nested.render({"user": SimpleNamespace(name="Ana")}), "Ana")
+        static = localization.CompiledTemplate("{{literal}}", language="en", key="demo")
+        self.assertEqual(static.render({}), "{literal}")
+
+    def test_catalog_keys_are_cached(self):
+        self.assertIs(localization.catalog_keys("en"), localization.catalog_keys("en"))
+        self.assertEqual(localization.catalog_keys("fr"), frozenset())
+
     def test_editor_help_preserves_documented_variables(self):
         for language in ("en", "es"):
             vanity = localization.translate_language(language, "vanity.editor_description")
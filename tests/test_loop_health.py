@@ -0,0 +1,96 @@
+import asyncio
+import time
+import unittest
+
+import pytest
+
+import loop_health
+from loop_health import LoopMonitor
+
+
+def blocking_work():
+    time.sleep(0.08)
+
+
+# Estos tests instalan su propio monitor; solo puede haber uno a la vez.
+@pytest.mark.allow_slow_callbacks
+class LoopMonitorTests(unittest.TestCase):
+    def run_monitored(self, monitor: LoopMonitor, coro_factory):
+        async def main():
+            monitor.install()
+            try:
+                await coro_factory()
+            finally:
+                monitor.uninstall()
+
+        asyncio.run(main())
+
+    def test_records_blocking_coroutine_with_stack(self):
+        monitor = LoopMonitor(slow_threshold=0.03)
+
+        async def slow_handler():
+            await asyncio.sleep(0)
+            blocking_work()
+
+        async def scenario():
+            await asyncio.create_task(slow_handler())
+
+        self.run_monitored(monitor, scenario)
+
+        events = monitor.snapshot()["slow_callbacks"]
+        self.assertEqual(len(events), 1)
+        self.assertIn("slow_handler", events[0]["callback"])
+        self.assertGreaterEqual(events[0]["duration_ms"], 30)
+        self.assertIn("blocking_work", events[0]["stack"])
+        self.assertEqual(monitor.snapshot()["stats"]["slow_callbacks"], 1)
+
+    def test_fast_callbacks_are_not_recorded(self):
+        monitor = LoopMonitor(slow_threshold=0.5)
+
+        async def scenario():
+            await asyncio.gather(*(asyncio.sleep(0) for _ in range(20)))
+
+        self.run_monitored(monitor, scenario)
+        self.assertEqual(monitor.snapshot()["slow_callbacks"], [])
+
+    def test_uninstall_restores_handle_run(self):
+        monitor = LoopMonitor()
+        monitor.install()
+        self.assertTrue(monitor.installed)
+        with self.assertRaises(RuntimeError):
+            LoopMonitor().install()
+        monitor.uninstall()
+        self.assertFalse(monitor.installed)
+        self.assertIs(asyncio.events.Handle._run, loop_health._original_run)
+
+    def test_lag_stats_and_reset(self):
+        monitor = LoopMonitor(slow_threshold=0.1)
+        for lag in (0.002, 0.004, 0.3):
+            monitor.record_lag(lag)
+
+        stats = monitor.snapshot()["stats"]
+        self.assertEqual(stats["lag_samples"], 3)
+        self.assertEqual(stats["lag_over_threshold"], 1)
+        self.assertAlmostEqual(stats["lag_max_ms"], 300)
+        self.assertAlmostEqual(stats["lag_avg_ms"], 102)
+        self.assertAlmostEqual(stats["lag_p95_ms"], 300)
+
+        monitor.reset()
+        self.assertEqual(monitor.snapshot()["stats"]["lag_samples"], 0)
+
+
+@pytest.mark.allow_slow_callbacks
+class LoopMonitorSamplingTests(unittest.IsolatedAsyncioTestCase):
+    async def test_start_samples_lag_until_stopped(self):
+        monitor = LoopMonitor(interval=0.01, slow_threshold=1)
+        await monitor.start()
+        try:
+            await asyncio.sleep(0.05)
+        finally:
+            await monitor.stop()
+        self.assertGreater(monitor.snapshot()["stats"]["lag_samples"], 0)
+        self.assertFalse(monitor.installed)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,183 @@
+import asyncio
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+import discord
+from discord.ext import commands
+
+import database as db
+from admin_modules.metrics_cog import COMMAND_DURATION, COMMAND_ERRORS, MetricsCog, collect_database
+from metrics import MetricsRegistry, MetricsServer, _Metric, metrics, render_families, timed_task
+
+
+class MetricsRenderTests(unittest.TestCase):
+    def test_renders_counters_gauges_and_histograms(self):
+        registry = MetricsRegistry()
+        requests = registry.counter("demo_requests_total", "Peticiones.", ("method",))
+        requests.labels("GET").inc()
+        requests.labels("GET").inc(2)
+        registry.gauge("demo_guilds", "Servidores.").set(3)
+        latency = registry.histogram("demo_latency_seconds", "Latencia.", buckets=(0.1, 1.0))
+        latency.observe(0.05)
+        latency.observe(0.5)
+        latency.observe(4)
+
+        self.assertEqual(
+            registry.render(),
+            "# HELP demo_requests_total Peticiones.\n"
+            "# TYPE demo_requests_total counter\n"
+            'demo_requests_total{method="GET"} 3\n'
+            "# HELP demo_guilds Servidores.\n"
+            "# TYPE demo_guilds gauge\n"
+            "demo_guilds 3\n"
+            "# HELP demo_latency_seconds Latencia.\n"
+            "# TYPE demo_latency_seconds histogram\n"
+            'demo_latency_seconds_bucket{le="0.1"} 1\n'
+            'demo_latency_seconds_bucket{le="1"} 2\n'
+            'demo_latency_seconds_bucket{le="+Inf"} 3\n'
+            "demo_latency_seconds_sum 4.55\n"
+            "demo_latency_seconds_count 3\n",
+        )
+
+    def test_escapes_label_values_and_rejects_type_changes(self):
+        registry = MetricsRegistry()
+        registry.counter("demo_total", "Demo.", ("name",)).labels('a"b\\c\n').inc()
+
+        self.assertIn('demo_total{name="a\\"b\\\\c\\n"} 1', registry.render())
+        with self.assertRaises(ValueError):
+            registry.gauge("demo_total", "Demo.")
+        with self.assertRaises(ValueError):
+            registry.counter("demo_total", "Demo.", ("name",)).inc()
+
+    def test_metric_types_must_implement_collect(self):
+        class Partial(_Metric):
+            def _new_child(self):
+                return None
+
+        with self.assertRaises(TypeError):
+            Partial("demo_partial", "Demo.", ())
+
+    def test_collectors_are_rendered_on_each_scrape(self):
+        registry = MetricsRegistry()
+        calls = []
+
+        def collector():
+            calls.append(1)
+            yield "demo_live", "gauge", "Valor leído al vuelo.", [("", {}, len(calls))]
+
+        registry.add_collector("demo", collector)
+        self.assertIn("demo_live 1", registry.render())
+        self.assertIn("demo_live 2", registry.render())
+        registry.remove_collector("demo")
+        self.assertNotIn("demo_live", registry.render())
+
+
+class TimedTaskTests(unittest.IsolatedAsyncioTestCase):
+    async def test_records_duration_and_errors(self):
+        @timed_task("tests.failing")
+        async def failing():
+            raise RuntimeError("boom")
+
+        with self.assertRaises(RuntimeError):
+            await failing()
+
+        rendered = render_families(
+            family for family in metrics.collect() if family[0].startswith("copydc_task_loop")
+        )
+        self.assertIn('copydc_task_loop_errors_total{task="tests.failing"} 1', rendered)
+        self.assertIn('copydc_task_loop_duration_seconds_count{task="tests.failing"} 1', rendered)
+
+
+class MetricsServerTests(unittest.IsolatedAsyncioTestCase):
+    async def request(self, port: int, line: str) -> bytes:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(f"{line}\r\nHost: localhost\r\n\r\n".encode())
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        return response
+
+    async def test_serves_metrics_on_localhost(self):
+        registry = MetricsRegistry()
+        registry.gauge("demo_up", "Arriba.").set(1)
+        server = MetricsServer(registry, "127.0.0.1", 0)
+        await server.start()
+        try:
+            response = await self.request(server.bound_port, "GET /metrics HTTP/1.1")
+            missing = await self.request(server.bound_port, "GET / HTTP/1.1")
+        finally:
+            await server.stop()
+
+        head, _, body = response.partition(b"\r\n\r\n")
+        self.assertTrue(head.startswith(b"HTTP/1.1 200 OK"))
+        self.assertIn(b"text/plain; version=0.0.4", head)
+        self.assertIn(b"demo_up 1\n", body)
+        self.assertTrue(missing.startswith(b"HTTP/1.1 404"))
+
+
+class DatabaseCollectorTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_file_patch = mock.patch.object(db, "DB_FILE", str(Path(self.temp_dir.name) / "metrics.db"))
+        self.db_file_patch.start()
+        db.setup_database()
+        db.query_registry.reset()
+
+    def tearDown(self):
+        db.query_registry.close_all()
+        self.db_file_patch.stop()
+        self.temp_dir.cleanup()
+
+    def test_exports_query_registry_histograms(self):
+        db.get_all_guilds()
+
+        rendered = render_families(collect_database())
+
+        self.assertIn('copydc_db_query_duration_seconds_count{query="guilds.all",kind="read"} 1', rendered)
+        self.assertIn(
+            'copydc_db_query_duration_seconds_bucket{query="guilds.all",kind="read",le="+Inf"} 1', rendered
+        )
+
+
+class CommandMetricsTests(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.cog = MetricsCog(SimpleNamespace())
+        cog_name = self.cog.qualified_name
+        self.command = SimpleNamespace(cog_name=cog_name, qualified_name="demo_hybrid")
+        self.prefix = COMMAND_DURATION.labels(cog_name, "demo_hybrid", "prefix")
+        self.slash = COMMAND_DURATION.labels(cog_name, "demo_hybrid", "slash")
+        self.errors = COMMAND_ERRORS.labels(cog_name, "demo_hybrid")
+
+    async def test_hybrid_slash_invocation_is_only_recorded_as_slash(self):
+        prefix_before, slash_before, errors_before = self.prefix.count, self.slash.count, self.errors.value
+        interaction = SimpleNamespace(type=discord.InteractionType.application_command, extras={})
+        ctx = SimpleNamespace(command=self.command, interaction=interaction)
+        app_command = SimpleNamespace(binding=self.cog, qualified_name="demo_hybrid")
+
+        # Eventos que despachan HybridAppCommand._invoke_with_namespace y el árbol.
+        await self.cog.on_interaction(interaction)
+        await self.cog.on_command(ctx)
+        await self.cog.on_command_completion(ctx)
+        await self.cog.on_command_error(ctx, commands.CommandError("fallo"))
+        await self.cog.on_app_command_completion(interaction, app_command)
+
+        self.assertEqual(self.prefix.count, prefix_before)
+        self.assertEqual(self.slash.count, slash_before + 1)
+        self.assertEqual(self.errors.value, errors_before)
+
+    async def test_prefix_invocation_is_recorded_as_prefix(self):
+        prefix_before, errors_before = self.prefix.count, self.errors.value
+        ctx = SimpleNamespace(command=self.command, interaction=None)
+
+        await self.cog.on_command(ctx)
+        await self.cog.on_command_error(ctx, commands.CommandError("fallo"))
+
+        self.assertEqual(self.prefix.count, prefix_before + 1)
+        self.assertEqual(self.errors.value, errors_before + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+import metrics_history
+from metrics_history import HOUR, MINUTE_RETENTION_SEC, MetricsHistory, sparkline
+
+DAY = 86400
+NOW = 1_700_000_000 - 1_700_000_000 % HOUR
+
+
+class MetricsHistoryTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.history = MetricsHistory(str(Path(self.temp_dir.name) / "history.db"))
+
+    def test_records_are_buffered_until_flush(self):
+        self.history.record(NOW - 120, {"db_ops": 10, "messages": 4})
+        self.history.record(NOW - 59, {"db_ops": 20})
+        self.assertEqual(self.history.pending, 3)
+        self.assertFalse(Path(self.history.path).exists())
+
+        self.assertEqual(self.history.flush(now=NOW), 3)
+        self.assertEqual(self.history.pending, 0)
+        self.assertEqual(self.history.flush(now=NOW), 0)
+
+        summary = self.history.summaries(NOW - 3600, NOW)
+        self.assertEqual(summary["db_ops"], {"value": 15.0, "minimum": 10.0, "maximum": 20.0, "samples": 2})
+        self.assertEqual(summary["messages"]["value"], 4.0)
+
+    def test_old_minutes_are_downsampled_to_hours(self):
+        old_hour = NOW - MINUTE_RETENTION_SEC - 2 * HOUR
+        for minute in range(60):
+            self.history.record(old_hour + minute * 60, {"db_p95_ms": minute})
+        self.history.record(NOW - 60, {"db_p95_ms": 5})
+        self.history.flush(now=NOW)
+
+        rows = self.history._query(
+            "SELECT resolution, bucket, value, samples, minimum, maximum FROM rollups", ()
+        )
+        self.assertEqual(
+            sorted(tuple(row) for row in rows),
+            [(60, NOW - 60, 5.0, 1, 5.0, 5.0), (3600, old_hour, 29.5, 60, 0.0, 59.0)],
+        )
+        # Las horas y los minutos se combinan con su peso en muestras.
+        summary = self.history.summaries(old_hour, NOW)["db_p95_ms"]
+        self.assertAlmostEqual(summary["value"], (29.5 * 60 + 5) / 61)
+
+        self.history.record(NOW, {"db_p95_ms": 1})
+        self.history.flush(now=NOW + metrics_history.HOUR_RETENTION_SEC - DAY)
+        buckets = [row["bucket"] for row in self.history._query("SELECT bucket FROM rollups", ())]
+        self.assertNotIn(old_hour, buckets)
+
+    def test_series_groups_points_by_step(self):
+        for minute in range(120):
+            self.history.record(NOW - 7200 + minute * 60, {"messages": minute})
+        self.history.flush(now=NOW)
+
+        points = self.history.series("messages", NOW - 7200, NOW, points=4)
+        self.assertEqual(len(points), 4)
+        self.assertEqual([point["samples"] for point in points], [30] * 4)
+        self.assertEqual(points[0]["value"], 14.5)
+        self.assertEqual(self.history.series("missing", NOW - 7200, NOW), [])
+
+    def test_failed_flush_keeps_rows_for_the_next_attempt(self):
+        broken = MetricsHistory(self.temp_dir.name)
+        broken.record(NOW, {"db_ops": 1})
+        with self.assertRaises(sqlite3.Error):
+            broken.flush(now=NOW)
+        self.assertEqual(broken.pending, 1)
+
+    def test_sparkline(self):
+        self.assertEqual(sparkline([]), "")
+        self.assertEqual(sparkline([2, 2]), "▁▁")
+        self.assertEqual(sparkline([0, 5, 10]), "▁▅█")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,15 +1,29 @@
+import asyncio
 import unittest
 from types import SimpleNamespace
 from unittest.mock import AsyncMock, MagicMock, patch
 
-from command_utils import RestrictedView
-from modules.clantag_cog import ClanTagCog
+import discord
+
+import localization
+from admin_modules.help_owner_cog import OWNER_HELP_SECTIONS, get_owner_help_embeds
+from admin_modules.perm_inspector_cog import PermissionEngine
+from command_utils import (
+    EmbedPageCache,
+    EmbedTemplate,
+    RestrictedView,
+    emoji_index,
+    get_compiled_embed_text,
+)
+from modules.clantag_cog import ClanTagCog, ClanTagWearerIndex
 from modules.expression_cog import (
     MAX_INPUT_BYTES,
     MAX_INPUT_PIXELS,
     ExpressionCog,
     compress_static_image_for_discord,
 )
+from modules.help_cog import HELP_SECTIONS, get_help_embeds, get_select_options
+from modules.vanity_cog import VanityMatcher, custom_status_text
 
 
 class RestrictedViewTests(unittest.IsolatedAsyncioTestCase):
@@ -73,6 +87,349 @@ class ClanTagHelperTests(unittest.TestCase):
         self.assertIsNone(ClanTagCog._extract_primary_guild(user))
 
 
+class ClanTagCacheTests(unittest.IsolatedAsyncioTestCase):
+    def make_cog(self, fetch_user):
+        bot = SimpleNamespace(get_user=lambda user_id: None, fetch_user=fetch_user, guilds=[])
+        return ClanTagCog(bot)
+
+    async def test_concurrent_lookups_share_one_fetch(self):
+        user = SimpleNamespace(
+            primary_guild=SimpleNamespace(id=5, identity_enabled=True, tag="COPY", badge=None)
+        )
+        fetch_user = AsyncMock(return_value=user)
+        cog = self.make_cog(fetch_user)
+
+        results = await asyncio.gather(cog.fetch_user_clan(7), cog.fetch_user_clan(7))
+
+        fetch_user.assert_awaited_once_with(7)
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(results[0]["tag"], "COPY")
+        self.assertEqual(cog._clan_fetches, {})
+
+    async def test_clan_cache_is_bounded(self):
+        cog = self.make_cog(AsyncMock())
+        cog._clan_cache_max_users = 2
+
+        for user_id in (1, 2, 3):
+            cog._remember_clan(user_id, None, 0.0)
+
+        self.assertEqual(list(cog._clan_cache), [2, 3])
+
+    async def test_recent_actions_age_out(self):
+        cog = self.make_cog(AsyncMock())
+        cog._record_action((1, 1), "add", 100.0)
+        cog._record_action((1, 2), "add", 102.0)
+
+        cog._prune_recent_actions(103.5)
+
+        self.assertEqual(list(cog._recent_actions), [(1, 2)])
+
+    async def test_tag_change_syncs_configured_guilds_concurrently(self):
+        user = SimpleNamespace(id=7, bot=False, primary_guild=None)
+        changed = SimpleNamespace(
+            id=7,
+            bot=False,
+            primary_guild=SimpleNamespace(id=1, identity_enabled=True, tag="COPY", badge=None),
+        )
+        guilds = {
+            guild_id: SimpleNamespace(id=guild_id, get_member=lambda member_id, g=guild_id: f"member-{g}")
+            for guild_id in (1, 2, 3)
+        }
+        cog = self.make_cog(AsyncMock())
+        cog.bot.get_guild = guilds.get
+        started = []
+        both_started = asyncio.Event()
+
+        async def sync_member(member):
+            started.append(member)
+            if len(started) == 2:
+                both_started.set()
+            # Secuencial, la primera sincronización nunca vería empezar la segunda.
+            await asyncio.wait_for(both_started.wait(), timeout=1)
+
+        cog.sync_member = sync_member
+        with patch("modules.clantag_cog.get_clantag_role_guild_ids", return_value={1, 3, 4}) as load:
+            await cog.on_user_update(user, changed)
+
+        load.assert_called_once_with()
+        self.assertEqual(sorted(started), ["member-1", "member-3"])
+        self.assertEqual(cog._role_guilds, {1, 3, 4})
+
+    async def test_role_guilds_follow_settings_changes(self):
+        cog = self.make_cog(AsyncMock())
+        cog._role_guilds = {1}
+
+        with patch("modules.clantag_cog.get_clantag_settings", return_value={"role_id": 9}):
+            cog._refresh_settings_cache(2)
+        cog._invalidate_settings_cache(1)
+
+        self.assertEqual(cog._role_guilds, {2})
+
+
+class ClanTagWearerIndexTests(unittest.IsolatedAsyncioTestCase):
+    def make_guild(self, primary_guilds):
+        guild = SimpleNamespace(id=5, members=[])
+        for member_id, primary_guild_id in enumerate(primary_guilds, start=1):
+            guild.members.append(
+                SimpleNamespace(
+                    id=member_id,
+                    bot=False,
+                    guild=guild,
+                    primary_guild=SimpleNamespace(
+                        id=primary_guild_id, identity_enabled=True, tag="COPY", badge=None
+                    ),
+                )
+            )
+        by_id = {member.id: member for member in guild.members}
+        guild.get_member = by_id.get
+        return guild
+
+    async def test_builds_in_chunks_and_tracks_updates(self):
+        guild = self.make_guild([5, 9, 5, 5])
+        index = ClanTagWearerIndex(chunk_size=2)
+
+        await index.ensure_built(guild)
+        self.assertEqual(index.tag(5), "COPY")
+        self.assertEqual(index.count(5), 3)
+
+        guild.members[0].primary_guild = SimpleNamespace(id=9, identity_enabled=True, tag="OTHR", badge=None)
+        index.update(guild.members[0])
+        index.discard(5, 3)
+        self.assertEqual(index.member_ids(5), [4])
+
+        index.discard(5, 4)
+        self.assertIsNone(index.tag(5))
+
+    async def test_dropping_a_guild_mid_build_returns_an_empty_index(self):
+        guild = self.make_guild([5, 5, 5, 5])
+        index = ClanTagWearerIndex(chunk_size=1)
+
+        waiter = asyncio.create_task(index.ensure_built(guild))
+        await asyncio.sleep(0)
+        stale = index._builds[5]
+        index.drop_guild(5)
+        await waiter
+        self.assertIsNone(index.tag(5))
+
+        # El callback de la construcción cancelada no borra la nueva.
+        rebuild = asyncio.create_task(index.ensure_built(guild))
+        await asyncio.sleep(0)
+        current = index._builds[5]
+        index._forget_build(5, stale)
+        self.assertIs(index._builds.get(5), current)
+        await rebuild
+        self.assertEqual(index.count(5), 4)
+
+    async def test_ignores_updates_for_unindexed_guilds(self):
+        guild = self.make_guild([5])
+        index = ClanTagWearerIndex()
+
+        index.update(guild.members[0])
+
+        self.assertFalse(index.is_ready(5))
+        self.assertEqual(index.count(5), 0)
+
+
+class PermissionEngineTests(unittest.IsolatedAsyncioTestCase):
+    def make_member(self, guild, member_id, role_ids):
+        return SimpleNamespace(
+            id=member_id,
+            guild=guild,
+            roles=[SimpleNamespace(id=role_id) for role_id in role_ids],
+            is_timed_out=lambda: False,
+        )
+
+    async def test_resolves_each_role_signature_once(self):
+        guild = SimpleNamespace(id=50, owner_id=1)
+        members = [self.make_member(guild, member_id, [5, 7]) for member_id in (2, 3, 4)]
+        members.append(self.make_member(guild, 9, [5]))
+        channel = SimpleNamespace(
+            id=100,
+            guild=guild,
+            overwrites={},
+            permissions_for=MagicMock(
+                side_effect=lambda member: discord.Permissions(manage_messages=len(member.roles) == 2)
+            ),
+        )
+        engine = PermissionEngine(chunk_size=2)
+
+        holders = await engine.members_with(members, channel, "manage_messages")
+
+        self.assertEqual([member.id for member in holders], [2, 3, 4])
+        self.assertEqual(channel.permissions_for.call_count, 2)
+
+    def test_member_overwrites_bypass_the_signature_cache(self):
+        guild = SimpleNamespace(id=50, owner_id=1)
+        first = self.make_member(guild, 2, [5])
+        second = self.make_member(guild, 3, [5])
+        channel = SimpleNamespace(
+            id=100,
+            guild=guild,
+            overwrites={discord.Object(id=3, type=discord.Member): None},
+            permissions_for=MagicMock(return_value=discord.Permissions.none()),
+        )
+        engine = PermissionEngine()
+
+        engine.permissions_for(channel, first)
+        engine.permissions_for(channel, first)
+        engine.permissions_for(channel, second)
+        engine.permissions_for(channel, second)
+
+        self.assertEqual(channel.permissions_for.call_count, 3)
+
+    def test_matrix_survives_until_the_guild_is_invalidated(self):
+        guild = SimpleNamespace(id=50, owner_id=1)
+        member = self.make_member(guild, 2, [5])
+        channel = SimpleNamespace(
+            id=100,
+            guild=guild,
+            overwrites={},
+            permissions_for=MagicMock(return_value=discord.Permissions.none()),
+        )
+        engine = PermissionEngine()
+
+        engine.permissions_for(channel, member)
+        engine.permissions_for(channel, member)
+        self.assertEqual(engine.size(), 1)
+
+        engine.invalidate_guild(50)
+        engine.permissions_for(channel, member)
+
+        self.assertEqual(channel.permissions_for.call_count, 2)
+        self.assertEqual(engine.stats()["invalidations"], 1)
+        self.assertEqual(engine.stats()["hits"], 1)
+
+
+class EmbedTemplateTests(unittest.TestCase):
+    def setUp(self):
+        self.guild = SimpleNamespace(
+            id=1,
+            emojis=(discord.PartialEmoji(name="star", id=111111111111111111),),
+        )
+        emoji_index.index_guild(self.guild)
+
+    def tearDown(self):
+        emoji_index.drop_guild(self.guild.id)
+
+    def test_template_resolves_emojis_once_and_substitutes_known_fields(self):
+        template = EmbedTemplate(
+            ":star: {user} {tag} {vanity} {user}",
+            self.guild,
+            frozenset({"user", "vanity"}),
+        )
+
+        self.assertEqual(
+            template.render({"user": "<@1>", "vanity": "discord.gg/{user}"}),
+            "<:star:111111111111111111> <@1> {tag} discord.gg/{user} <@1>",
+        )
+
+    def test_compiled_text_is_reused_until_source_or_emojis_change(self):
+        cache = {}
+        defaults = MagicMock(return_value=("Default", "{user}"))
+
+        def compile_text(description):
+            return get_compiled_embed_text(
+                cache,
+                ("add", "en"),
+                self.guild,
+                title=None,
+                description=description,
+                fields=frozenset({"user"}),
+                defaults=defaults,
+            )
+
+        first = compile_text("Hola {user} :star:")
+        self.assertIs(compile_text("Hola {user} :star:"), first)
+        self.assertEqual(first.title, "Default")
+        self.assertEqual(defaults.call_count, 1)
+
+        emoji_index.index_guild(self.guild, ())
+        recompiled = compile_text("Hola {user} :star:")
+        self.assertIsNot(recompiled, first)
+        self.assertEqual(recompiled.description.render({"user": "x"}), "Hola x :star:")
+
+        self.assertEqual(compile_text("Adiós {user}").description.render({"user": "x"}), "Adiós x")
+
+
+class EmbedPageCacheTests(unittest.TestCase):
+    def test_pages_are_built_once_and_served_as_copies(self):
+        builder = MagicMock(side_effect=get_help_embeds)
+        cache = EmbedPageCache(builder)
+
+        first = cache.embed("en", 1)
+        first.add_field(name="extra", value="x")
+        first.set_footer(text="cambiado")
+        second = cache.embed("en", 1)
+
+        builder.assert_called_once_with("en")
+        self.assertEqual(second.to_dict(), get_help_embeds("en")[1].to_dict())
+
+    def test_catalog_reload_invalidates_pages(self):
+        builder = MagicMock(side_effect=get_help_embeds)
+        cache = EmbedPageCache(builder)
+        cache.pages("es")
+        localization.load_catalogs()
+        cache.pages("es")
+        self.assertEqual(builder.call_count, 2)
+
+    def test_help_select_options_match_the_pages(self):
+        for lang in HELP_SECTIONS:
+            options, _ = get_select_options(lang, current_index=2)
+            self.assertEqual(len(options), len(get_help_embeds(lang)))
+            self.assertEqual([option.default for option in options].index(True), 2)
+
+    def test_owner_help_sections_match_the_pages(self):
+        pages = get_owner_help_embeds()
+        self.assertEqual(len(OWNER_HELP_SECTIONS), len(pages))
+        for (label, _description), page in zip(OWNER_HELP_SECTIONS, pages, strict=True):
+            self.assertTrue(page.title.endswith(label), (label, page.title))
+
+
+class VanityMatcherTests(unittest.TestCase):
+    def test_status_text_only_uses_custom_activities(self):
+        member = SimpleNamespace(
+            activities=(
+                discord.Game("discord.gg/game"),
+                discord.CustomActivity(name="Únete a Discord.gg/Copy"),
+            )
+        )
+
+        self.assertEqual(custom_status_text(member), "únete a discord.gg/copy")
+
+    def test_configured_order_wins_over_position_and_overlap(self):
+        matcher = VanityMatcher(
+            [
+                {"vanity_code": "discord.gg/copy", "role_id": 1},
+                {"vanity_code": "gg/copydc", "role_id": 2},
+                {"vanity_code": "discord.gg/co", "role_id": 3},
+            ]
+        )
+
+        self.assertEqual(matcher.match("discord.gg/copydc"), ("discord.gg/copy", 1))
+        self.assertEqual(matcher.match("gg/copydc y discord.gg/co"), ("gg/copydc", 2))
+        self.assertEqual(matcher.match("discord.gg/cola"), ("discord.gg/co", 3))
+        self.assertEqual(matcher.match("sin vanity"), (None, None))
+        self.assertEqual(matcher.role_ids, frozenset({1, 2, 3}))
+
+    def test_roles_of_repeated_codes_stay_managed(self):
+        matcher = VanityMatcher(
+            [
+                {"vanity_code": "discord.gg/copy", "role_id": 1},
+                {"vanity_code": "Discord.gg/Copy", "role_id": 2},
+            ]
+        )
+
+        self.assertEqual(matcher.match("discord.gg/copy"), ("discord.gg/copy", 1))
+        self.assertEqual(matcher.role_ids, frozenset({1, 2}))
+        self.assertEqual(matcher.code_for_role[2], "Discord.gg/Copy")
+
+    def test_empty_matcher_never_matches(self):
+        matcher = VanityMatcher([])
+
+        self.assertEqual(matcher.match("discord.gg/copy"), (None, None))
+        self.assertEqual(matcher.role_ids, frozenset())
+
+
 class ExpressionSafetyTests(unittest.IsolatedAsyncioTestCase):
     async def test_rejects_large_attachment_before_reading(self):
         attachment = SimpleNamespace(
@@ -1,14 +1,19 @@
 import tempfile
 import unittest
 from pathlib import Path
+from types import SimpleNamespace
 from unittest import mock
 
 import discord
 
 import database as db
 from command_utils import (
+    EmojiIndex,
     build_presence_activity,
+    convert_guild_emojis,
+    emoji_index,
     looks_like_custom_emoji_reference,
+    normalize_presence_emoji_input,
     resolve_presence_status,
     split_custom_status_input,
 )
@@ -23,6 +28,7 @@ class PresencePresetDatabaseTests(unittest.TestCase):
         db.setup_database()
 
     def tearDown(self):
+        db.query_registry.close_all()
         self.db_file_patch.stop()
         self.temp_dir.cleanup()
 
@@ -99,5 +105,51 @@ class PresenceUtilityTests(unittest.TestCase):
         self.assertEqual(text, "🔗 c!help | c!copy")
 
 
+class EmojiIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.wave = discord.PartialEmoji(name="Wave", id=111111111111111111)
+        self.dance = discord.PartialEmoji(name="dance", id=222222222222222222, animated=True)
+        self.other = discord.PartialEmoji(name="remote", id=333333333333333333)
+        self.guild = SimpleNamespace(id=1, emojis=(self.wave, self.dance))
+        self.remote_guild = SimpleNamespace(id=2, emojis=(self.other,))
+        self.bot = SimpleNamespace(guilds=[self.guild, self.remote_guild], get_emoji=lambda _: None)
+        emoji_index.rebuild(self.bot.guilds)
+
+    def tearDown(self):
+        emoji_index.rebuild([])
+        emoji_index.ready = False
+
+    def test_guild_lookup_is_case_insensitive_for_embeds(self):
+        self.assertEqual(
+            convert_guild_emojis(":wave: hola :DANCE: :missing:", self.guild),
+            "<:Wave:111111111111111111> hola <a:dance:222222222222222222> :missing:",
+        )
+
+    def test_presence_input_prefers_guild_then_global_index(self):
+        self.assertEqual(
+            normalize_presence_emoji_input(self.bot, self.guild, ":dance:"),
+            "<a:dance:222222222222222222>",
+        )
+        self.assertEqual(
+            normalize_presence_emoji_input(self.bot, self.guild, "remote"),
+            "<:remote:333333333333333333>",
+        )
+        self.assertIsNone(normalize_presence_emoji_input(self.bot, self.guild, ":wave:"))
+
+    def test_reindexing_a_guild_updates_the_global_index(self):
+        index = EmojiIndex()
+        index.rebuild(self.bot.guilds)
+        renamed = discord.PartialEmoji(name="renamed", id=333333333333333333)
+
+        index.index_guild(self.remote_guild, (renamed,))
+
+        self.assertIsNone(index.find_global("remote"))
+        self.assertIs(index.find_global("renamed"), renamed)
+
+        index.drop_guild(self.remote_guild.id)
+        self.assertIsNone(index.find_global("renamed"))
+        self.assertEqual(index.guild_count(), 1)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,76 @@
+import re
+import tempfile
+import unittest
+from contextlib import closing
+from pathlib import Path
+from unittest import mock
+
+import database as db
+from scripts.benchmark_queries import seed_database
+
+# Consultas que devuelven o modifican la tabla completa a propósito.
+FULL_SCAN_QUERIES = {
+    "clantag_settings.role_guilds",
+    "guilds.all",
+    "guild_languages.all",
+    "modules.summary",
+    "presence_presets.list",
+}
+TABLE_SCAN = re.compile(r"^SCAN (?!\w+ VIRTUAL TABLE)\w+")
+
+
+class QueryPlanTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = str(Path(self.temp_dir.name) / "copydc-plans.db")
+        self.db_file_patch = mock.patch.object(db, "DB_FILE", self.db_path)
+        self.db_file_patch.start()
+        db.setup_database()
+        with closing(db.get_db_connection()) as conn:
+            seed_database(conn, 200)
+        # Las consultas de ajustes dinámicas se registran al usarse por primera vez.
+        db.set_vanity_settings(1, channel_id=1)
+        db.set_clantag_settings(1, role_id=1)
+
+    def tearDown(self):
+        db.query_registry.close_all()
+        self.db_file_patch.stop()
+        self.temp_dir.cleanup()
+
+    def plan(self, name: str) -> list[str]:
+        sql = db.query_registry.sql(name)
+        conn = db.query_registry.connection()
+        rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", [None] * sql.count("?")).fetchall()
+        return [row["detail"] for row in rows]
+
+    def assert_no_table_scans(self):
+        for name in db.query_registry.names():
+            if name in FULL_SCAN_QUERIES:
+                continue
+            with self.subTest(query=name):
+                scans = [detail for detail in self.plan(name) if TABLE_SCAN.match(detail)]
+                self.assertEqual(scans, [], f"{name} recorre una tabla completa")
+
+    def test_registered_queries_avoid_full_table_scans(self):
+        self.assert_no_table_scans()
+
+    def test_registered_queries_avoid_full_table_scans_with_statistics(self):
+        db.query_registry.connection().execute("ANALYZE")
+        self.assert_no_table_scans()
+
+    def test_hot_lookups_use_their_indexes(self):
+        self.assertIn("COVERING INDEX idx_vanity_codes_guild_cover", self.plan("vanity_codes.for_guild")[0])
+        self.assertIn(
+            "COVERING INDEX sqlite_autoindex_lfg_enrollments_1", self.plan("lfg_enrollments.exists")[0]
+        )
+        self.assertEqual(
+            self.plan("support_cases.expired_archives"),
+            [
+                "SEARCH support_cases USING INDEX idx_support_cases_purge_after (purge_after>? AND purge_after<?)"
+            ],
+        )
+        self.assertIn("idx_presence_presets_lower_name", self.plan("presence_presets.get")[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
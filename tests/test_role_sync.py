@@ -0,0 +1,115 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+from role_sync import GuildRateBucket, RoleReconciler
+
+
+def make_role(role_id: int, *, default: bool = False):
+    return SimpleNamespace(id=role_id, is_default=lambda: default)
+
+
+def make_member(roles):
+    guild = SimpleNamespace(id=1)
+    member = SimpleNamespace(id=2, guild=guild, roles=list(roles), edit=AsyncMock())
+    guild.get_member = lambda member_id: member
+    return member
+
+
+class RoleReconcilerTests(unittest.IsolatedAsyncioTestCase):
+    async def test_coalesces_changes_into_a_single_edit(self):
+        everyone = make_role(1, default=True)
+        old_lfg = make_role(10)
+        new_lfg = make_role(11)
+        vanity = make_role(20)
+        member = make_member([everyone, old_lfg])
+        reconciler = RoleReconciler(window=0.01)
+
+        await asyncio.gather(
+            reconciler.reconcile(member, desired=[new_lfg], managed=[old_lfg], reason="LFG"),
+            reconciler.reconcile(member, desired=[vanity], managed=[vanity], reason="Vanity"),
+        )
+
+        member.edit.assert_awaited_once()
+        kwargs = member.edit.await_args.kwargs
+        self.assertEqual({role.id for role in kwargs["roles"]}, {11, 20})
+        self.assertEqual(kwargs["reason"], "LFG | Vanity")
+        stats = reconciler.snapshot()
+        self.assertEqual(stats["rest_calls"], 1)
+        self.assertEqual(stats["coalesced_requests"], 1)
+        self.assertEqual(stats["rest_calls_saved"], 2)
+
+    async def test_skips_requests_that_change_nothing(self):
+        vanity = make_role(20)
+        member = make_member([vanity])
+        reconciler = RoleReconciler(window=0.01)
+
+        await reconciler.reconcile(member, desired=[vanity], managed=[vanity], reason="Vanity")
+
+        member.edit.assert_not_awaited()
+        self.assertEqual(reconciler.snapshot()["rest_calls"], 0)
+
+    async def test_close_releases_waiting_callers(self):
+        vanity = make_role(20)
+        member = make_member([])
+        reconciler = RoleReconciler(window=60)
+
+        caller = asyncio.create_task(
+            reconciler.reconcile(member, desired=[vanity], managed=[vanity], reason="Vanity")
+        )
+        await asyncio.sleep(0)
+        await reconciler.close()
+
+        await asyncio.wait([caller], timeout=1)
+        self.assertTrue(caller.cancelled())
+        member.edit.assert_not_awaited()
+        self.assertEqual(reconciler.snapshot()["pending_members"], 0)
+
+    async def test_cancelled_flush_releases_waiting_callers(self):
+        vanity = make_role(20)
+        reconciler = RoleReconciler(window=60)
+
+        caller = asyncio.create_task(
+            reconciler.reconcile(make_member([]), desired=[vanity], managed=[vanity], reason="Vanity")
+        )
+        for _ in range(2):
+            await asyncio.sleep(0)
+        # La tarea ya está dentro de su espera, como al descargar un cog.
+        (flush,) = reconciler._flush_tasks
+        flush.cancel()
+
+        await asyncio.wait([caller], timeout=1)
+        self.assertTrue(caller.cancelled())
+        self.assertEqual(reconciler.snapshot()["pending_members"], 0)
+
+    async def test_rereads_member_after_rate_limit_wait(self):
+        vanity = make_role(20)
+        mod_role = make_role(30)
+        member = make_member([])
+        # Un moderador añade un rol mientras se espera al bucket.
+        refreshed = SimpleNamespace(id=2, guild=member.guild, roles=[mod_role], edit=AsyncMock())
+        reads = []
+
+        def get_member(member_id):
+            reads.append(member_id)
+            return member if len(reads) == 1 else refreshed
+
+        member.guild.get_member = get_member
+        reconciler = RoleReconciler(window=0.01)
+        reconciler._buckets[member.guild.id] = SimpleNamespace(reserve=lambda: 0.01)
+
+        await reconciler.reconcile(member, desired=[vanity], managed=[vanity], reason="Vanity")
+
+        member.edit.assert_not_awaited()
+        self.assertEqual({role.id for role in refreshed.edit.await_args.kwargs["roles"]}, {20, 30})
+        self.assertEqual(reconciler.snapshot()["rate_limit_waits"], 1)
+
+
+class GuildRateBucketTests(unittest.TestCase):
+    def test_reports_wait_once_burst_is_spent(self):
+        bucket = GuildRateBucket(capacity=2, refill_per_sec=1.0)
+
+        self.assertEqual(bucket.reserve(), 0.0)
+        self.assertEqual(bucket.reserve(), 0.0)
+        self.assertGreater(bucket.reserve(), 0.9)
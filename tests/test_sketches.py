@@ -0,0 +1,123 @@
+import random
+import unittest
+
+from sketches import LogHistogram, RateTracker, SpaceSaving
+
+
+class LogHistogramTests(unittest.TestCase):
+    def test_quantiles_stay_within_relative_accuracy(self):
+        rng = random.Random(7)
+        values = sorted(rng.lognormvariate(0, 1.5) for _ in range(20_000))
+        sketch = LogHistogram(0.02)
+        for value in values:
+            sketch.add(value)
+
+        qs = (0.99, 0.5, 0.95)
+        for q, estimate in zip(qs, sketch.quantiles(qs), strict=True):
+            exact = values[int(q * len(values)) - 1]
+            self.assertLess(abs(estimate - exact) / exact, 0.021, q)
+        self.assertEqual(sketch.quantile(0.95), sketch.quantiles((0.95,))[0])
+        self.assertLessEqual(len(sketch), sketch.max_buckets)
+        self.assertLess(len(sketch), 500)
+
+    def test_memory_is_bounded_by_value_range(self):
+        sketch = LogHistogram(0.05, min_value=0.01, max_value=1000)
+        for index in range(100_000):
+            sketch.add((index % 5000) * 0.37)
+        self.assertLessEqual(len(sketch), sketch.max_buckets)
+        sketch.add(10**9)
+        self.assertLessEqual(len(sketch), sketch.max_buckets)
+        # El valor real extremo se conserva aunque caiga en la última cubeta.
+        self.assertEqual(sketch.quantile(1.0), 10**9)
+
+    def test_merge_and_empty(self):
+        left, right = LogHistogram(), LogHistogram()
+        self.assertEqual(left.quantiles((0.5, 0.99)), [0.0, 0.0])
+        for value in (1, 2, 3):
+            left.add(value)
+        for value in (100, 200):
+            right.add(value)
+        left.merge(right)
+        self.assertEqual(left.count, 5)
+        self.assertAlmostEqual(left.quantile(0.5), 3, delta=0.06)
+        self.assertEqual(left.quantile(1.0), 200)
+        with self.assertRaises(ValueError):
+            left.merge(LogHistogram(0.1))
+
+
+class SpaceSavingTests(unittest.TestCase):
+    def test_keeps_heavy_hitters_within_capacity(self):
+        sketch = SpaceSaving(10)
+        rng = random.Random(3)
+        exact: dict[int, int] = {}
+        for _ in range(5000):
+            key = rng.choice((1, 2, 3)) if rng.random() < 0.6 else rng.randrange(100, 10_000)
+            sketch.add(key)
+            exact[key] = exact.get(key, 0) + 1
+
+        self.assertEqual(len(sketch), 10)
+        self.assertEqual(sketch.total, 5000)
+        self.assertEqual({key for key, _, _ in sketch.top(3)}, {1, 2, 3})
+        for key, count, error in sketch.top():
+            # El conteo nunca queda por debajo del real ni lo supera en más de ``error``.
+            self.assertGreaterEqual(count, exact[key])
+            self.assertLessEqual(count - error, exact[key])
+
+    def test_evicts_the_smallest_count_after_increments(self):
+        sketch = SpaceSaving(3)
+        for key in "abc":
+            sketch.add(key)
+        for key in "aacc":
+            sketch.add(key)
+
+        sketch.add("d")
+        self.assertEqual(sorted(sketch.keys()), ["a", "c", "d"])
+        self.assertEqual((sketch.count("d"), sketch.error("d")), (2, 1))
+        sketch.add("e")
+        # "d" (2) es ahora el menor: "a" y "c" tienen 3.
+        self.assertEqual(sorted(sketch.keys()), ["a", "c", "e"])
+        self.assertEqual(len(sketch._heap), 3)
+
+    def test_exact_while_under_capacity(self):
+        sketch = SpaceSaving(5)
+        for key in "aabbbc":
+            sketch.add(key)
+        self.assertEqual(sketch.top(2), [("b", 3, 0), ("a", 2, 0)])
+        self.assertEqual(sketch.count("z"), 0)
+        sketch.clear()
+        self.assertEqual((len(sketch), sketch.total), (0, 0))
+
+
+class RateTrackerTests(unittest.TestCase):
+    def test_windows_follow_recent_traffic(self):
+        tracker = RateTracker({"1m": 60, "1h": 3600}, interval=5)
+        total = 0
+        # Una hora a 10/min y luego un minuto a 300/min.
+        for second in range(0, 3600, 5):
+            tracker.sample({"messages": total}, now=second)
+            total += 10 * 5 / 60
+        for second in range(3600, 3660, 5):
+            tracker.sample({"messages": total}, now=second)
+            total += 300 * 5 / 60
+
+        rates = tracker.rates({"messages": total}, now=3660)["messages"]
+        self.assertAlmostEqual(rates["1m"], 300, delta=1)
+        self.assertAlmostEqual(rates["1h"], 10 + 290 / 60, delta=1)
+        # Tras una constante de tiempo la media recorre ~63 % del salto.
+        self.assertGreater(rates["ewma_1m"], 150)
+        self.assertLess(rates["ewma_1h"], 20)
+        self.assertLessEqual(len(tracker._samples), 3600 / 5 + 2)
+
+    def test_short_uptime_and_counter_reset(self):
+        tracker = RateTracker({"5m": 300}, interval=5)
+        self.assertEqual(tracker.rates({"ops": 4}, now=0), {"ops": {"5m": 0.0, "ewma_5m": 0.0}})
+        tracker.sample({"ops": 0}, now=0)
+        # Con menos uptime que la ventana se usa la muestra más antigua.
+        self.assertAlmostEqual(tracker.rates({"ops": 20}, now=30)["ops"]["5m"], 40)
+        tracker.sample({"ops": 20}, now=30)
+        increases, span = tracker.increase({"ops": 5}, 300, now=40)
+        self.assertEqual((increases, span), ({"ops": 5}, 40))
+
+
+if __name__ == "__main__":
+    unittest.main()
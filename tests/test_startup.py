@@ -0,0 +1,89 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from startup import StartupProfile, discover_extensions, load_extensions, load_waves, resolve_dependencies
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+
+
+class FakeBot:
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.loaded: list[str] = []
+
+    async def load_extension(self, name: str) -> None:
+        if name in self.failing:
+            raise RuntimeError("boom")
+        self.loaded.append(name)
+
+
+class StartupDependencyTests(unittest.TestCase):
+    def test_slash_cogs_depend_on_their_base_cog(self):
+        extensions = discover_extensions(BASE_DIR / "modules", "modules")
+        extensions.update(discover_extensions(BASE_DIR / "admin_modules", "admin_modules"))
+
+        dependencies = resolve_dependencies(extensions)
+
+        self.assertEqual(dependencies["modules.vanity_slash_cog"], {"modules.vanity_cog"})
+        self.assertEqual(dependencies["modules.clantag_slash_cog"], {"modules.clantag_cog"})
+        self.assertEqual(dependencies["modules.help_slash_cog"], {"modules.help_cog"})
+        self.assertEqual(dependencies["modules.counting_cog"], set())
+
+        waves = load_waves(dependencies)
+        position = {name: index for index, wave in enumerate(waves) for name in wave}
+        for name, deps in dependencies.items():
+            for dependency in deps:
+                self.assertLess(position[dependency], position[name])
+        self.assertEqual(sorted(position), sorted(extensions))
+
+    def test_cycles_are_rejected(self):
+        with self.assertRaises(ValueError):
+            load_waves({"a": {"b"}, "b": {"a"}, "c": set()})
+
+
+class LoadExtensionsTests(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.folder = Path(self.temp_dir.name)
+        (self.folder / "base.py").write_text("import json\n", encoding="utf-8")
+        (self.folder / "child.py").write_text("from pkg.base import thing\n", encoding="utf-8")
+        (self.folder / "solo.py").write_text("", encoding="utf-8")
+        self.extensions = discover_extensions(self.folder, "pkg")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    async def test_loads_in_dependency_waves_and_writes_profile(self):
+        bot = FakeBot()
+        profile = StartupProfile()
+
+        await load_extensions(bot, self.extensions, profile)
+
+        self.assertEqual(profile.waves, [["pkg.base", "pkg.solo"], ["pkg.child"]])
+        self.assertLess(bot.loaded.index("pkg.base"), bot.loaded.index("pkg.child"))
+        self.assertEqual(profile.loaded("pkg"), 3)
+
+        path = self.folder / "profile.json"
+        profile.write(path)
+        data = json.loads(path.read_text(encoding="utf-8"))
+        self.assertEqual(data["extensions"]["pkg.child"]["depends_on"], ["pkg.base"])
+        self.assertEqual(data["extensions"]["pkg.child"]["wave"], 1)
+        self.assertIn("wave_1", data["phases"])
+        self.assertGreaterEqual(data["total_ms"], 0)
+
+    async def test_dependents_of_a_failed_extension_are_skipped(self):
+        bot = FakeBot(failing={"pkg.base"})
+        profile = StartupProfile()
+
+        await load_extensions(bot, self.extensions, profile)
+
+        self.assertEqual(bot.loaded, ["pkg.solo"])
+        self.assertEqual(profile.extensions["pkg.base"]["status"], "failed")
+        self.assertEqual(profile.extensions["pkg.child"]["status"], "skipped")
+        self.assertEqual(sorted(profile.failures("pkg")), ["pkg.base", "pkg.child"])
+
+
+if __name__ == "__main__":
+    unittest.main()